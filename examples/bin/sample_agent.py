@@ -4,7 +4,8 @@
 from pattoo_shared.constants import DATA_FLOAT
 from pattoo_shared.phttp import PostAgent
 from pattoo_shared.variables import (
-    DataPoint, DataPointMetadata, TargetDataPoints, AgentPolledData)
+    DataPoint, DataPointMetadata, MetadataSet, TargetDataPoints,
+    AgentPolledData)
 
 
 def main():
@@ -93,6 +94,10 @@ def main():
     # Let's add some metadata that will change and trigger a new chart.
     metadata_dynamic = DataPointMetadata('Financial Year', '2020')
 
+    # Metadata shared by many datapoints is best added as a MetadataSet.
+    # It is validated only once.
+    metadata = MetadataSet([metadata_static, metadata_dynamic])
+
     # Create target objects for SITE_A
     target = TargetDataPoints('SITE_A')
     for quote in site_a_data:
@@ -110,8 +115,7 @@ def main():
         for the various other data which cover float and counter values.
         '''
         datapoint = DataPoint(key, value, data_type=DATA_FLOAT)
-        datapoint.add(metadata_static)
-        datapoint.add(metadata_dynamic)
+        datapoint.add(metadata)
         target.add(datapoint)
     agent.add(target)
 
@@ -120,8 +124,7 @@ def main():
     for quote in work_1_data:
         key, value = quote
         datapoint = DataPoint(key, value, data_type=DATA_FLOAT)
-        datapoint.add(metadata_static)
-        datapoint.add(metadata_dynamic)
+        datapoint.add(metadata)
         target.add(datapoint)
     agent.add(target)
 
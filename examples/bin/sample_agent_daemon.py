@@ -8,7 +8,8 @@ from pattoo_shared.agent import Agent, AgentCLI
 from pattoo_shared.constants import DATA_FLOAT
 from pattoo_shared.phttp import PostAgent
 from pattoo_shared.variables import (
-    DataPoint, DataPointMetadata, TargetDataPoints, AgentPolledData)
+    DataPoint, DataPointMetadata, MetadataSet, TargetDataPoints,
+    AgentPolledData)
 
 
 class PollingAgent(Agent):
@@ -118,6 +119,10 @@ def poller(agent_name, polling_interval):
     # Let's add some metadata that will change and trigger a new chart.
     metadata_dynamic = DataPointMetadata('Financial Year', '2020')
 
+    # Metadata shared by many datapoints is best added as a MetadataSet.
+    # It is validated only once.
+    metadata = MetadataSet([metadata_static, metadata_dynamic])
+
     # Create target objects for SITE_A
     target = TargetDataPoints('SITE_A')
     for quote in site_a_data:
@@ -136,8 +141,7 @@ def poller(agent_name, polling_interval):
         '''
 
         datapoint = DataPoint(key, value, data_type=DATA_FLOAT)
-        datapoint.add(metadata_static)
-        datapoint.add(metadata_dynamic)
+        datapoint.add(metadata)
         target.add(datapoint)
     agent.add(target)
 
@@ -146,14 +150,14 @@ def poller(agent_name, polling_interval):
     for quote in work_1_data:
         key, value = quote
         datapoint = DataPoint(key, value, data_type=DATA_FLOAT)
-        datapoint.add(metadata_static)
-        datapoint.add(metadata_dynamic)
+        datapoint.add(metadata)
         target.add(datapoint)
     agent.add(target)
 
-    # Post the data to pattoo
+    # Post the data to pattoo in the background so that an unreachable
+    # pattoo server doesn't delay the next poll
     post = PostAgent(agent)
-    post.post()
+    post.post(blocking=False)
 
 
 def main():
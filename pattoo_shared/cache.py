@@ -0,0 +1,681 @@
+#!/usr/bin/env python3
+"""Pattoo append-only agent cache library."""
+
+# Standard libraries
+import os
+import sys
+import json
+import zlib
+import fcntl
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Pattoo libraries
+from pattoo_shared import log
+from pattoo_shared import files
+from pattoo_shared import compression
+
+# Record header: magic, flags, payload length, CRC32 of flags and payload
+_HEADER = struct.Struct('>2sBII')
+_MAGIC = b'PC'
+_SUFFIX = '.segment'
+
+# Record flags describing the compression of the payload
+_FLAGS = {None: 0, 'gzip': 1, 'zstd': 2}
+_ENCODINGS = {value: key for key, value in _FLAGS.items()}
+
+# Yielded by SegmentLog.records() in place of data compressed with an
+# encoding that can't be decompressed, such as zstd without zstandard
+UNSUPPORTED = object()
+
+
+class SegmentLog():
+    """Durable append-only log of records stored in rotating segment files.
+
+    Records are appended to the newest segment file. A checkpoint file
+    records the position up to which records have been replayed, and
+    segments that are completely replayed are deleted. Each record has a
+    header with a magic number, its length and a checksum, so that a
+    partially written record can be detected and discarded.
+
+    """
+
+    def __init__(self, directory, segment_size=8388608, encoding=None,
+                 minimum=0):
+        """Initialize the class.
+
+        Args:
+            directory: Directory in which to store the segment files
+            segment_size: Size in bytes after which a new segment is started
+            encoding: Compression encoding provided by
+                pattoo_shared.compression.encoding(). None disables
+                compression.
+            minimum: Minimum size in bytes of the data to compress
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._directory = directory
+        self._segment_size = segment_size
+        self._encoding = encoding
+        self._minimum = minimum
+        self._lock = threading.Lock()
+        self._lockfile = os.path.join(directory, 'lock')
+        self._checkpoint_file = os.path.join(directory, 'checkpoint')
+        self._segment = 0
+        self._size = 0
+
+        # Remove any partial records left by a crash
+        files.mkdir(directory)
+        with self._locked():
+            self._recover()
+
+    def append(self, data):
+        """Append data to the log.
+
+        Args:
+            data: JSON serializable data, or a Payload object. Payload
+                objects are stored as they are, without being encoded again.
+
+        Returns:
+            success: True: if successful
+
+        """
+        # Initialize key variables
+        success = False
+        if isinstance(data, Payload) is True:
+            payload = data
+        else:
+            payload = Payload(
+                data, encoding=self._encoding, minimum=self._minimum)
+        header = _header(payload)
+
+        with self._locked():
+            # Follow segments started by other processes sharing the log
+            while os.path.isfile(self._filepath(self._segment + 1)) is True:
+                self._segment += 1
+                self._size = os.path.getsize(self._filepath(self._segment))
+
+            # Start a new segment if the current one is full
+            if self._size >= self._segment_size:
+                self._segment += 1
+                self._size = 0
+            filepath = self._filepath(self._segment)
+
+            # Append the record
+            try:
+                with open(filepath, 'ab') as f_handle:
+                    offset = f_handle.tell()
+                    self._size = offset
+                    try:
+                        f_handle.write(header)
+                        for chunk in payload:
+                            f_handle.write(chunk)
+                        f_handle.flush()
+                        os.fsync(f_handle.fileno())
+                        self._size = f_handle.tell()
+                        success = True
+                    except:
+                        # Remove the partial record. Helps to protect
+                        # against full file systems.
+                        f_handle.truncate(offset)
+                        raise
+            except:
+                (etype, evalue, etraceback) = sys.exc_info()
+                log_message = ('''\
+Cache segment {} append error: [{}, {}, {}]\
+'''.format(filepath, etype, evalue, etraceback))
+                log.log2warning(1055, log_message)
+
+        # Return
+        return success
+
+    def records(self):
+        """Read the records that have not yet been committed.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        Yields:
+            result: Tuple of (data, size, position). "data" is the data
+                appended to the log, UNSUPPORTED if its compression isn't
+                supported, or None if it cannot be decoded. "size" is the
+                uncompressed size of the record in bytes. "position" is the
+                value to provide to commit() once the record has been
+                processed.
+
+        """
+        # Initialize key variables
+        (segment, offset) = self._checkpoint()
+
+        for number in self._segments():
+            # Skip segments that have already been replayed
+            if number < segment:
+                continue
+            start = offset if number == segment else 0
+
+            # Open the segment. It may have been deleted by another process
+            filepath = self._filepath(number)
+            try:
+                f_handle = open(filepath, 'rb')
+            except FileNotFoundError:
+                continue
+
+            # Decode the records one at a time
+            with f_handle:
+                for payload, flags, begin, end in _records(
+                        f_handle, filepath, start=start):
+                    size = end - begin
+                    encoding = _ENCODINGS.get(flags)
+                    if False in [
+                            flags in _ENCODINGS,
+                            compression.supported(encoding)]:
+                        yield (UNSUPPORTED, size, (number, end))
+                        continue
+                    try:
+                        payload = compression.decompress(payload, encoding)
+                        size = _HEADER.size + len(payload)
+                        data = json.loads(payload.decode())
+                    except:
+                        data = None
+                    yield (data, size, (number, end))
+
+    def commit(self, position):
+        """Record that all records up to a position have been processed.
+
+        Segments before the position are deleted.
+
+        Args:
+            position: Position provided by records()
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        (segment, offset) = position
+        temp_file = '{}.tmp'.format(self._checkpoint_file)
+
+        with self._locked():
+            # Never move the checkpoint backwards
+            if tuple(position) <= self._checkpoint():
+                return
+
+            # Atomically replace the checkpoint
+            with open(temp_file, 'w') as f_handle:
+                json.dump({'segment': segment, 'offset': offset}, f_handle)
+                f_handle.flush()
+                os.fsync(f_handle.fileno())
+            os.replace(temp_file, self._checkpoint_file)
+
+            # Delete segments that have been replayed
+            for number in self._segments():
+                if number < segment:
+                    os.remove(self._filepath(number))
+
+    def _recover(self):
+        """Truncate the newest segment after its last complete record.
+
+        The newest segment is also made the one to which records are
+        appended.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        segments = self._segments()
+        if bool(segments) is False:
+            self._segment = self._checkpoint()[0]
+            self._size = 0
+            return
+        filepath = self._filepath(segments[-1])
+        valid = 0
+
+        # Find the end of the last complete record
+        with open(filepath, 'rb+') as f_handle:
+            size = os.fstat(f_handle.fileno()).st_size
+            for _, _, _, end in _records(f_handle, filepath):
+                valid = end
+
+            # Truncate
+            if valid < size:
+                f_handle.truncate(valid)
+                log_message = ('''\
+Truncated {} bytes of incomplete data from cache segment {}\
+'''.format(size - valid, filepath))
+                log.log2warning(1056, log_message)
+
+        # Append to the newest segment
+        self._segment = segments[-1]
+        self._size = valid
+
+    def _checkpoint(self):
+        """Read the checkpoint.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple of (segment, offset)
+
+        """
+        # Initialize key variables
+        result = (0, 0)
+
+        # Read file
+        if os.path.isfile(self._checkpoint_file) is True:
+            try:
+                with open(self._checkpoint_file, 'r') as f_handle:
+                    _data = json.load(f_handle)
+                result = (int(_data['segment']), int(_data['offset']))
+            except:
+                log_message = ('''\
+Error reading cache checkpoint file {}. Replaying all cached data.\
+'''.format(self._checkpoint_file))
+                log.log2warning(1057, log_message)
+
+        # Return
+        return result
+
+    def _segments(self):
+        """Get the numbers of all segments, oldest first.
+
+        Args:
+            None
+
+        Returns:
+            result: Sorted list of segment numbers
+
+        """
+        # Return
+        result = sorted([
+            int(filename[:-len(_SUFFIX)]) for filename in os.listdir(
+                self._directory) if filename.endswith(_SUFFIX)])
+        return result
+
+    def _filepath(self, number):
+        """Get the filepath of a segment.
+
+        Args:
+            number: Segment number
+
+        Returns:
+            result: Filepath
+
+        """
+        # Return
+        result = os.path.join(
+            self._directory, '{:020d}{}'.format(number, _SUFFIX))
+        return result
+
+    @contextmanager
+    def _locked(self):
+        """Lock the log against other threads and processes.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            with open(self._lockfile, 'a') as f_handle:
+                fcntl.flock(f_handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f_handle, fcntl.LOCK_UN)
+
+
+class Payload():
+    """JSON data serialized once, for both posting and caching.
+
+    The data is serialized incrementally, and compressed if required. The
+    result is stored in memory, or in a temporary file if it is large, so
+    that memory use doesn't grow with the size of the data. Iterating over
+    the object yields the serialized bytes in chunks. The same chunks can be
+    posted as an HTTP request body and appended to a SegmentLog.
+
+    """
+
+    def __init__(self, data, encoding=None, minimum=0, spool_size=1048576):
+        """Initialize the class.
+
+        Args:
+            data: JSON serializable data
+            encoding: Compression encoding provided by
+                pattoo_shared.compression.encoding(). None disables
+                compression.
+            minimum: Minimum size in bytes of the data to compress
+            spool_size: Size in bytes after which the serialized data is
+                moved from memory to a temporary file
+
+        Returns:
+            None
+
+        Variables:
+            self.encoding: Compression encoding used, or None
+            self.flags: Record flags describing the compression
+            self.checksum: CRC32 of the flags and the serialized data
+
+        """
+        # Initialize key variables
+        self.encoding = None
+        self._size = 0
+        self._chunks = []
+        self._file = None
+        self._spool_size = spool_size
+        chunks = _iterencode(data)
+
+        # Read enough data to decide whether it is worth compressing
+        head = []
+        length = 0
+        for chunk in chunks:
+            head.append(chunk)
+            length += len(chunk)
+            if length >= minimum:
+                break
+        if encoding is not None and length >= minimum:
+            self.encoding = encoding
+        compressor = compression.compressor(self.encoding)
+        self.flags = _FLAGS[self.encoding]
+        self.checksum = zlib.crc32(bytes([self.flags]))
+
+        # Serialize
+        for chunk in head:
+            self._write(chunk, compressor)
+        for chunk in chunks:
+            self._write(chunk, compressor)
+        if compressor is not None:
+            self._write(compressor.flush())
+
+    def __len__(self):
+        """Get the size of the serialized data.
+
+        Args:
+            None
+
+        Returns:
+            result: Size in bytes
+
+        """
+        # Return
+        result = self._size
+        return result
+
+    def __iter__(self):
+        """Read the serialized data.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        Yields:
+            result: Bytes
+
+        """
+        # Read from memory
+        if self._file is None:
+            for chunk in self._chunks:
+                yield chunk
+            return
+
+        # Read from the temporary file
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(65536)
+            if bool(chunk) is False:
+                break
+            yield chunk
+
+    def __del__(self):
+        """Remove the temporary file.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, chunk, compressor=None):
+        """Store serialized data.
+
+        Args:
+            chunk: Bytes to store
+            compressor: Object provided by
+                pattoo_shared.compression.compressor(). None if the
+                bytes aren't to be compressed.
+
+        Returns:
+            None
+
+        """
+        # Compress
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if bool(chunk) is False:
+            return
+
+        # Store
+        self.checksum = zlib.crc32(chunk, self.checksum)
+        self._size += len(chunk)
+        if self._file is None:
+            self._chunks.append(chunk)
+
+            # Move to a temporary file
+            if self._size > self._spool_size:
+                self._file = tempfile.TemporaryFile()
+                for item in self._chunks:
+                    self._file.write(item)
+                self._chunks = []
+        else:
+            self._file.write(chunk)
+
+
+def _iterencode(data, chunk_size=65536):
+    """Serialize data to JSON incrementally.
+
+    The output is identical to json.dumps(). The outer levels of the data
+    are serialized one item at a time, and their contents with json.dumps(),
+    which is much faster than json.JSONEncoder().iterencode().
+
+    Args:
+        data: JSON serializable data
+        chunk_size: Approximate size in bytes of the chunks to return
+
+    Returns:
+        None
+
+    Yields:
+        result: Bytes
+
+    """
+    # Initialize key variables
+    buffer = []
+    length = 0
+
+    # Group the serialized data into chunks
+    for item in _iterencode_items(data, 3):
+        buffer.append(item)
+        length += len(item)
+        if length >= chunk_size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            length = 0
+    if bool(buffer) is True:
+        yield ''.join(buffer).encode()
+
+
+def _iterencode_items(data, depth):
+    """Serialize data to JSON strings, one item at a time.
+
+    Args:
+        data: JSON serializable data
+        depth: Number of levels of nested dicts and lists to serialize one
+            item at a time
+
+    Returns:
+        None
+
+    Yields:
+        result: String
+
+    """
+    # Serialize
+    if depth > 0 and isinstance(data, dict) is True and bool(data) is True:
+        separator = '{'
+        for key, value in data.items():
+            yield '{}{}: '.format(separator, _key(key))
+            yield from _iterencode_items(value, depth - 1)
+            separator = ', '
+        yield '}'
+    elif depth > 0 and isinstance(
+            data, (list, tuple)) is True and bool(data) is True:
+        separator = '['
+        for value in data:
+            yield separator
+            yield from _iterencode_items(value, depth - 1)
+            separator = ', '
+        yield ']'
+    else:
+        yield json.dumps(data)
+
+
+def _key(key):
+    """Serialize a dict key to JSON the same way json.dumps() does.
+
+    Args:
+        key: Key
+
+    Returns:
+        result: String
+
+    """
+    # Convert keys to strings
+    if key is True:
+        key = 'true'
+    elif key is False:
+        key = 'false'
+    elif key is None:
+        key = 'null'
+    elif isinstance(key, (int, float)) is True:
+        key = json.dumps(key)
+    elif isinstance(key, str) is False:
+        raise TypeError(
+            'Keys must be str, int, float, bool or None, not {}'.format(
+                key.__class__.__name__))
+
+    # Return
+    result = json.dumps(key)
+    return result
+
+
+def _header(payload):
+    """Create the header of a log record.
+
+    Args:
+        payload: Payload object to store in the record
+
+    Returns:
+        result: Bytes of the header
+
+    """
+    # Return
+    result = _HEADER.pack(
+        _MAGIC, payload.flags, len(payload), payload.checksum)
+    return result
+
+
+def _records(f_handle, filepath, start=0):
+    """Decode log records.
+
+    Records are read from the segment one at a time. Data that is not part
+    of a complete, valid record is skipped.
+
+    Args:
+        f_handle: Segment file opened in binary mode
+        filepath: Name of the segment file. Used for logging.
+        start: Offset in the segment from which to read
+
+    Returns:
+        None
+
+    Yields:
+        result: Tuple of (payload, flags, start, end) where "start" and
+            "end" are the offsets of the record in the segment
+
+    """
+    # Initialize key variables. Records appended while reading are left
+    # for the next read.
+    offset = start
+    size = os.fstat(f_handle.fileno()).st_size
+
+    while offset + _HEADER.size <= size:
+        # Decode the header
+        f_handle.seek(offset)
+        (magic, flags, length, checksum) = _HEADER.unpack(
+            f_handle.read(_HEADER.size))
+        end = offset + _HEADER.size + length
+        if magic == _MAGIC and end <= size:
+            payload = f_handle.read(length)
+            if zlib.crc32(payload, zlib.crc32(bytes([flags]))) == checksum:
+                yield (payload, flags, offset, end)
+                offset = end
+                continue
+
+        # Skip to the next record
+        skip = _find(f_handle, offset + 1, size)
+        if skip == -1:
+            break
+        log_message = ('''\
+Skipping {} bytes of corrupted data in cache segment {}\
+'''.format(skip - offset, filepath))
+        log.log2warning(1058, log_message)
+        offset = skip
+
+
+def _find(f_handle, offset, size, chunk_size=65536):
+    """Find the next record magic number in a segment.
+
+    Args:
+        f_handle: Segment file opened in binary mode
+        offset: Offset from which to search
+        size: Offset at which to stop searching
+        chunk_size: Number of bytes to read at a time
+
+    Returns:
+        result: Offset of the magic number, or -1 if it isn't found
+
+    """
+    # Read chunks that overlap so that magic numbers split across chunks
+    # are found
+    while size - offset >= len(_MAGIC):
+        f_handle.seek(offset)
+        chunk = f_handle.read(min(chunk_size, size - offset))
+        index = chunk.find(_MAGIC)
+        if index != -1:
+            return offset + index
+        if len(chunk) < len(_MAGIC):
+            break
+        offset += len(chunk) - len(_MAGIC) + 1
+
+    # Return
+    return -1
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Pattoo data compression library."""
+
+# Standard libraries
+import gzip
+import zlib
+
+# PIP libraries. zstandard is optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Pattoo libraries
+from pattoo_shared import log
+
+
+def encoding(name):
+    """Get the supported compression encoding matching a name.
+
+    Args:
+        name: Name of the encoding, usually from the configuration
+
+    Returns:
+        result: 'gzip', 'zstd' or None if no compression is to be used
+
+    """
+    # Initialize key variables
+    result = None
+    value = '{}'.format(name).strip().lower()
+
+    # Get encoding
+    if value in ['gzip', 'zstd']:
+        result = value
+    elif value not in ['', 'none', 'false', 'identity']:
+        log_message = ('''\
+Unsupported compression "{}". Data will not be compressed.\
+'''.format(name))
+        log.log2warning(1076, log_message)
+
+    # Use gzip if the zstandard package isn't installed
+    if result == 'zstd' and zstandard is None:
+        log_message = ('''\
+The "zstandard" PIP package is not installed. Using gzip compression.''')
+        log.log2warning(1077, log_message)
+        result = 'gzip'
+
+    # Return
+    return result
+
+
+def supported(encoding):
+    """Determine whether data compressed with an encoding can be decompressed.
+
+    Args:
+        encoding: Name of the encoding. None if the data isn't compressed.
+
+    Returns:
+        result: True if supported
+
+    """
+    # zstd needs the optional zstandard package
+    result = encoding in [None, 'gzip']
+    if encoding == 'zstd':
+        result = zstandard is not None
+    return result
+
+
+def compressor(encoding):
+    """Get an object that compresses data incrementally.
+
+    Args:
+        encoding: Encoding provided by encoding()
+
+    Returns:
+        result: Object with compress() and flush() methods, or None if no
+            compression is to be used
+
+    """
+    # Get compressor. A wbits value of 31 creates gzip formatted data.
+    if encoding == 'gzip':
+        result = zlib.compressobj(6, zlib.DEFLATED, 31)
+    elif encoding == 'zstd':
+        result = zstandard.ZstdCompressor().compressobj()
+    else:
+        result = None
+    return result
+
+
+def decompress(payload, encoding):
+    """Decompress data.
+
+    Args:
+        payload: Bytes to decompress
+        encoding: Encoding used by compressor()
+
+    Returns:
+        result: Decompressed bytes
+
+    """
+    # Decompress. zstd frames created by compressor() don't contain the
+    # content size, so they must be decompressed incrementally.
+    if encoding == 'gzip':
+        result = gzip.decompress(payload)
+    elif encoding == 'zstd':
+        result = zstandard.ZstdDecompressor().decompressobj().decompress(
+            payload)
+    else:
+        result = payload
+    return result
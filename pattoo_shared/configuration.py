@@ -3,6 +3,7 @@
 
 # Standard imports
 import os
+import signal
 
 # Import project libraries
 from pattoo_shared import files
@@ -12,10 +13,87 @@ from pattoo_shared.constants import (
     PATTOO_API_AGENT_PREFIX, PATTOO_API_WEB_PREFIX)
 from pattoo_shared.variables import PollingPoint
 
+# Configuration files parsed by the process, keyed by file path. Each value
+# is a tuple of the file's os.stat() signature and its read only contents.
+# The generation changes whenever files are parsed again.
+_CONFIGS = {}
+_GENERATION = {'value': 0}
+
+
+class _ReadOnlyDict(dict):
+    """Dict of configuration values shared by all readers of a file."""
+
+    def _read_only(self, *args, **kwargs):
+        """Prevent changes.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        raise TypeError('Configuration is read only')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        """Copy or pickle as a dict that can be changed.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple for the pickle protocol
+
+        """
+        # Return
+        result = (dict, (dict(self),))
+        return result
+
+
+class _ReadOnlyList(list):
+    """List of configuration values shared by all readers of a file."""
+
+    def _read_only(self, *args, **kwargs):
+        """Prevent changes.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        raise TypeError('Configuration is read only')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = _read_only
+    sort = reverse = _read_only
+
+    def __reduce__(self):
+        """Copy or pickle as a list that can be changed.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple for the pickle protocol
+
+        """
+        # Return
+        result = (list, (list(self),))
+        return result
+
 
 def _config_reader(filename):
     """Read a configuration file.
 
+    Files are only parsed again if they have changed since they were last
+    read, or after reload() is called. The result is shared by the process,
+    so it can't be changed.
+
     Args:
         filename: Name of file to read
 
@@ -28,10 +106,118 @@ def _config_reader(filename):
     _config_directory = log.check_environment()
     config_directory = os.path.expanduser(_config_directory)
     config_file = '{}{}{}'.format(config_directory, os.sep, filename)
-    config_dict = files.read_yaml_file(config_file)
+
+    # Let read_yaml_file() report files that can't be found
+    try:
+        status = os.stat(config_file)
+    except OSError:
+        config_dict = _read_only_copy(files.read_yaml_file(config_file))
+        return config_dict
+    signature = (
+        status.st_dev, status.st_ino, status.st_size, status.st_mtime_ns)
+
+    # Use the previous result if the file hasn't changed
+    cached = _CONFIGS.get(config_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    config_dict = _read_only_copy(files.read_yaml_file(config_file))
+    _CONFIGS[config_file] = (signature, config_dict)
+    _GENERATION['value'] += 1
     return config_dict
 
 
+def _read_only_copy(value):
+    """Create a read only copy of YAML data.
+
+    Args:
+        value: YAML data
+
+    Returns:
+        result: Copy with _ReadOnlyDict and _ReadOnlyList objects replacing
+            dicts and lists
+
+    """
+    # Return
+    if isinstance(value, dict) is True:
+        result = _ReadOnlyDict(
+            (key, _read_only_copy(item)) for key, item in value.items())
+    elif isinstance(value, list) is True:
+        result = _ReadOnlyList(_read_only_copy(item) for item in value)
+    else:
+        result = value
+    return result
+
+
+def reload():
+    """Read configuration files again when they are next used.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Clear the parsed files
+    _CONFIGS.clear()
+    _GENERATION['value'] += 1
+
+
+def generation():
+    """Get a number that changes whenever the configuration changes.
+
+    Modules that keep values derived from the configuration compare this
+    with its value when they last read the configuration. Only files read
+    since then are checked for changes, so create a Config object before
+    calling this.
+
+    Args:
+        None
+
+    Returns:
+        result: Generation number
+
+    """
+    # Return
+    result = _GENERATION['value']
+    return result
+
+
+def reload_on_sighup():
+    """Read configuration files again after the process receives SIGHUP.
+
+    This must be called from the main thread. Any previous SIGHUP handler
+    is still called.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def handler(signum, frame):
+        """Handle SIGHUP.
+
+        Args:
+            signum: Signal number
+            frame: Current stack frame
+
+        Returns:
+            None
+
+        """
+        reload()
+        if callable(previous) is True:
+            previous(signum, frame)
+
+    # Set handler
+    signal.signal(signal.SIGHUP, handler)
+
+
 class BaseConfig():
     """Class gathers all configuration information."""
 
@@ -362,6 +548,368 @@ class Config(BaseConfig):
             result = int(intermediate)
         return result
 
+    def agent_api_pool_size(self):
+        """Get agent_api_pool_size.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum number of persistent connections to keep open to
+                the pattoo server
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'pool_size'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 10
+        else:
+            result = max(1, int(intermediate))
+        return result
+
+    def agent_api_idle_timeout(self):
+        """Get agent_api_idle_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds an unused persistent connection to the pattoo
+                server is kept open before being discarded
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'idle_timeout'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 60
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_batch_size_bytes(self):
+        """Get agent_api_batch_size_bytes.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum size in bytes of cached data to replay to the
+                pattoo server in a single post
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'batch_size_bytes'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 5242880
+        else:
+            result = max(1, int(intermediate))
+        return result
+
+    def agent_api_batch_size_datapoints(self):
+        """Get agent_api_batch_size_datapoints.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum number of cached datapoints to replay to the
+                pattoo server in a single post
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'batch_size_datapoints'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 50000
+        else:
+            result = max(1, int(intermediate))
+        return result
+
+    def agent_api_queue_size(self):
+        """Get agent_api_queue_size.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum number of posts waiting to be sent to the pattoo
+                server in the background
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'queue_size'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 100
+        else:
+            result = max(1, int(intermediate))
+        return result
+
+    def agent_api_backoff_initial(self):
+        """Get agent_api_backoff_initial.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds to wait before contacting the pattoo server again
+                after it first fails to accept posts
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'backoff_initial'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 1
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_backoff_maximum(self):
+        """Get agent_api_backoff_maximum.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum seconds to wait before contacting the pattoo
+                server again after repeated failures to accept posts
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'backoff_maximum'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 300
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_connect_timeout(self):
+        """Get agent_api_connect_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds to wait when connecting to a remote
+                HTTP server
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'connect_timeout'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 10
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_read_timeout(self):
+        """Get agent_api_read_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds to wait for a remote HTTP server to send
+                data
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'read_timeout'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 30
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_cycle_timeout(self):
+        """Get agent_api_cycle_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: Maximum seconds spent getting, posting and
+                purging data in a single relay or post cycle
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'cycle_timeout'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 120
+        else:
+            result = abs(float(intermediate))
+        return result
+
+    def agent_api_compression(self):
+        """Get agent_api_compression.
+
+        Args:
+            None
+
+        Returns:
+            result: Compression to use for posted and cached data. One of
+                "none", "gzip" or "zstd"
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'compression'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 'none'
+        else:
+            result = '{}'.format(intermediate).lower()
+        return result
+
+    def agent_api_compression_minimum(self):
+        """Get agent_api_compression_minimum.
+
+        Args:
+            None
+
+        Returns:
+            result: Minimum size in bytes of posted and cached data before
+                it is compressed
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'compression_minimum'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 1024
+        else:
+            result = abs(int(intermediate))
+        return result
+
+    def agent_api_dictionary(self):
+        """Get agent_api_dictionary.
+
+        Args:
+            None
+
+        Returns:
+            result: True if key-value pairs posted to the server are shared
+                with it across posts using a converter.PairDictionary
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'dictionary'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = False
+        else:
+            result = '{}'.format(intermediate).lower() in [
+                'true', 'yes', '1']
+        return result
+
+    def agent_api_delta(self):
+        """Get agent_api_delta.
+
+        Args:
+            None
+
+        Returns:
+            result: True if only datapoints with changed values are posted
+                to the server using a converter.Delta
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'delta'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = False
+        else:
+            result = '{}'.format(intermediate).lower() in [
+                'true', 'yes', '1']
+        return result
+
+    def agent_api_delta_keyframe(self):
+        """Get agent_api_delta_keyframe.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of posts between posts of all datapoints when
+                only posting changed values
+
+        """
+        # Initialize key variables
+        key = 'pattoo_agent_api'
+        sub_key = 'delta_keyframe'
+
+        # Get result
+        intermediate = search(
+            key, sub_key, self._base_yaml_configuration, die=False)
+        if intermediate is None:
+            result = 10
+        else:
+            result = max(1, abs(int(intermediate)))
+        return result
+
     def agent_api_uri(self):
         """Get agent_api_uri.
 
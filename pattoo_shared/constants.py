@@ -17,6 +17,15 @@ DATA_COUNT = 32
 DATA_STRING = 2
 DATA_NONE = None
 
+# DataPoint checksum modes. CHECKSUM_COMPATIBLE creates the same checksums
+# as earlier versions of pattoo. CHECKSUM_CANONICAL is faster, but creates
+# different checksums, and therefore new datapoints on the pattoo server.
+# CHECKSUM_FAST is the same as CHECKSUM_CANONICAL, but uses shorter 128 bit
+# BLAKE2b hashes that are faster to create than SHA-256 hashes.
+CHECKSUM_COMPATIBLE = 'compatible'
+CHECKSUM_CANONICAL = 'canonical'
+CHECKSUM_FAST = 'fast'
+
 ###############################################################################
 # Constants for data DB ingestion
 ###############################################################################
@@ -42,6 +51,16 @@ RESERVED_KEYS = tuple(_)
 PattooDBrecord = collections.namedtuple(
     'PattooDBrecord', ' '.join(RESERVED_KEYS))
 
+# Result of relaying data from a passive agent. "success" is False only if
+# "status" is RELAY_FAILED.
+RelayResult = collections.namedtuple(
+    'RelayResult', 'identifier url success latency status')
+
+# Status of relaying data from a passive agent
+RELAY_POSTED = 'posted'
+RELAY_UNCHANGED = 'unchanged'
+RELAY_FAILED = 'failed'
+
 # Keys of posted cached data. Based on keys in
 # pattoo_shared.constants.PostingDataPoints
 CACHE_KEYS = (
@@ -3,11 +3,14 @@
 
 # Standard imports
 import re
+import uuid
+import hashlib
+import functools
 
 # Pattoo libraries
 from .variables import (
     ConverterMetadata, DataPoint, AgentPolledData,
-    PostingDataPoints)
+    PostingDataPoints, MetadataSet)
 from .constants import (
     DATA_FLOAT, DATA_INT, DATA_COUNT64, DATA_COUNT, DATA_STRING, DATA_NONE,
     MAX_KEYPAIR_LENGTH, PattooDBrecord, RESERVED_KEYS, CACHE_KEYS,
@@ -15,6 +18,18 @@ from .constants import (
 from pattoo_shared import data
 from pattoo_shared import log
 
+# Keys of key-value pairs that change every time data is polled
+_VOLATILE_KEYS = ('pattoo_value', 'pattoo_timestamp')
+
+# Keys of cached key-value pairs that are not pattoo_metadata
+_RESERVED_KEYS_NON_METADATA = tuple(
+    _ for _ in RESERVED_KEYS if _ != 'pattoo_metadata')
+
+_NON_METADATA_KEYS = frozenset(_RESERVED_KEYS_NON_METADATA)
+
+# Keys required to create a PattooDBrecord from cached key-value pairs
+_REQUIRED_KEYS = _RESERVED_KEYS_NON_METADATA + AGENT_METADATA_KEYS
+
 
 class Counter():
     """Count and format datapoint key-value pairs."""
@@ -58,6 +73,401 @@ class Counter():
         return result
 
 
+class PairDictionary(Counter):
+    """Key-value pair IDs shared by an agent and the server across posts.
+
+    Most key-value pairs are posted by an agent every polling cycle. Agents
+    and servers that share a PairDictionary only post new pairs, and refer
+    to the others by ID. The values and timestamps of datapoints change
+    every cycle, so they are posted with temporary IDs that are not added
+    to the dictionary.
+
+    Each dictionary has a random version. The server must reject data with
+    a version or base it doesn't know, and the agent must then reset its
+    dictionary. Agents only add the pairs of a post to their dictionary
+    after the server accepts it.
+
+    """
+
+    def __init__(self, maximum=1048576):
+        """Initialize the class.
+
+        Args:
+            maximum: Maximum number of pairs in the dictionary. Agents reset
+                dictionaries that become larger.
+
+        Returns:
+            None
+
+        Variables:
+            self.version: Random version of the dictionary
+            self._committed: Number of pairs known by the server
+
+        """
+        # Initialize key variables
+        Counter.__init__(self)
+        self._maximum = maximum
+        self.reset()
+
+    def reset(self, version=None):
+        """Remove all the pairs from the dictionary.
+
+        Args:
+            version: Version of the new dictionary. Random if None.
+
+        Returns:
+            None
+
+        """
+        # Reset
+        if version is None:
+            version = uuid.uuid4().hex
+        self.version = version
+        self.pairs = {}
+        self.inverse_pairs = {}
+        self._count = 0
+        self._committed = 0
+
+    def encode(self, _data):
+        """Replace the known key-value pairs of posting data with IDs.
+
+        Pairs added to the dictionary by encode() are only kept if commit()
+        is called after the server accepts the data.
+
+        Args:
+            _data: Dict created by posting_data_points(), or read from the
+                agent cache
+
+        Returns:
+            result: Dict of data to post. It contains the version of the
+                dictionary, the number of pairs the server must already
+                know ("base") and the number of pairs in the dictionary
+                after the server adds the new ones ("size").
+
+        """
+        # Initialize key variables
+        ids = {}
+        temporary = []
+        key_value_pairs = {}
+        datapoints = _data['pattoo_datapoints']
+
+        # Don't let dictionaries grow forever
+        if self._count > self._maximum:
+            self.reset()
+        base = self._committed
+
+        # Assign IDs to pairs. Pair IDs are keyed by string integers in JSON
+        # cache files.
+        for pair_id, (key, value) in datapoints['key_value_pairs'].items():
+            if key in _VOLATILE_KEYS:
+                temporary.append((str(pair_id), (key, value)))
+            else:
+                ids[str(pair_id)] = self.counter(key, value)
+        for new_id in range(base, self._count):
+            key_value_pairs[new_id] = self.inverse_pairs[new_id]
+        size = self._count
+        for new_id, (pair_id, pair) in enumerate(temporary, start=size):
+            ids[pair_id] = new_id
+            key_value_pairs[new_id] = pair
+
+        # Return
+        result = dict(_data)
+        result['pattoo_datapoints'] = {
+            'key_value_pairs': key_value_pairs,
+            'datapoint_pairs': [
+                [ids[str(pair_id)] for pair_id in pair_ids]
+                for pair_ids in datapoints['datapoint_pairs']]}
+        result['pattoo_dictionary'] = {
+            'version': self.version, 'base': base, 'size': size}
+        return result
+
+    def commit(self):
+        """Keep the pairs added by encode() after the server accepts them.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Commit
+        self._committed = self._count
+
+    def rollback(self):
+        """Remove the pairs added by encode() if the server didn't get them.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Remove uncommitted pairs
+        for pair_id in range(self._committed, self._count):
+            del self.pairs[self.inverse_pairs.pop(pair_id)]
+        self._count = self._committed
+
+    def decode(self, _data):
+        """Recreate posting data encoded by an agent's PairDictionary.
+
+        This is used by servers. Each agent needs its own PairDictionary.
+
+        Args:
+            _data: Dict created by encode()
+
+        Returns:
+            result: Dict of data with the same structure as that created by
+                posting_data_points(). None if the data refers to pairs
+                that are not in the dictionary. The agent must then reset
+                its dictionary.
+
+        """
+        # Initialize key variables
+        counter = Counter()
+        temporary = {}
+
+        # Verify input data
+        try:
+            dictionary = _data['pattoo_dictionary']
+            (version, base, size) = (
+                dictionary['version'], int(dictionary['base']),
+                int(dictionary['size']))
+            key_value_pairs = _data['pattoo_datapoints']['key_value_pairs']
+            datapoint_pairs = _data['pattoo_datapoints']['datapoint_pairs']
+        except:
+            return None
+
+        # Agents reset their dictionary by posting all its pairs
+        if base == 0:
+            self.reset(version=version)
+        if version != self.version or base > self._count:
+            return None
+
+        # Forget pairs the agent didn't know were received
+        self._committed = base
+        self.rollback()
+
+        # Add the new pairs. Pair IDs are keyed by string integers in JSON.
+        try:
+            for pair_id in sorted(int(_) for _ in key_value_pairs.keys()):
+                pair = key_value_pairs.get(pair_id)
+                if pair is None:
+                    pair = key_value_pairs[str(pair_id)]
+                (key, value) = pair
+                if pair_id >= size:
+                    temporary[pair_id] = (key, value)
+                elif pair_id != self.counter(key, value):
+                    return None
+            self.commit()
+
+            # Renumber the pair IDs of each datapoint
+            all_dps = []
+            for pair_ids in datapoint_pairs:
+                dp_pair_ids = []
+                for pair_id in pair_ids:
+                    pair_id = int(pair_id)
+                    if pair_id >= size:
+                        (key, value) = temporary[pair_id]
+                    else:
+                        (key, value) = self.inverse_pairs[pair_id]
+                    dp_pair_ids.append(counter.counter(key, value))
+                all_dps.append(dp_pair_ids)
+        except:
+            return None
+
+        # Return
+        result = dict(_data)
+        del result['pattoo_dictionary']
+        result['pattoo_datapoints'] = {
+            'key_value_pairs': counter.inverse_pairs,
+            'datapoint_pairs': all_dps}
+        return result
+
+
+class Delta():
+    """Values of datapoints posted by an agent, used to post only changes.
+
+    Many datapoints, such as string values and slowly changing counters,
+    have the same value every polling cycle. Agents using a Delta only post
+    datapoints whose values have changed since they were last posted. All
+    datapoints are posted in periodic keyframes, and whenever the Delta is
+    reset, so that servers can resynchronize.
+
+    Each Delta has a random version, and each post a sequence number. The
+    server must reject deltas with a version or sequence it doesn't expect,
+    and the agent must then reset its Delta. Agents only update the values
+    of a Delta after the server accepts a post.
+
+    """
+
+    def __init__(self, keyframe=10):
+        """Initialize the class.
+
+        Args:
+            keyframe: Number of posts between keyframes
+
+        Returns:
+            None
+
+        Variables:
+            self.version: Random version of the Delta
+            self.sequence: Sequence number of the next post
+            self.values: Dict of the last posted values keyed by datapoint
+                checksum
+
+        """
+        # Initialize key variables
+        self._keyframe = max(1, int(keyframe))
+        self.reset()
+
+    def reset(self, version=None):
+        """Forget the values of all datapoints.
+
+        Args:
+            version: Version of the new Delta. Random if None.
+
+        Returns:
+            None
+
+        """
+        # Reset
+        if version is None:
+            version = uuid.uuid4().hex
+        self.version = version
+        self.sequence = 0
+        self.values = {}
+        self._pending = None
+
+    def encode(self, _data):
+        """Remove datapoints with unchanged values from posting data.
+
+        The values of the data are only used by later posts if commit() is
+        called after the server accepts the data.
+
+        Args:
+            _data: Dict created by posting_data_points(), or read from the
+                agent cache
+
+        Returns:
+            result: Dict of data to post. It contains the version of the
+                Delta, the sequence number of the post and whether it is a
+                keyframe.
+
+        """
+        # Initialize key variables
+        counter = Counter()
+        all_dps = []
+        values = {}
+        keyframe = self.sequence % self._keyframe == 0
+        datapoints = _data['pattoo_datapoints']
+
+        # Pair IDs are keyed by string integers in JSON cache files
+        key_value_pairs = {
+            str(pair_id): pair
+            for pair_id, pair in datapoints['key_value_pairs'].items()}
+
+        for pair_ids in datapoints['datapoint_pairs']:
+            # Get the datapoint's checksum and value
+            pairs = [key_value_pairs[str(_)] for _ in pair_ids]
+            item = dict(pairs)
+            checksum = item.get('pattoo_checksum')
+            value = item.get('pattoo_value')
+
+            # Only post changed values, unless this is a keyframe
+            if checksum is not None:
+                values[checksum] = value
+                if False not in [
+                        keyframe is False,
+                        checksum in self.values,
+                        self.values.get(checksum) == value]:
+                    continue
+            all_dps.append([
+                counter.counter(key, value) for key, value in pairs])
+
+        # Return
+        self._pending = (keyframe, values)
+        result = dict(_data)
+        result['pattoo_datapoints'] = {
+            'key_value_pairs': counter.inverse_pairs,
+            'datapoint_pairs': all_dps}
+        result['pattoo_delta'] = {
+            'version': self.version, 'sequence': self.sequence,
+            'keyframe': keyframe}
+        return result
+
+    def commit(self):
+        """Keep the values posted by encode() after the server accepts them.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Keyframes contain the values of all current datapoints
+        if self._pending is not None:
+            (keyframe, values) = self._pending
+            if keyframe is True:
+                self.values = values
+            else:
+                self.values.update(values)
+            self.sequence += 1
+        self._pending = None
+
+    def rollback(self):
+        """Forget the values posted by encode() if the server didn't get them.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Rollback
+        self._pending = None
+
+    def decode(self, _data):
+        """Verify that a server hasn't missed any posts from an agent's Delta.
+
+        This is used by servers. Each agent needs its own Delta.
+
+        Args:
+            _data: Dict created by encode()
+
+        Returns:
+            result: Dict of the posted data with the same structure as that
+                created by posting_data_points(). None if the server has
+                missed posts since the last keyframe, or never received
+                one. The agent must then reset its Delta.
+
+        """
+        # Verify input data
+        try:
+            delta = _data['pattoo_delta']
+            (version, sequence, keyframe) = (
+                delta['version'], int(delta['sequence']),
+                bool(delta['keyframe']))
+        except:
+            return None
+
+        # Keyframes resynchronize the server. Posts that were accepted, but
+        # that the agent didn't know were received, may be posted again.
+        if keyframe is True:
+            self.reset(version=version)
+        elif version != self.version or sequence > self.sequence:
+            return None
+        self.sequence = max(self.sequence, sequence + 1)
+
+        # Return
+        result = dict(_data)
+        del result['pattoo_delta']
+        return result
+
+
 def cache_to_keypairs(_data):
     """Convert agent cache data to AgentPolledData object.
 
@@ -117,27 +527,33 @@ def cache_to_keypairs(_data):
     # Prepare for datapoint processing
     key_value_pairs = _data['pattoo_datapoints']['key_value_pairs']
     datapoint_pairs = _data['pattoo_datapoints']['datapoint_pairs']
+    (table, pairs) = _pair_table(key_value_pairs)
+    size = len(table)
 
     # Process each datapoint
     for pair_ids in datapoint_pairs:
         item = {}
+        entries = {}
 
         # Validate and assign key-values from datapoints
         for pair_id in pair_ids:
             # Lookup on a string of pair_id as the JSON in the cache file is
-            # keyed by string integers
-            _kv = key_value_pairs.get(str(pair_id))
-            if isinstance(_kv, list) is False:
+            # keyed by string integers. Integer pair_ids use the table.
+            if type(pair_id) is int and 0 <= pair_id < size:
+                entry = table[pair_id]
+            else:
+                entry = pairs.get(str(pair_id))
+            if entry is None:
                 log.log2warning(1046, _log_message)
                 return []
-            if len(_kv) != 2:
+            if bool(entry) is False:
                 log.log2warning(1045, _log_message)
                 return []
-            (key, value) = _kv
-            item[key] = value
+            item[entry[0]] = entry[1]
+            entries[entry[0]] = entry
 
         # Assign datapoint values to PattooDBrecord
-        pattoo_db_variable = _make_pattoo_db_record(item)
+        pattoo_db_variable = _make_pattoo_db_record(item, entries=entries)
         if bool(pattoo_db_variable) is True:
             result.append(pattoo_db_variable)
 
@@ -145,23 +561,66 @@ def cache_to_keypairs(_data):
     return result
 
 
-def _make_pattoo_db_record(item):
+def _pair_table(key_value_pairs):
+    """Index the key-value pairs of agent cache data.
+
+    Args:
+        key_value_pairs: Dict of key-value pairs keyed by string pair ID
+
+    Returns:
+        result: Tuple of (table, pairs). "table" is a list of entries
+            indexed by integer pair ID, and "pairs" a dict of all entries
+            keyed by string pair ID. Entries are [key, value, keypairs]
+            lists, where "keypairs" caches the result of _keypairs() for the
+            pair. Pairs that are not lists have a None entry, and those of
+            the wrong length an empty list.
+
+    """
+    # Initialize key variables
+    pairs = {}
+    table = [None] * len(key_value_pairs)
+
+    # Validate each pair once
+    for pair_id, _kv in key_value_pairs.items():
+        # Only string pair IDs can be looked up
+        if isinstance(pair_id, str) is False:
+            continue
+        if isinstance(_kv, list) is False:
+            entry = None
+        elif len(_kv) != 2:
+            entry = []
+        else:
+            entry = [_kv[0], _kv[1], None]
+        pairs[pair_id] = entry
+
+        # Add pair IDs that are also the string of an integer to the table
+        if pair_id.isdecimal() is True:
+            index = int(pair_id)
+            if str(index) == pair_id and index < len(table):
+                table[index] = entry
+
+    # Return
+    result = (table, pairs)
+    return result
+
+
+def _make_pattoo_db_record(item, entries=None):
     """Ingest data.
 
     Args:
         item: Dict of key-value pairs DataPoint
+        entries: Dict of the _pair_table() entries of the key-value pairs
+            keyed by key. Used to calculate the _keypairs() of each pair
+            only once.
 
     Returns:
         pattoo_db_variable: PattooDBrecord object
 
     """
     # Initialize data
-    valids = []
     pattoo_db_variable = None
     _log_message = 'Invalid cache data.'
-    reserved_keys_non_metadata = [
-        _ for _ in RESERVED_KEYS if _ != 'pattoo_metadata']
-    metadata = {}
+    metadata = []
 
     '''
     Make sure we have all keys required for creating a PattooDBrecord
@@ -169,47 +628,49 @@ def _make_pattoo_db_record(item):
     extracted to its component key-value pairs before the agent posted it to
     the pattoo API
     '''
-    for key in reserved_keys_non_metadata:
-        valids.append(key in item.keys())
-    for key in AGENT_METADATA_KEYS:
-        valids.append(key in item.keys())
-    if False in valids:
-        log.log2warning(1047, _log_message)
-        return None
+    for key in _REQUIRED_KEYS:
+        if key not in item:
+            log.log2warning(1047, _log_message)
+            return None
 
     # Get metadata for item
-    for key, value in sorted(item.items()):
-        if key not in reserved_keys_non_metadata:
-            metadata[key] = value
-            valids.append(isinstance(key, str))
-
-        # Work on the data_type
-        if key == 'pattoo_data_type':
-            valids.append(value in [
-                DATA_FLOAT, DATA_INT, DATA_COUNT64, DATA_COUNT,
-                DATA_STRING, DATA_NONE])
-
-    # Append to result
-    if False not in valids:
-        # Add the datasource to the original checksum for better uniqueness
-        checksum = _checksum(
-            item['pattoo_agent_id'],
-            item['pattoo_agent_polled_target'],
-            item['pattoo_checksum'])
-        pattoo_db_variable = PattooDBrecord(
-            pattoo_checksum=checksum,
-            pattoo_key=item['pattoo_key'],
-            pattoo_agent_id=item['pattoo_agent_id'],
-            pattoo_agent_polling_interval=item[
-                'pattoo_agent_polling_interval'],
-            pattoo_timestamp=item['pattoo_timestamp'],
-            pattoo_data_type=item['pattoo_data_type'],
-            pattoo_value=item['pattoo_value'],
-            pattoo_agent_polled_target=item['pattoo_agent_polled_target'],
-            pattoo_agent_program=item['pattoo_agent_program'],
-            pattoo_agent_hostname=item['pattoo_agent_hostname'],
-            pattoo_metadata=_keypairs(metadata)
-        )
+    for key in sorted(item):
+        if key not in _NON_METADATA_KEYS:
+            if isinstance(key, str) is False:
+                return None
+            if entries is None:
+                metadata.extend(_keypairs({key: item[key]}))
+            else:
+                entry = entries[key]
+                if entry[2] is None:
+                    entry[2] = _keypairs({key: entry[1]})
+                metadata.extend(entry[2])
+
+    # Work on the data_type
+    if item['pattoo_data_type'] not in [
+            DATA_FLOAT, DATA_INT, DATA_COUNT64, DATA_COUNT,
+            DATA_STRING, DATA_NONE]:
+        return None
+
+    # Add the datasource to the original checksum for better uniqueness
+    checksum = _checksum(
+        item['pattoo_agent_id'],
+        item['pattoo_agent_polled_target'],
+        item['pattoo_checksum'])
+    pattoo_db_variable = PattooDBrecord(
+        pattoo_checksum=checksum,
+        pattoo_key=item['pattoo_key'],
+        pattoo_agent_id=item['pattoo_agent_id'],
+        pattoo_agent_polling_interval=item[
+            'pattoo_agent_polling_interval'],
+        pattoo_timestamp=item['pattoo_timestamp'],
+        pattoo_data_type=item['pattoo_data_type'],
+        pattoo_value=item['pattoo_value'],
+        pattoo_agent_polled_target=item['pattoo_agent_polled_target'],
+        pattoo_agent_program=item['pattoo_agent_program'],
+        pattoo_agent_hostname=item['pattoo_agent_hostname'],
+        pattoo_metadata=metadata
+    )
 
     # Return
     return pattoo_db_variable
@@ -239,25 +700,13 @@ def agentdata_to_datapoints(agentdata):
             if ddv.valid is False:
                 continue
 
+            # Create the metadata shared by all the target's DataPoints
+            metadata_set = _converter_metadata(agentdata, ddv.target)
+
             # Get data
-            for _dv in ddv.data:
+            for _dv in ddv.datapoints():
                 # Assign values to DataPoints
-                metadata = {
-                    True: {
-                        'pattoo_agent_id': agentdata.agent_id,
-                        'pattoo_agent_program': agentdata.agent_program,
-                        'pattoo_agent_hostname': agentdata.agent_hostname,
-                        'pattoo_agent_polled_target': ddv.target,
-                    },
-                    False: {
-                        'pattoo_agent_polling_interval': (
-                            agentdata.agent_polling_interval)
-                        }
-                }
-                for update_checksum, items in sorted(metadata.items()):
-                    for key, value in sorted(items.items()):
-                        _dv.add(ConverterMetadata(
-                            key, value, update_checksum=update_checksum))
+                _dv.add(metadata_set)
                 rows.append(_dv)
 
     # Return
@@ -322,6 +771,64 @@ def datapoints_to_dicts(items):
     return result
 
 
+def agentdata_to_dicts(agentdata):
+    """Convert AgentPolledData to a standardized dict for posting.
+
+    The result is the same as that of datapoints_to_dicts() using the
+    DataPoints from agentdata_to_datapoints(), but it is created in a single
+    pass without modifying the DataPoints.
+
+    Args:
+        agentdata: AgentPolledData object
+
+    Returns:
+        result: Dict of 'key_value_pairs' and 'pattoo_datapoints' dicts
+            key_value_pairs = Keyed by (key, value) with an ID value
+            pattoo_datapoints = List of ID values with unique datapoint ID key
+
+    """
+    # Initialize key variables
+    counter = Counter()
+    all_dps = []
+
+    # Only process valid data
+    if False not in [
+            isinstance(agentdata, AgentPolledData),
+            bool(getattr(agentdata, 'valid', False))]:
+        for ddv in agentdata.data:
+            # Ignore bad data
+            if ddv.valid is False:
+                continue
+
+            # DataPoints with the same metadata share the IDs of its
+            # key-value pairs. These are always the first IDs of each
+            # datapoint, so they are assigned in the same order as
+            # datapoints_to_dicts() assigns them.
+            metadata_ids = {}
+            for (metadata, key, value, data_type,
+                 timestamp, checksum) in ddv.rows(
+                     _converter_metadata(agentdata, ddv.target)):
+                dp_pair_ids = metadata_ids.get(metadata)
+                if dp_pair_ids is None:
+                    dp_pair_ids = [
+                        counter.counter(_key, _value)
+                        for _key, _value in metadata.metadata.items()]
+                    metadata_ids[metadata] = dp_pair_ids
+
+                # Create a unique key tuple for the datapoint
+                all_dps.append(dp_pair_ids + [
+                    counter.counter('pattoo_key', key),
+                    counter.counter('pattoo_data_type', data_type),
+                    counter.counter('pattoo_value', value),
+                    counter.counter('pattoo_timestamp', timestamp),
+                    counter.counter('pattoo_checksum', checksum)])
+
+    result = {
+        'key_value_pairs': counter.inverse_pairs,
+        'datapoint_pairs': all_dps}
+    return result
+
+
 def agentdata_to_post(agentdata):
     """Create data to post to the pattoo API.
 
@@ -335,8 +842,7 @@ def agentdata_to_post(agentdata):
     # Initialize key Variables
     agent_id = agentdata.agent_id
     polling_interval = agentdata.agent_polling_interval
-    _data = agentdata_to_datapoints(agentdata)
-    _datapoints = datapoints_to_dicts(_data)
+    _datapoints = agentdata_to_dicts(agentdata)
     result = datapoints_to_post(agent_id, polling_interval, _datapoints)
     return result
 
@@ -375,6 +881,110 @@ def posting_data_points(_data):
     return result
 
 
+def merge_posting_data_points(items):
+    """Merge multiple posting dicts into a single dict for posting.
+
+    The key-value pairs of all the items are deduplicated and their IDs
+    renumbered. All items must have been created by the same agent with the
+    same polling interval.
+
+    Args:
+        items: List of dicts created by posting_data_points(), or read from
+            the agent cache
+
+    Returns:
+        result: Dict of data to post. None if the items cannot be merged.
+
+    """
+    # Initialize key variables
+    counter = Counter()
+    all_dps = []
+    timestamp = 0
+
+    # Verify input data
+    if bool(items) is False or isinstance(items, list) is False:
+        return None
+    for item in items:
+        if valid_posting_data_points(item) is False:
+            return None
+    agent_id = items[0]['pattoo_agent_id']
+    polling_interval = items[0]['pattoo_agent_polling_interval']
+
+    for item in items:
+        # Only merge data from the same source
+        if False in [
+                item['pattoo_agent_id'] == agent_id,
+                item['pattoo_agent_polling_interval'] == polling_interval]:
+            return None
+        timestamp = max(timestamp, item['pattoo_agent_timestamp'])
+
+        # Map the pair IDs of the item to pair IDs in the merged result.
+        # Pair IDs are keyed by string integers in JSON cache files
+        ids = {}
+        datapoints = item['pattoo_datapoints']
+        for pair_id, (key, value) in datapoints['key_value_pairs'].items():
+            ids[str(pair_id)] = counter.counter(key, value)
+
+        # Renumber the pair IDs of each datapoint
+        for pair_ids in datapoints['datapoint_pairs']:
+            all_dps.append([ids[str(pair_id)] for pair_id in pair_ids])
+
+    result = {
+        'pattoo_agent_timestamp': timestamp,
+        'pattoo_agent_id': agent_id,
+        'pattoo_agent_polling_interval': polling_interval,
+        'pattoo_datapoints': {
+            'key_value_pairs': counter.inverse_pairs,
+            'datapoint_pairs': all_dps}}
+    return result
+
+
+def valid_posting_data_points(_data):
+    """Determine whether a dict has the structure of a posting dict.
+
+    Args:
+        _data: Dict created by posting_data_points(), or read from the agent
+            cache
+
+    Returns:
+        result: True if valid
+
+    """
+    # Verify the top level keys
+    if isinstance(_data, dict) is False:
+        return False
+    if sorted(_data.keys()) != sorted(CACHE_KEYS):
+        return False
+    datapoints = _data['pattoo_datapoints']
+    if isinstance(datapoints, dict) is False:
+        return False
+    if sorted(datapoints.keys()) != ['datapoint_pairs', 'key_value_pairs']:
+        return False
+    key_value_pairs = datapoints['key_value_pairs']
+    datapoint_pairs = datapoints['datapoint_pairs']
+    if False in [
+            isinstance(key_value_pairs, dict),
+            isinstance(datapoint_pairs, list)]:
+        return False
+
+    # Verify the key-value pairs
+    for pair in key_value_pairs.values():
+        if isinstance(pair, (list, tuple)) is False or len(pair) != 2:
+            return False
+
+    # Verify each datapoint only refers to known key-value pairs
+    pair_ids = set([str(_) for _ in key_value_pairs.keys()])
+    for item in datapoint_pairs:
+        if isinstance(item, list) is False:
+            return False
+        for pair_id in item:
+            if str(pair_id) not in pair_ids:
+                return False
+
+    # Return
+    return True
+
+
 def _keypairs(_data):
     """Make key-pairs from metadata dict.
 
@@ -412,18 +1022,99 @@ def _keypairs(_data):
     return result
 
 
+def _converter_metadata(agentdata, target):
+    """Create the metadata the converter adds to a target's DataPoints.
+
+    Args:
+        agentdata: AgentPolledData object
+        target: Target polled by the agent
+
+    Returns:
+        result: MetadataSet
+
+    """
+    # Initialize key variables
+    metadata = {
+        True: {
+            'pattoo_agent_id': agentdata.agent_id,
+            'pattoo_agent_program': agentdata.agent_program,
+            'pattoo_agent_hostname': agentdata.agent_hostname,
+            'pattoo_agent_polled_target': target,
+        },
+        False: {
+            'pattoo_agent_polling_interval': (
+                agentdata.agent_polling_interval)
+            }
+    }
+    items = []
+
+    # Return
+    for update_checksum, _items in sorted(metadata.items()):
+        for key, value in sorted(_items.items()):
+            items.append(ConverterMetadata(
+                key, value, update_checksum=update_checksum))
+    result = MetadataSet(items)
+    return result
+
+
 def _checksum(agent_id, target, datapoint_checksum):
     """Create a unique checksum for a DataPoint based on agent and target.
 
     Args:
-        record: PattooDBrecord converted to a Dict
-        metadat: DataPoint Metadata
+        agent_id: Agent ID
+        target: Target polled by the agent
+        datapoint_checksum: Checksum of the DataPoint
 
     Returns:
         result: Checksum
 
     """
-    # Create checksum value
-    result = data.hashstring('''{}{}{}\
+    # Create checksum value. Values that can't be cached are hashed
+    # directly.
+    try:
+        result = _cached_checksum(agent_id, target, datapoint_checksum)
+    except TypeError:
+        result = data.hashstring('''{}{}{}\
 '''.format(agent_id, target, datapoint_checksum), sha=512)
     return result
+
+
+@functools.lru_cache(maxsize=65536, typed=True)
+def _cached_checksum(agent_id, target, datapoint_checksum):
+    """Create a unique checksum for a DataPoint, remembering recent ones.
+
+    Ingesting cached data creates the checksums of the same DataPoints
+    every polling cycle.
+
+    Args:
+        agent_id: Agent ID
+        target: Target polled by the agent
+        datapoint_checksum: Checksum of the DataPoint
+
+    Returns:
+        result: Checksum
+
+    """
+    # Add the DataPoint checksum to a copy of the agent and target hash
+    hasher = _checksum_prefix(agent_id, target).copy()
+    hasher.update('{}'.format(datapoint_checksum).encode())
+    result = hasher.hexdigest()
+    return result
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _checksum_prefix(agent_id, target):
+    """Hash the agent and target part of DataPoint checksums.
+
+    Args:
+        agent_id: Agent ID
+        target: Target polled by the agent
+
+    Returns:
+        result: hashlib SHA-512 object. It must be copied before use.
+
+    """
+    # Return
+    result = hashlib.sha512()
+    result.update('{}{}'.format(agent_id, target).encode())
+    return result
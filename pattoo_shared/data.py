@@ -7,6 +7,16 @@ import hashlib
 from .constants import DATA_INT, DATA_FLOAT, DATA_COUNT64, DATA_COUNT
 
 
+# Hash constructors by SHA length
+_HASHERS = {
+    1: hashlib.sha1,
+    224: hashlib.sha224,
+    256: hashlib.sha256,
+    384: hashlib.sha384,
+    512: hashlib.sha512
+}
+
+
 def hashstring(string, sha=256, utf8=False):
     """Create a UTF encoded SHA hash string.
 
@@ -19,26 +29,8 @@ def hashstring(string, sha=256, utf8=False):
         result: Result of hash
 
     """
-    # Initialize key variables
-    listing = [1, 224, 384, 256, 512]
-
-    # Select SHA type
-    if sha in listing:
-        index = listing.index(sha)
-        if listing[index] == 1:
-            hasher = hashlib.sha1()
-        elif listing[index] == 224:
-            hasher = hashlib.sha224()
-        elif listing[index] == 384:
-            hasher = hashlib.sha384()
-        elif listing[index] == 512:
-            hasher = hashlib.sha512()
-        else:
-            hasher = hashlib.sha256()
-
     # Encode the string
-    hasher.update(bytes(string.encode()))
-    target_hash = hasher.hexdigest()
+    target_hash = _HASHERS[sha](string.encode()).hexdigest()
     if utf8 is True:
         result = target_hash.encode()
     else:
@@ -48,6 +40,21 @@ def hashstring(string, sha=256, utf8=False):
     return result
 
 
+def fast_hasher(string=b''):
+    """Create a fast hasher object for checksums not used for security.
+
+    Args:
+        string: Bytes to hash
+
+    Returns:
+        result: hashlib BLAKE2b object with a 16 byte digest
+
+    """
+    # Return
+    result = hashlib.blake2b(string, digest_size=16)
+    return result
+
+
 def is_numeric(val):
     """Check if argument is a number.
 
@@ -58,26 +65,50 @@ def is_numeric(val):
         True if a number
 
     """
-    # Try edge case
-    if val is True:
-        return False
-    if val is False:
-        return False
-    if val is None:
+    # Try edge cases
+    kind = type(val)
+    if kind is float:
+        return True
+    if kind is bool or val is None:
         return False
 
     # Try conversions
     try:
         float(val)
         return True
-    except ValueError:
-        return False
-    except TypeError:
-        return False
     except:
         return False
 
 
+def to_float(val):
+    """Convert argument to a float, checking that it is a number.
+
+    The argument is only parsed once. Floats, booleans and None are
+    identified by their type without raising exceptions.
+
+    Args:
+        val: Value to convert
+
+    Returns:
+        result: Tuple of (valid, value). valid is True if val is a number.
+            value is val as a float, or None if val isn't a number.
+
+    """
+    # Try edge cases
+    kind = type(val)
+    if kind is float:
+        return (True, val)
+    if kind is bool or val is None:
+        return (False, None)
+
+    # Try conversions
+    try:
+        result = (True, float(val))
+    except:
+        result = (False, None)
+    return result
+
+
 def is_data_type_numeric(data_type):
     """Check if data_type argument is a number.
 
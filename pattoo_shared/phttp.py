@@ -4,49 +4,103 @@
 # Standard libraries
 import os
 import sys
+import gzip
+import codecs
 import json
-import urllib
+import queue
+import atexit
+import urllib.error
+import urllib.parse
+import urllib.request
+import threading
 from time import time
+from concurrent.futures import ThreadPoolExecutor
+from random import uniform
 
 # pip3 libraries
 import requests
+from requests.adapters import HTTPAdapter
 
 # Pattoo libraries
 from pattoo_shared import log
+from pattoo_shared import configuration
 from pattoo_shared.configuration import Config
 from pattoo_shared import converter
+from pattoo_shared import compression
+from pattoo_shared.constants import (
+    RelayResult, RELAY_POSTED, RELAY_UNCHANGED, RELAY_FAILED)
+from pattoo_shared.cache import SegmentLog, Payload, UNSUPPORTED
+
+# Define global variable
+_SETTINGS = {}
+_SETTINGS_GENERATION = {}
+_SESSION = {}
+_SESSION_LOCK = threading.Lock()
+_SEGMENT_LOGS = {}
+_SEGMENT_LOGS_LOCK = threading.Lock()
+_POST_QUEUE = {}
+_CIRCUIT_BREAKERS = {}
+_VALIDATORS = {}
+_VALIDATORS_LOCK = threading.Lock()
+_ENCODERS = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+class _NotModified(dict):
+    """Empty dict returned for passive agent data that hasn't changed."""
+
+    pass
+
+
+# Returned by PassiveAgent.get() when data hasn't changed. It is equal to {}
+NOT_MODIFIED = _NotModified()
 
 
 class Post():
     """Class to prepare data (as dict) for posting to remote pattoo server."""
 
-    def __init__(self, identifier, data):
+    def __init__(self, identifier, data, config=None):
         """Initialize the class.
 
         Args:
             identifier: Unique identifier for the source of the data. (AgentID)
             data: dict of data to post
+            config: Config object. Agents can use their own Config subclass
+                to customize the timeouts used when posting.
 
         Returns:
             None
 
         """
         # Initialize key variables
-        config = Config()
+        if config is None:
+            self._config = Config()
+        else:
+            self._config = config
 
         # Get posting URL
         self._data = data
         self._identifier = identifier
-        self._url = config.agent_api_server_url(identifier)
+        self._url = self._config.agent_api_server_url(identifier)
 
-    def post(self):
+    def post(self, blocking=True, deadline=None):
         """Post data to central server.
 
         Args:
-            None
+            blocking: Wait for the post to complete if True. If False, the
+                data is posted in the background by the process-wide
+                PostQueue, which saves it to the cache if posting fails.
+                The queue is shared by all Post objects, so its size is
+                read from the default Config, not the config of this object.
+            deadline: Deadline object limiting the duration of the post.
+                A new one based on the config of this object is used if
+                None. When not blocking, the time spent waiting in the queue
+                counts towards the deadline, and the data is saved to the
+                cache if the deadline expires before it is posted.
 
         Returns:
-            success: True: if successful
+            success: True: if successful. When not blocking, True if the data
+                was queued or saved to the cache.
 
         """
         # Initialize key variables
@@ -54,7 +108,16 @@ class Post():
 
         # Post data
         if bool(self._data) is True:
-            success = post(self._url, self._data, self._identifier)
+            if bool(blocking) is True:
+                if deadline is None:
+                    deadline = Deadline(config=self._config)
+                success = post(
+                    self._url, self._data, self._identifier,
+                    deadline=deadline)
+            else:
+                success = post_queue().put(
+                    self._url, self._data, self._identifier,
+                    deadline=deadline, config=self._config)
         else:
             log_message = ('''\
 Blank data. No data to post from identifier {}.'''.format(self._identifier))
@@ -62,18 +125,21 @@ Blank data. No data to post from identifier {}.'''.format(self._identifier))
 
         return success
 
-    def purge(self):
+    def purge(self, deadline=None):
         """Purge data from cache by posting to central server.
 
         Args:
-            None
+            deadline: Deadline object limiting the duration of the purge.
+                A new one based on the configuration is used if None.
 
         Returns:
             success: "True: if successful
 
         """
         # Initialize key variables
-        purge(self._url, self._identifier)
+        if deadline is None:
+            deadline = Deadline(config=self._config)
+        purge(self._url, self._identifier, deadline=deadline)
 
 
 class PostAgent(Post):
@@ -108,13 +174,15 @@ class PostAgent(Post):
 class PassiveAgent():
     """Gets data from passive Pattoo Agents for relaying to pattoo API."""
 
-    def __init__(self, agent_program, identifier, url):
+    def __init__(self, agent_program, identifier, url, config=None):
         """Initialize the class.
 
         Args:
             agent_program: Agent program name
             identifier: Unique identifier for the source of the data. (AgentID)
             url: URL of content to be retrieved from passive Pattoo agent
+            config: Config object. Agents can use their own Config subclass
+                to customize the timeouts used when relaying.
 
         Returns:
             None
@@ -124,20 +192,52 @@ class PassiveAgent():
         self._url = url
         self._identifier = identifier
         self._agent_program = agent_program
+        if config is None:
+            self._config = Config()
+        else:
+            self._config = config
 
-    def relay(self):
+    def relay(self, deadline=None):
         """Forward data polled from remote pattoo passive agent.
 
         Args:
-            None
+            deadline: Deadline object limiting the duration of the relay.
+                A new one based on the configuration is used if None.
 
         Returns:
-            None
+            success: True if data was retrieved and posted
+
+        """
+        # Return
+        success = self.relay_status(deadline=deadline) == RELAY_POSTED
+        return success
+
+    def relay_status(self, deadline=None):
+        """Forward data polled from remote pattoo passive agent.
+
+        Getting, posting and purging all share a single Deadline, so the
+        duration of the relay cycle is limited even if peers hang.
+
+        Args:
+            deadline: Deadline object limiting the duration of the relay.
+                A new one based on the configuration is used if None.
+
+        Returns:
+            result: RELAY_POSTED if data was retrieved and posted,
+                RELAY_UNCHANGED if the data hadn't changed since it was last
+                retrieved, and RELAY_FAILED otherwise
 
         """
+        # Initialize key variables
+        success = False
+        if deadline is None:
+            deadline = Deadline(config=self._config)
+
         # Get data
-        data = self.get()
+        data = self.get(deadline=deadline)
         identifier = self._identifier
+        if data is NOT_MODIFIED:
+            return RELAY_UNCHANGED
 
         # Post data
         if bool(data) is True:
@@ -145,38 +245,118 @@ class PassiveAgent():
             _log(self._agent_program, identifier)
 
             # Post to remote server
-            server = Post(identifier, data)
-            success = server.post()
+            server = Post(identifier, data, config=self._config)
+            success = server.post(deadline=deadline)
 
             # Purge cache if success is True
             if success is True:
-                server.purge()
+                server.purge(deadline=deadline)
 
-    def get(self):
-        """Get JSON from remote URL.
+        # Return
+        result = RELAY_POSTED if success is True else RELAY_FAILED
+        return result
+
+    @property
+    def identifier(self):
+        """Get the unique identifier for the source of the data.
+
+        Args:
+            None
+
+        Returns:
+            result: Identifier
+
+        """
+        # Return
+        result = self._identifier
+        return result
+
+    @property
+    def url(self):
+        """Get the URL of the passive Pattoo agent.
+
+        Args:
+            None
+
+        Returns:
+            result: URL
+
+        """
+        # Return
+        result = self._url
+        return result
+
+    @property
+    def config(self):
+        """Get the configuration used when relaying.
 
         Args:
             None
 
         Returns:
-            result: dict of JSON retrieved.
+            result: Config object
+
+        """
+        # Return
+        result = self._config
+        return result
+
+    def get(self, deadline=None):
+        """Get JSON from remote URL.
+
+        Responses are requested gzip compressed, and revalidated using the
+        ETag and Last-Modified headers of the previous response from the
+        URL.
+
+        Args:
+            deadline: Deadline object limiting the duration of the request.
+                A new one based on the configuration is used if None.
+
+        Returns:
+            result: dict of JSON retrieved. NOT_MODIFIED if the data hasn't
+                changed since it was last retrieved.
 
         """
         # Initialize key variables
         result = {}
         url = self._url
+        if deadline is None:
+            deadline = Deadline(config=self._config)
+        with _VALIDATORS_LOCK:
+            validators = _VALIDATORS.get(url, {})
+        headers = {'Accept-Encoding': 'gzip'}
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            headers['If-Modified-Since'] = validators['last_modified']
+        request = urllib.request.Request(url, headers=headers)
+
+        # urllib uses the same timeout to connect and to read
+        timeout = max(deadline.timeout())
 
         # Get URL
         try:
-            with urllib.request.urlopen(url) as u_handle:
+            with urllib.request.urlopen(request, timeout=timeout) as u_handle:
                 try:
-                    result = json.loads(u_handle.read().decode())
+                    result = _read_json(u_handle)
                 except:
                     (etype, evalue, etraceback) = sys.exc_info()
                     log_message = (
                         'Error reading JSON from URL {}: [{}, {}, {}]'
                         ''.format(url, etype, evalue, etraceback))
                     log.log2info(1008, log_message)
+                else:
+                    _validators(url, u_handle.headers)
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                result = NOT_MODIFIED
+                log_message = (
+                    'Data from URL {} has not changed'.format(url))
+                log.log2debug(1078, log_message)
+            else:
+                log_message = (
+                    'Error contacting URL {}: [{}]'.format(url, error))
+                log.log2info(1079, log_message)
         except:
             # Most likely no connectivity or the TCP port is unavailable
             (etype, evalue, etraceback) = sys.exc_info()
@@ -189,15 +369,333 @@ class PassiveAgent():
         return result
 
 
-def post(url, data, identifier, save=True):
+class PassiveAgentPool():
+    """Relay data from many passive Pattoo Agents concurrently."""
+
+    def __init__(self, agents, workers=None, timeout=None, config=None):
+        """Initialize the class.
+
+        Args:
+            agents: List of PassiveAgent objects
+            workers: Maximum number of agents to relay at the same time.
+                Defaults to the configured agent_api_pool_size, so that all
+                workers can share the persistent connections to the server.
+            timeout: Maximum seconds to spend relaying each agent. Defaults
+                to the configured agent_api_cycle_timeout.
+            config: Config object providing the default workers and
+                timeout. The pattoo configuration is used if None. Each
+                agent's own configuration provides its connect and read
+                timeouts.
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        if config is None:
+            config = Config()
+        if workers is None:
+            workers = config.agent_api_pool_size()
+        if timeout is None:
+            timeout = config.agent_api_cycle_timeout()
+        self._agents = list(agents)
+        self._workers = max(1, int(workers))
+        self._timeout = abs(float(timeout))
+        self._config = config
+
+    def relay(self):
+        """Relay data from all the agents.
+
+        Each agent is limited by its own Deadline, so a hung agent doesn't
+        delay the others beyond the timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: List of RelayResult objects, in the same order as the
+                agents provided when the class was instantiated
+
+        """
+        # Nothing to do
+        if bool(self._agents) is False:
+            return []
+
+        # Relay
+        workers = min(self._workers, len(self._agents))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            result = list(executor.map(self._relay, self._agents))
+        return result
+
+    def _relay(self, agent):
+        """Relay data from a single agent.
+
+        The agent's own configuration provides the connect and read
+        timeouts of its Deadline.
+
+        Args:
+            agent: PassiveAgent object
+
+        Returns:
+            result: RelayResult object
+
+        """
+        # Initialize key variables
+        status = RELAY_FAILED
+        start = time()
+        deadline = Deadline(total=self._timeout, config=agent.config)
+
+        # Relay. Never allow one agent to stop the others.
+        try:
+            status = agent.relay_status(deadline=deadline)
+        except:
+            (etype, evalue, etraceback) = sys.exc_info()
+            log_message = ('''\
+Error relaying data from passive agent {} at URL {}: [{}, {}, {}]\
+'''.format(agent.identifier, agent.url, etype, evalue, etraceback))
+            log.log2warning(1075, log_message)
+
+        # Return
+        result = RelayResult(
+            identifier=agent.identifier, url=agent.url,
+            success=status != RELAY_FAILED, latency=time() - start,
+            status=status)
+        return result
+
+
+def relay_many(agents, workers=None, timeout=None):
+    """Relay data from many passive Pattoo Agents concurrently.
+
+    Args:
+        agents: List of PassiveAgent objects
+        workers: Maximum number of agents to relay at the same time
+        timeout: Maximum seconds to spend relaying each agent
+
+    Returns:
+        result: List of RelayResult objects, in the same order as agents
+
+    """
+    # Return
+    result = PassiveAgentPool(
+        agents, workers=workers, timeout=timeout).relay()
+    return result
+
+
+class PostQueue():
+    """Bounded queue of data posted to the pattoo server in the background.
+
+    Data is posted by a background thread so that slow or unreachable
+    pattoo servers don't delay the polling of agents. Data that fails to
+    post is saved to the cache by the background thread, which also purges
+    the cache once the server can be reached again. Data that doesn't fit
+    in the queue is saved directly to the cache.
+
+    """
+
+    def __init__(self, size=100):
+        """Initialize the class.
+
+        Args:
+            size: Maximum number of posts to queue
+
+        Returns:
+            None
+
+        Variables:
+            self.posted: Number of successful posts
+            self.failed: Number of failed posts saved to the cache
+            self.spilled: Number of posts saved to the cache because the
+                queue was full
+            self.dropped: Number of posts lost because the queue was full
+                and they could not be saved to the cache
+
+        """
+        # Initialize key variables
+        self._queue = queue.Queue(maxsize=size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._purged = set()
+        self.posted = 0
+        self.failed = 0
+        self.spilled = 0
+        self.dropped = 0
+
+        # Don't lose queued data when the process exits
+        atexit.register(self._spill)
+
+    def put(self, url, data, identifier, deadline=None, config=None):
+        """Queue data for posting without blocking.
+
+        Args:
+            url: URL to receive posted data
+            data: Data dict to post
+            identifier: Unique identifier for the source of the data.
+            deadline: Deadline object limiting the duration of the post,
+                including the time spent waiting in the queue. If None, a
+                new one is created when the data leaves the queue.
+            config: Config object from which to read the timeouts of the
+                new Deadline. The process-wide configuration is used if None.
+
+        Returns:
+            success: True: if the data was queued or saved to the cache
+
+        """
+        # Initialize key variables
+        success = True
+
+        # Queue data. Save it to the cache if the queue is full.
+        self._start()
+        try:
+            self._queue.put_nowait((url, data, identifier, deadline, config))
+        except queue.Full:
+            success = _save_data(data, identifier)
+            with self._lock:
+                if success is True:
+                    self.spilled += 1
+                else:
+                    self.dropped += 1
+            log_message = ('''\
+Posting queue full. Data for identifier "{}" {}.\
+'''.format(identifier, 'cached' if success else 'dropped'))
+            log.log2warning(1069, log_message)
+
+        # Return
+        return success
+
+    def resize(self, size):
+        """Change the maximum number of posts to queue.
+
+        Posts already queued are kept.
+
+        Args:
+            size: Maximum number of posts to queue
+
+        Returns:
+            None
+
+        """
+        # Resize
+        with self._queue.mutex:
+            self._queue.maxsize = size
+            self._queue.not_full.notify_all()
+
+    def depth(self):
+        """Get the number of posts waiting in the queue.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of posts
+
+        """
+        # Return
+        result = self._queue.qsize()
+        return result
+
+    def flush(self):
+        """Wait until all queued data has been processed.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Wait
+        self._queue.join()
+
+    def _start(self):
+        """Start the background thread if it isn't running.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Threads don't survive forking, so check on every use
+        with self._lock:
+            if self._thread is None or self._thread.is_alive() is False:
+                self._thread = threading.Thread(
+                    target=self._worker, daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        """Post queued data.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        while True:
+            (url, data, identifier, deadline, config) = self._queue.get()
+            try:
+                if deadline is None:
+                    deadline = Deadline(config=config)
+                success = post(url, data, identifier, deadline=deadline)
+                with self._lock:
+                    if success is True:
+                        self.posted += 1
+                    else:
+                        self.failed += 1
+
+                # Purge the cache once after starting, then after failures
+                if success is True and identifier not in self._purged:
+                    purge(url, identifier)
+                    self._purged.add(identifier)
+                elif success is False:
+                    self._purged.discard(identifier)
+            except:
+                (etype, evalue, etraceback) = sys.exc_info()
+                log_message = ('''\
+Posting queue error for identifier "{}": [{}, {}, {}]\
+'''.format(identifier, etype, evalue, etraceback))
+                log.log2warning(1072, log_message)
+            finally:
+                self._queue.task_done()
+
+    def _spill(self):
+        """Save all queued data to the cache.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        while True:
+            try:
+                (_, data, identifier, _, _) = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            _save_data(data, identifier)
+            self._queue.task_done()
+
+
+def post(url, data, identifier, save=True, deadline=None, replay=False):
     """Post data to central server.
 
+    Posts are not attempted while the CircuitBreaker of the server is open.
+    Only connection errors, timeouts and HTTP 5xx responses open it.
+
     Args:
         url: URL to receive posted data
         identifier: Unique identifier for the source of the data. (AgentID)
         data: Data dict to post. If None, then uses self._post_data (
             Used for testing and cache purging)
         save: When True, save data to cache directory if postinf fails
+        deadline: Deadline object limiting the duration of the post.
+            A new one based on the configuration is used if None.
+        replay: True if the data is replayed from the cache. Replayed data
+            is older than the values of the Delta of the server, so it is
+            never posted as a delta.
 
     Returns:
         success: True: if successful
@@ -205,36 +703,47 @@ def post(url, data, identifier, save=True):
     """
     # Initialize key variables
     success = False
-    response = False
+    breaker = circuit_breaker(url)
+    if deadline is None:
+        deadline = Deadline()
 
     # Fail if nothing to post
     if isinstance(data, dict) is False or bool(data) is False:
         return success
 
-    # Post data save to cache if this fails
-    try:
-        result = requests.post(url, json=data)
-        response = True
-    except:
+    # Don't start posts after the deadline
+    if deadline.expired() is True:
         if save is True:
-            # Save data to cache
             _save_data(data, identifier)
-        else:
-            # Proceed normally if there is a failure.
-            # This will be logged later
-            pass
+        log_message = ('''\
+Deadline expired. Not posting data for identifier "{}" to server {}\
+'''.format(identifier, url))
+        log.log2warning(1074, log_message)
+        return success
 
-    # Define success
-    if response is True:
-        if result.status_code == 200:
-            success = True
-        else:
-            log_message = ('''\
-HTTP {} error for identifier "{}" posted to server {}\
-'''.format(result.status_code, identifier, url))
-            log.log2warning(1017, log_message)
-            # Save data to cache, remote webserver isn't working properly
+    # Don't contact servers that are known to be unreachable
+    if breaker.allow() is False:
+        if save is True:
             _save_data(data, identifier)
+        log_message = ('''\
+Server {} unreachable. Not posting data for identifier "{}" for another \
+{:.1f}s'''.format(url, identifier, breaker.remaining()))
+        log.log2debug(1073, log_message)
+        return success
+
+    # Always update the breaker, so it never stays half open if posting
+    # raises an exception
+    reachable = None
+    try:
+        (success, reachable) = _post(
+            url, data, identifier, save, deadline, replay)
+    finally:
+        if reachable is True:
+            breaker.success()
+        elif reachable is False:
+            breaker.failure()
+        else:
+            breaker.release()
 
     # Log message
     if success is True:
@@ -252,120 +761,1004 @@ Data for identifier "{}" failed to post to server {}\
     return success
 
 
-def purge(url, identifier):
-    """Purge data from cache by posting to central server.
+def _post(url, data, identifier, save, deadline, replay):
+    """Post data to central server, saving it to the cache if this fails.
 
     Args:
         url: URL to receive posted data
+        data: Data dict to post
         identifier: Unique identifier for the source of the data. (AgentID)
+        save: When True, save data to cache directory if posting fails
+        deadline: Deadline object limiting the duration of the post
+        replay: True if the data is replayed from the cache
 
     Returns:
-        None
+        result: Tuple of (success, reachable). "reachable" is False if the
+            server could not be contacted or had an internal error, True if
+            it responded otherwise, and None if it wasn't contacted.
 
     """
     # Initialize key variables
-    config = Config()
-    cache_dir = config.agent_cache_directory(identifier)
+    success = False
+    reachable = None
+    response = None
 
-    # Add files in cache directory to list only if they match the
-    # cache suffix
-    all_filenames = [filename for filename in os.listdir(
-        cache_dir) if os.path.isfile(
-            os.path.join(cache_dir, filename))]
-    filenames = [
-        filename for filename in all_filenames if filename.endswith(
-            '.json')]
+    # Post data. The data is serialized once, and the same Payload is
+    # cached if required. Encoded data depends on state the server may
+    # lose, so the original data is cached instead.
+    payload = data
+    try:
+        encoders = _encoders(url, data, replay)
+        if encoders is None:
+            (payload, headers) = _encode(data)
+            response = session().post(
+                url, data=payload, headers=headers,
+                timeout=deadline.timeout())
+        else:
+            response = _post_encoded(url, data, encoders, deadline)
+    except (requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout):
+        reachable = False
+    except:
+        # Proceed normally if there is a failure.
+        # This will be logged later
+        pass
 
-    # Read cache file
-    for filename in filenames:
-        # Only post files for our own UID value
-        if identifier not in filename:
-            continue
+    # Define success
+    if response is not None:
+        if response.status_code == 200:
+            success = True
+        else:
+            log_message = ('''\
+HTTP {} error for identifier "{}" posted to server {}\
+'''.format(response.status_code, identifier, url))
+            log.log2warning(1017, log_message)
+        reachable = response.status_code < 500
 
-        # Get the full filepath for the cache file and post
-        filepath = os.path.join(cache_dir, filename)
-        with open(filepath, 'r') as f_handle:
-            try:
-                data = json.load(f_handle)
-            except:
-                # Log removal
-                log_message = ('''\
-Error reading previously cached agent data file {} for identifier {}. May be \
-corrupted.'''.format(filepath, identifier))
-                log.log2warning(1064, log_message)
+    # Save data to cache
+    if success is False and save is True:
+        _save_data(payload, identifier)
 
-                # Delete file
-                if os.path.isfile(filepath) is True:
-                    os.remove(filepath)
+    # Return
+    result = (success, reachable)
+    return result
 
-                    log_message = ('''\
+
+def purge(url, identifier, deadline=None):
+    """Purge data from cache by posting to central server.
+
+    Cached data is replayed oldest first. Data from the same agent is
+    merged into batches of limited size, and each batch is posted as a
+    single request. Cached data is only removed after the server
+    acknowledges the batch that contains it. Purging stops at the first
+    failed batch, or when the deadline expires.
+
+    Args:
+        url: URL to receive posted data
+        identifier: Unique identifier for the source of the data. (AgentID)
+        deadline: Deadline object limiting the duration of the purge.
+            A new one based on the configuration is used if None.
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    config = Config()
+    if deadline is None:
+        deadline = Deadline()
+    batch = _Batch(
+        config.agent_api_batch_size_bytes(),
+        config.agent_api_batch_size_datapoints(),
+        deadline)
+
+    # Files cached by older versions of pattoo_shared are replayed first
+    if _purge_files(url, identifier, batch) is True:
+        _purge_segments(url, identifier, batch)
+
+
+def _purge_files(url, identifier, batch):
+    """Purge data cached in individual files by posting to central server.
+
+    Args:
+        url: URL to receive posted data
+        identifier: Unique identifier for the source of the data. (AgentID)
+        batch: Empty _Batch object
+
+    Returns:
+        success: True: if all files were successfully posted
+
+    """
+    # Initialize key variables
+    cache_dir = Config().agent_cache_directory(identifier)
+
+    # Add files in cache directory to list only if they match the
+    # cache suffix
+    all_filenames = [filename for filename in os.listdir(
+        cache_dir) if os.path.isfile(
+            os.path.join(cache_dir, filename))]
+    filenames = [
+        filename for filename in all_filenames if filename.endswith(
+            '.json')]
+
+    # Read cache files. Filenames start with a timestamp, so sorting causes
+    # the oldest data to be posted first
+    for filename in sorted(filenames):
+        # Only post files for our own UID value
+        if identifier not in filename:
+            continue
+
+        # Get the full filepath for the cache file and read it
+        filepath = os.path.join(cache_dir, filename)
+        with open(filepath, 'r') as f_handle:
+            try:
+                data = json.load(f_handle)
+            except:
+                data = None
+
+        # Remove corrupted files
+        if converter.valid_posting_data_points(data) is False:
+            # Log removal
+            log_message = ('''\
+Error reading previously cached agent data file {} for identifier {}. May be \
+corrupted.'''.format(filepath, identifier))
+            log.log2warning(1064, log_message)
+
+            # Delete file
+            if os.path.isfile(filepath) is True:
+                os.remove(filepath)
+
+                log_message = ('''\
 Deleting corrupted cache file {} for identifier {}.\
 '''.format(filepath, identifier))
-                    log.log2warning(1036, log_message)
+                log.log2warning(1036, log_message)
+
+            # Go to the next file.
+            continue
+
+        # Post the current batch if the file cannot be added to it
+        filesize = os.path.getsize(filepath)
+        if batch.fits(data, filesize) is False:
+            if _purge_files_batch(url, identifier, batch) is False:
+                return False
+
+        # Add file to the batch
+        batch.add(data, filesize, filepath)
+
+    # Post the remaining batch
+    success = _purge_files_batch(url, identifier, batch)
+    return success
+
+
+def _purge_files_batch(url, identifier, batch):
+    """Post a batch of cached files and delete the files on success.
+
+    Args:
+        url: URL to receive posted data
+        identifier: Unique identifier for the source of the data. (AgentID)
+        batch: _Batch object whose references are filepaths
 
-                # Go to the next file.
-                continue
+    Returns:
+        success: True: if successful
 
-        # Post file
-        success = post(url, data, identifier, save=False)
+    """
+    # Post data
+    success = batch.post(url, identifier)
 
-        # Delete file if successful
-        if success is True:
+    # Delete files if successful
+    if success is True:
+        for filepath in batch.references:
             if os.path.exists(filepath) is True:
                 os.remove(filepath)
 
                 # Log removal
                 log_message = ('''\
-    Purging cache file {} after successfully contacting server {}\
-    '''.format(filepath, url))
+Purging cache file {} after successfully contacting server {}\
+'''.format(filepath, url))
                 log.log2info(1007, log_message)
+        batch.clear()
 
+    # Return
+    return success
 
-def _save_data(data, identifier):
-    """Save data to cache file.
+
+def _purge_segments(url, identifier, batch):
+    """Purge data cached in the agent's segment log by posting to server.
+
+    Data compressed with an encoding that isn't supported is kept, so
+    purging stops when it is reached.
 
     Args:
-        data: Dict to save
+        url: URL to receive posted data
         identifier: Unique identifier for the source of the data. (AgentID)
+        batch: Empty _Batch object
+
+    Returns:
+        success: True: if all cached data was successfully posted
+
+    """
+    # Initialize key variables
+    segment_log = _segment_log(identifier)
+
+    for data, size, position in segment_log.records():
+        # Keep data that can't be decompressed by this installation
+        if data is UNSUPPORTED:
+            log_message = ('''\
+Cached agent data for identifier {} uses an unsupported compression \
+encoding. Install the "zstandard" PIP package to post it.\
+'''.format(identifier))
+            log.log2warning(1030, log_message)
+            _purge_segments_batch(url, identifier, batch, segment_log)
+            return False
+
+        # Skip corrupted data
+        if converter.valid_posting_data_points(data) is False:
+            log_message = ('''\
+Discarding corrupted cached agent data for identifier {}.\
+'''.format(identifier))
+            log.log2warning(1059, log_message)
+            if bool(batch.references) is False:
+                segment_log.commit(position)
+            continue
+
+        # Post the current batch if the data cannot be added to it
+        if batch.fits(data, size) is False:
+            if _purge_segments_batch(
+                    url, identifier, batch, segment_log) is False:
+                return False
+
+        # Add data to the batch
+        batch.add(data, size, position)
+
+    # Post the remaining batch
+    success = _purge_segments_batch(url, identifier, batch, segment_log)
+    return success
+
+
+def _purge_segments_batch(url, identifier, batch, segment_log):
+    """Post a batch of data from the segment log and commit it on success.
+
+    Args:
+        url: URL to receive posted data
+        identifier: Unique identifier for the source of the data. (AgentID)
+        batch: _Batch object whose references are segment log positions
+        segment_log: cache.SegmentLog object
 
     Returns:
         success: True: if successful
 
+    """
+    # Post data
+    success = batch.post(url, identifier)
+
+    # Commit if successful. Empty batches have nothing to commit
+    if success is True and bool(batch.references) is True:
+        segment_log.commit(batch.references[-1])
+        log_message = ('''\
+Purged {} cached posts for identifier {} after successfully contacting \
+server {}'''.format(len(batch.references), identifier, url))
+        log.log2info(1067, log_message)
+        batch.clear()
+
+    # Return
+    return success
+
+
+class _Batch():
+    """Cached data to be posted to the pattoo server in a single request."""
+
+    def __init__(self, max_bytes, max_datapoints, deadline):
+        """Initialize the class.
+
+        Args:
+            max_bytes: Maximum size of the cached data in the batch
+            max_datapoints: Maximum number of datapoints in the batch
+            deadline: Deadline object limiting the duration of all posts
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._max_bytes = max_bytes
+        self._max_datapoints = max_datapoints
+        self._deadline = deadline
+        self.clear()
+
+    def clear(self):
+        """Remove all data from the batch.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._data = []
+        self._bytes = 0
+        self._datapoints = 0
+        self.references = []
+
+    def fits(self, data, size):
+        """Determine whether data can be added to the batch.
+
+        Args:
+            data: Dict of posting data
+            size: Size of the cached data in bytes
+
+        Returns:
+            result: True if the data fits
+
+        """
+        # An empty batch accepts data of any size
+        if bool(self._data) is False:
+            return True
+
+        # Return
+        datapoints = len(data['pattoo_datapoints']['datapoint_pairs'])
+        result = False not in [
+            self._bytes + size <= self._max_bytes,
+            self._datapoints + datapoints <= self._max_datapoints,
+            _source(self._data[0]) == _source(data)]
+        return result
+
+    def add(self, data, size, reference):
+        """Add data to the batch.
+
+        Args:
+            data: Dict of posting data
+            size: Size of the cached data in bytes
+            reference: Reference to the location of the data in the cache
+
+        Returns:
+            None
+
+        """
+        # Update
+        self._data.append(data)
+        self._bytes += size
+        self._datapoints += len(data['pattoo_datapoints']['datapoint_pairs'])
+        self.references.append(reference)
+
+    def post(self, url, identifier):
+        """Post the merged data of the batch.
+
+        Args:
+            url: URL to receive posted data
+            identifier: Unique identifier for the source of the data.
+
+        Returns:
+            success: True: if successful. Always True for empty batches.
+
+        """
+        # Nothing to do
+        if bool(self._data) is False:
+            return True
+
+        # Post the merged data
+        data = converter.merge_posting_data_points(self._data)
+        success = post(
+            url, data, identifier, save=False, deadline=self._deadline,
+            replay=True)
+        return success
+
+
+def _source(data):
+    """Get the source of posting data.
+
+    Args:
+        data: Dict of posting data
+
+    Returns:
+        result: Tuple of (agent_id, polling_interval)
+
+    """
+    # Return
+    result = (
+        data['pattoo_agent_id'], data['pattoo_agent_polling_interval'])
+    return result
+
+
+def _segment_log(identifier):
+    """Get the segment log in which to cache data for an identifier.
+
+    Args:
+        identifier: Unique identifier for the source of the data. (AgentID)
+
+    Returns:
+        result: cache.SegmentLog object
+
     """
     # Initialize key variables
-    success = False
+    key = (os.getpid(), identifier)
+    settings = _settings()
+
+    # Create the log once per process. This removes any partial records
+    # left by a crash
+    with _SEGMENT_LOGS_LOCK:
+        if key not in _SEGMENT_LOGS:
+            directory = os.path.join(
+                Config().agent_cache_directory(identifier), 'segments')
+            _SEGMENT_LOGS[key] = SegmentLog(
+                directory, encoding=settings['compression'],
+                minimum=settings['compression_minimum'])
+        result = _SEGMENT_LOGS[key]
+
+    # Return
+    return result
+
+
+class Deadline():
+    """Limit the total duration of a sequence of HTTP requests.
+
+    Each request made before the deadline uses the configured connect and
+    read timeouts, reduced to the time remaining until the deadline.
+
+    """
+
+    def __init__(self, total=None, config=None):
+        """Initialize the class.
+
+        Args:
+            total: Seconds until the deadline. The configured
+                agent_api_cycle_timeout is used if None.
+            config: Config object from which to read the timeouts. The
+                process-wide pattoo configuration is used if None.
+
+        Returns:
+            None
+
+        """
+        # Get the timeouts
+        if config is None:
+            settings = _settings()
+            self._connect = settings['connect_timeout']
+            self._read = settings['read_timeout']
+            cycle = settings['cycle_timeout']
+        else:
+            self._connect = config.agent_api_connect_timeout()
+            self._read = config.agent_api_read_timeout()
+            cycle = config.agent_api_cycle_timeout()
+
+        # Set the deadline
+        if total is None:
+            total = cycle
+        self._expiry = time() + total
+
+    def expired(self):
+        """Determine whether the deadline has passed.
+
+        Args:
+            None
+
+        Returns:
+            result: True if expired
+
+        """
+        # Return
+        result = self.remaining() <= 0
+        return result
+
+    def remaining(self):
+        """Get the time remaining until the deadline.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds
+
+        """
+        # Return
+        result = max(0, self._expiry - time())
+        return result
+
+    def timeout(self):
+        """Get the timeouts to use for the next request.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple of (connect timeout, read timeout) in seconds
+
+        """
+        # Never use a zero timeout as it makes sockets non-blocking
+        remaining = max(self.remaining(), 0.001)
+        result = (min(self._connect, remaining), min(self._read, remaining))
+        return result
+
+
+def session():
+    """Get the process-wide persistent HTTP session to the pattoo server.
+
+    Reusing a single session allows TCP (and TLS) connections to be kept
+    alive between posts. A new session is created if the process has been
+    forked since the last session was created, or if the session has been
+    unused for longer than the configured idle timeout.
+
+    Args:
+        None
+
+    Returns:
+        result: requests.Session object
+
+    """
+    # Initialize key variables
+    now = time()
+    pid = os.getpid()
+
+    settings = _settings()
+
+    with _SESSION_LOCK:
+        # Discard sessions inherited from a parent process, or whose
+        # connections have been idle for too long
+        result = _SESSION.get('session')
+        if result is not None:
+            if _SESSION['pid'] != pid:
+                result = None
+            elif now - _SESSION['last_used'] > settings['idle_timeout']:
+                result.close()
+                result = None
+
+        # Create a new session with a bounded connection pool
+        if result is None:
+            result = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings['pool_size'],
+                pool_maxsize=settings['pool_size'])
+            result.mount('http://', adapter)
+            result.mount('https://', adapter)
+            _SESSION['session'] = result
+            _SESSION['pid'] = pid
+
+        _SESSION['last_used'] = now
+
+    # Return
+    return result
+
+
+class CircuitBreaker():
+    """Stop contacting a pattoo server after it fails to accept posts.
+
+    After a failure, no posts are attempted until a backoff period has
+    expired. A single probe post is then allowed. The breaker closes if the
+    probe succeeds. Otherwise the backoff period is doubled, up to a
+    maximum. The backoff periods are randomized so that many agents don't
+    contact a recovering server at the same time.
+
+    """
+
+    def __init__(self, initial=1, maximum=300):
+        """Initialize the class.
+
+        Args:
+            initial: Backoff period in seconds after the first failure
+            maximum: Maximum backoff period in seconds
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._initial = initial
+        self._maximum = maximum
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry = 0
+        self._probing = False
+
+    def allow(self):
+        """Determine whether a post may be attempted.
+
+        Args:
+            None
+
+        Returns:
+            result: True if allowed
+
+        """
+        with self._lock:
+            # The breaker is closed
+            if self._failures == 0:
+                return True
+
+            # Allow only one probe once the backoff period has expired
+            result = False not in [
+                time() >= self._retry, self._probing is False]
+            if result is True:
+                self._probing = True
+
+        # Return
+        return result
+
+    def remaining(self):
+        """Get the time remaining until the next probe is allowed.
+
+        Args:
+            None
+
+        Returns:
+            result: Seconds
+
+        """
+        # Return
+        result = max(0, self._retry - time())
+        return result
+
+    def success(self):
+        """Record a successful post.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+
+    def release(self):
+        """Record a post that didn't contact the server.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        """Record a failed post.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+
+            # Randomize between half and all of the exponential backoff
+            backoff = min(
+                self._maximum, self._initial * 2 ** min(
+                    self._failures - 1, 32))
+            self._retry = time() + uniform(backoff / 2, backoff)
+
+
+def circuit_breaker(url):
+    """Get the process-wide CircuitBreaker for the server at a URL.
+
+    Agents post to URLs containing their agent_id, so breakers are shared
+    by all URLs with the same scheme, host and port.
+
+    Args:
+        url: URL to receive posted data
+
+    Returns:
+        result: CircuitBreaker object
+
+    """
+    # Initialize key variables
+    parts = urllib.parse.urlsplit(url)
+    key = (parts.scheme.lower(), parts.hostname, parts.port or {
+        'http': 80, 'https': 443}.get(parts.scheme.lower()))
+    settings = _settings()
+
+    with _SESSION_LOCK:
+        if key not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[key] = CircuitBreaker(
+                initial=settings['backoff_initial'],
+                maximum=settings['backoff_maximum'])
+        result = _CIRCUIT_BREAKERS[key]
+
+    # Return
+    return result
+
+
+def post_queue():
+    """Get the process-wide queue for posting data in the background.
+
+    Args:
+        None
+
+    Returns:
+        result: PostQueue object
+
+    """
+    # Create the queue once per process
+    settings = _settings()
+    with _SESSION_LOCK:
+        if _POST_QUEUE.get('queue') is None:
+            _POST_QUEUE['queue'] = PostQueue(size=settings['queue_size'])
+        result = _POST_QUEUE['queue']
+
+    # Return
+    return result
+
+
+def _settings():
+    """Get the process-wide agent API settings from the configuration.
+
+    The settings are read again when the configuration changes. Sessions,
+    circuit breakers and encoders created with the previous settings are
+    then discarded, and the posting queue is resized. Discarded sessions
+    are closed.
+
+    Args:
+        None
+
+    Returns:
+        result: Dict of settings
+
+    """
+    # Check the configuration for changes
     config = Config()
-    cache_dir = config.agent_cache_directory(identifier)
-    timestamp = int(time() * 1000)
+    generation = configuration.generation()
+
+    with _SESSION_LOCK:
+        # Read the configuration again only if it has changed
+        if _SETTINGS_GENERATION.get('value') != generation:
+            if bool(_SETTINGS) is True:
+                # Close the connections of sessions created by this process
+                if _SESSION.get('pid') == os.getpid():
+                    _SESSION['session'].close()
+                _SESSION.clear()
+                _CIRCUIT_BREAKERS.clear()
+                with _ENCODERS_LOCK:
+                    _ENCODERS.clear()
+            _SETTINGS_GENERATION['value'] = generation
+            _SETTINGS.clear()
+            _SETTINGS['pool_size'] = config.agent_api_pool_size()
+            _SETTINGS['idle_timeout'] = config.agent_api_idle_timeout()
+            _SETTINGS['connect_timeout'] = config.agent_api_connect_timeout()
+            _SETTINGS['read_timeout'] = config.agent_api_read_timeout()
+            _SETTINGS['cycle_timeout'] = config.agent_api_cycle_timeout()
+            _SETTINGS['compression'] = compression.encoding(
+                config.agent_api_compression())
+            _SETTINGS['compression_minimum'] = (
+                config.agent_api_compression_minimum())
+            _SETTINGS['dictionary'] = config.agent_api_dictionary()
+            _SETTINGS['delta'] = config.agent_api_delta()
+            _SETTINGS['delta_keyframe'] = config.agent_api_delta_keyframe()
+            _SETTINGS['backoff_initial'] = config.agent_api_backoff_initial()
+            _SETTINGS['backoff_maximum'] = config.agent_api_backoff_maximum()
+            _SETTINGS['queue_size'] = config.agent_api_queue_size()
+            if _POST_QUEUE.get('queue') is not None:
+                _POST_QUEUE['queue'].resize(_SETTINGS['queue_size'])
+        result = _SETTINGS
 
-    # Create a unique very long filename to reduce risk of
-    filename = ('''{}{}{}_{}.json\
-'''.format(cache_dir, os.sep, timestamp, identifier))
+    # Return
+    return result
 
-    # Save data
-    try:
-        with open(filename, 'w') as f_handle:
-            json.dump(data, f_handle)
-        success = True
-    except Exception as err:
-        log_message = '{}'.format(err)
-        log.log2warning(1030, log_message)
-    except:
-        (etype, evalue, etraceback) = sys.exc_info()
-        log_message = ('''\
-Cache-file save error: [{}, {}, {}]'''.format(etype, evalue, etraceback))
-        log.log2warning(1031, log_message)
 
-    # Delete file if there is a failure.
-    # Helps to protect against full file systems.
-    if os.path.isfile(filename) is True and success is False:
-        os.remove(filename)
-        log_message = ('''\
-Deleting corrupted cache file {} for identifier {}.\
-'''.format(filename, identifier))
-        log.log2warning(1037, log_message)
+def _encode(data):
+    """Encode data for posting, compressing it if configured to do so.
+
+    Args:
+        data: Data dict to post
+
+    Returns:
+        result: Tuple of (payload, headers) where "payload" is the
+            cache.Payload object to post and "headers" is a dict of HTTP
+            headers describing it
+
+    """
+    # Initialize key variables
+    settings = _settings()
+    payload = Payload(
+        data, encoding=settings['compression'],
+        minimum=settings['compression_minimum'])
+    headers = {'Content-Type': 'application/json'}
+
+    # Describe compression
+    if payload.encoding is not None:
+        headers['Content-Encoding'] = payload.encoding
+
+    # Return
+    result = (payload, headers)
+    return result
+
+
+def _encoders(url, data, replay=False):
+    """Get the objects encoding data for the server receiving posted data.
+
+    Args:
+        url: URL to receive posted data
+        data: Data dict to post
+        replay: True if the data is replayed from the cache. The Delta
+            compares values with the last values posted, not with older
+            values in the same data, so it isn't used for replays.
+
+    Returns:
+        result: Tuple of (lock, encoders), where "lock" must be held while
+            using "encoders", a list of the converter.Delta and
+            converter.PairDictionary objects to apply to data in order.
+            None if neither is configured or data isn't posting data.
+
+    """
+    # Initialize key variables
+    result = None
+    settings = _settings()
+
+    # Only encode data if configured to do so
+    if False not in [
+            settings['delta'] or settings['dictionary'],
+            converter.valid_posting_data_points(data)]:
+        with _ENCODERS_LOCK:
+            if url not in _ENCODERS:
+                encoders = []
+                if settings['delta'] is True:
+                    encoders.append(
+                        converter.Delta(keyframe=settings['delta_keyframe']))
+                if settings['dictionary'] is True:
+                    encoders.append(converter.PairDictionary())
+                _ENCODERS[url] = (threading.Lock(), encoders)
+            result = _ENCODERS[url]
+
+    # Don't use the Delta for replays
+    if result is not None and replay is True:
+        (lock, encoders) = result
+        encoders = [
+            item for item in encoders
+            if isinstance(item, converter.Delta) is False]
+        result = (lock, encoders) if bool(encoders) is True else None
+
+    # Return
+    return result
+
+
+def _post_encoded(url, data, encoders, deadline):
+    """Post data encoded using state shared with the server.
+
+    Args:
+        url: URL to receive posted data
+        data: Data dict to post
+        encoders: Tuple of (lock, encoders) provided by _encoders()
+        deadline: Deadline object limiting the duration of the post
+
+    Returns:
+        result: requests.Response object
+
+    """
+    # Initialize key variables
+    (lock, items) = encoders
+
+    # Only one post at a time can update the encoders
+    with lock:
+        try:
+            (payload, headers) = _encode(_encoded(data, items))
+            result = session().post(
+                url, data=payload, headers=headers, timeout=deadline.timeout())
+
+            # Post all the data if the server no longer knows the state
+            if result.status_code == 409:
+                log_message = ('''\
+Server {} reset its state. Posting all data.'''.format(url))
+                log.log2debug(1080, log_message)
+                for item in items:
+                    item.reset()
+                (payload, headers) = _encode(_encoded(data, items))
+                result = session().post(
+                    url, data=payload, headers=headers,
+                    timeout=deadline.timeout())
+        except:
+            for item in items:
+                item.rollback()
+            raise
+
+        # Only update the state if the server received the data
+        for item in items:
+            if result.status_code == 200:
+                item.commit()
+            else:
+                item.rollback()
+
+    # Return
+    return result
+
+
+def _encoded(data, encoders):
+    """Apply encoders to data.
+
+    Args:
+        data: Data dict to post
+        encoders: List of converter.Delta and converter.PairDictionary
+            objects
+
+    Returns:
+        result: Encoded data dict
+
+    """
+    # Encode
+    result = data
+    for item in encoders:
+        result = item.encode(result)
+    return result
+
+
+def _read_json(u_handle):
+    """Read and decode JSON from an HTTP response.
+
+    The json module only parses complete documents, so the whole response
+    is read, and both its bytes and its decoded text are briefly held in
+    memory. Responses must therefore fit in memory twice.
+
+    Args:
+        u_handle: urllib HTTP response
+
+    Returns:
+        result: Decoded JSON
+
+    """
+    # Decompress
+    stream = u_handle
+    encoding = u_handle.headers.get('Content-Encoding', '').lower()
+    if encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=u_handle)
+
+    # Decode
+    charset = u_handle.headers.get_content_charset('utf-8')
+    result = json.load(codecs.getreader(charset)(stream))
+    return result
+
+
+def _validators(url, headers):
+    """Save the validators used to revalidate the next request to a URL.
+
+    Args:
+        url: URL
+        headers: Headers of the HTTP response from the URL
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    validators = {}
+    if headers.get('ETag') is not None:
+        validators['etag'] = headers.get('ETag')
+    if headers.get('Last-Modified') is not None:
+        validators['last_modified'] = headers.get('Last-Modified')
+
+    # Save
+    with _VALIDATORS_LOCK:
+        if bool(validators) is True:
+            _VALIDATORS[url] = validators
+        else:
+            _VALIDATORS.pop(url, None)
+
+
+def _save_data(data, identifier):
+    """Save data to cache.
+
+    Args:
+        data: Dict or cache.Payload object to save
+        identifier: Unique identifier for the source of the data. (AgentID)
+
+    Returns:
+        success: True: if successful
+
+    """
+    # Compress data using the current settings
+    if isinstance(data, Payload) is False:
+        settings = _settings()
+        data = Payload(
+            data, encoding=settings['compression'],
+            minimum=settings['compression_minimum'])
 
     # Return
+    success = _segment_log(identifier).append(data)
     return success
 
 
@@ -1,17 +1,41 @@
 """Module for classes that format variables."""
 
 # Standard imports
-from time import time
+from time import time, monotonic
+from array import array
+import threading
 import socket
+import hashlib
+import sys
 import re
+import functools
+
+# PIP libraries. numpy is optional
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # pattoo imports
 from . import data
 from . import files
 from . import network
 from .constants import (
-    DATA_INT, DATA_FLOAT, DATA_COUNT64, DATA_COUNT, DATA_STRING, DATA_NONE,
-    DATAPOINT_KEYS, AGENT_METADATA_KEYS)
+    DATA_INT, DATA_FLOAT, DATA_COUNT64, DATA_COUNT, DATA_STRING,
+    DATAPOINT_KEYS, AGENT_METADATA_KEYS, CHECKSUM_COMPATIBLE,
+    CHECKSUM_CANONICAL, CHECKSUM_FAST)
+
+# DataPoint checksum mode
+_CHECKSUM = {'mode': CHECKSUM_COMPATIBLE, 'hasher': hashlib.sha256}
+
+# AgentIdentity objects shared by the process, keyed by agent program
+_IDENTITIES = {}
+_IDENTITIES_LOCK = threading.Lock()
+
+# Valid DataPoint data types
+_DATA_TYPES = (DATA_INT, DATA_FLOAT, DATA_COUNT64, DATA_COUNT, DATA_STRING)
+_NUMERIC_DATA_TYPES = (DATA_INT, DATA_FLOAT, DATA_COUNT64, DATA_COUNT)
+_NDARRAY = () if numpy is None else numpy.ndarray
 
 
 class Metadata():
@@ -133,6 +157,11 @@ class DataPoint():
 
     """
 
+    # Agents create very large numbers of DataPoint objects
+    __slots__ = (
+        'key', 'value', 'valid', 'data_type', 'metadata', 'timestamp',
+        '_checksum', '_hashed', '_metadata_set')
+
     def __init__(self, key, value, data_type=DATA_INT, timestamp=None):
         """Initialize the class.
 
@@ -149,7 +178,8 @@ class DataPoint():
             self.timestamp: Integer of epoch milliseconds
             self.valid: True if the object has a valid data_type
             self.checksum: Hash of self.key, self.data_type and metadata to
-                ensure uniqueness when assigned to a target.
+                ensure uniqueness when assigned to a target. Calculated
+                when first read, and again after metadata is added.
 
         """
         # Initialize variables
@@ -157,7 +187,9 @@ class DataPoint():
             key, value, metadata=False)
         self.data_type = data_type
         self.metadata = {}
-        self._metakeys = []
+        self._hashed = []
+        self._checksum = None
+        self._metadata_set = None
 
         # Round timestamp to the nearest millisecond.
         if data.is_numeric(timestamp) is False:
@@ -167,50 +199,27 @@ class DataPoint():
 
         # False validity if value is not of the right type
         self.valid = False not in [
-            data_type in [
-                DATA_INT,
-                DATA_FLOAT,
-                DATA_COUNT64,
-                DATA_COUNT,
-                DATA_STRING,
-                DATA_NONE
-            ],
-            data_type is not False,
-            data_type is not True,
-            data_type is not None,
+            data_type in _DATA_TYPES,
+            isinstance(data_type, bool) is False,
             self.valid is True
         ]
 
-        # Validity check: Make sure numeric data_types have numeric values
-        if False not in [
-                data_type in [
-                    DATA_INT,
-                    DATA_FLOAT,
-                    DATA_COUNT64,
-                    DATA_COUNT
-                ],
-                self.valid is True,
-                data.is_numeric(value) is False]:
-            self.valid = False
-
+        # Validity check: Make sure numeric data_types have numeric values.
         # Convert floatable strings to float, and integers to ints
-        if False not in [
-                self.valid is True,
-                data.is_numeric(value) is True,
-                isinstance(value, str) is True]:
-            if data_type in [DATA_FLOAT, DATA_COUNT64, DATA_COUNT]:
-                self.value = float(value)
-            elif data_type in [DATA_INT]:
-                self.value = int(float(value))
+        if self.valid is True and data_type in _NUMERIC_DATA_TYPES:
+            (numeric, number) = data.to_float(value)
+            if numeric is False:
+                self.valid = False
+            elif isinstance(value, str) is True:
+                if data_type == DATA_INT:
+                    self.value = int(number)
+                else:
+                    self.value = number
 
         # Convert strings to string
-        if data_type in [DATA_STRING]:
+        if data_type == DATA_STRING:
             self.value = str(value)
 
-        # Create checksum
-        self.checksum = data.hashstring(
-            '{}{}'.format(self.key, self.data_type))
-
     def __repr__(self):
         """Return a representation of the attributes of the class.
 
@@ -232,11 +241,37 @@ class DataPoint():
         )
         return result
 
+    @property
+    def checksum(self):
+        """Get the checksum of the DataPoint.
+
+        Args:
+            None
+
+        Returns:
+            result: Checksum
+
+        """
+        # Calculate the checksum only when the metadata has changed
+        if self._checksum is None:
+            if self._metadata_set is not None:
+                self._checksum = self._metadata_set.checksum(
+                    self.key, self.data_type)
+            else:
+                self._checksum = _checksum(
+                    self.key, self.data_type,
+                    [(key, self.metadata[key]) for key in self._hashed])
+        result = self._checksum
+        return result
+
     def add(self, items):
         """Add DataPointMetadata to the internal self.metadata list.
 
+        The metadata of a MetadataSet is shared with the DataPoint, rather
+        than being copied, if the DataPoint has no other metadata.
+
         Args:
-            items: A DataPointMetadata object list
+            items: A DataPointMetadata or MetadataSet object list
 
         Returns:
             None
@@ -248,89 +283,914 @@ class DataPoint():
 
         # Only append approved data types
         for item in items:
-            if isinstance(item, Metadata) is True:
+            if isinstance(item, MetadataSet) is True:
+                # Share the metadata if there is no other metadata
+                if bool(self.metadata) is False:
+                    self.metadata = item.metadata
+                    self._hashed = item.hashed
+                    self._metadata_set = item
+                    self._checksum = None
+                    continue
+
+                # Otherwise add each item. MetadataSet items are valid.
+                self._unshare()
+                for key, value in item.metadata.items():
+                    if key not in self.metadata:
+                        self.metadata[key] = value
+                        if key in item.hashed:
+                            self._hashed.append(key)
+                            self._checksum = None
+
+            elif isinstance(item, Metadata) is True:
                 # Ignore invalid values
                 if item.valid is False or item.key in DATAPOINT_KEYS:
                     continue
 
                 # Process
-                if item.key not in self._metakeys:
+                if item.key not in self.metadata:
+                    self._unshare()
                     self.metadata[item.key] = item.value
-                    self._metakeys.append(item.key)
                     if bool(item.update_checksum) is True:
-                        self.checksum = data.hashstring('''\
-{}{}{}'''.format(self.checksum, item.key, item.value))
+                        self._hashed.append(item.key)
+                        self._checksum = None
+
+    @classmethod
+    def from_columns(cls, keys, values, data_type=DATA_INT, timestamp=None,
+                     metadata=None):
+        """Create many DataPoints from columns of keys and values.
+
+        Args:
+            keys: Sequence of DataPoint keys
+            values: Sequence of DataPoint values, the same length as keys
+            data_type: Data type of all the values
+            timestamp: Integer EPOCH timestamp in milliseconds of all the
+                values
+            metadata: MetadataSet or DataPointMetadata object list to add
+                to all the DataPoints
+
+        Returns:
+            result: DataPointBatch of the valid DataPoints
+
+        """
+        # Return
+        result = DataPointBatch()
+        result.add_columns(
+            keys, values, data_type=data_type, timestamp=timestamp,
+            metadata=metadata)
+        return result
+
+    def _unshare(self):
+        """Copy metadata shared with a MetadataSet before changing it.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Copy
+        if self._metadata_set is not None:
+            self.metadata = dict(self.metadata)
+            self._hashed = list(self._hashed)
+            self._metadata_set = None
+
+
+class _SharedMetadata(dict):
+    """Dict of metadata shared by a MetadataSet and many DataPoints."""
+
+    def _read_only(self, *args, **kwargs):
+        """Prevent changes.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        raise TypeError(
+            'Shared metadata is read only. Use DataPoint.add() instead')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        """Copy or pickle as a dict that can be changed.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple for the pickle protocol
+
+        """
+        # Return
+        result = (dict, (dict(self),))
+        return result
+
+
+class MetadataSet():
+    """Validated metadata shared by many DataPoint objects.
+
+    Agents usually add the same metadata to many DataPoints. A MetadataSet
+    is validated once, and added to DataPoints by reference, so the cost of
+    adding it doesn't depend on the number of metadata items. The metadata
+    of a MetadataSet is read only, and so is the metadata of DataPoints
+    that share it until other metadata is added to them.
+
+    """
+
+    def __init__(self, items):
+        """Initialize the class.
+
+        Args:
+            items: A DataPointMetadata object list. Items are added in order,
+                the same way DataPoint.add() adds them.
+
+        Returns:
+            None
+
+        Variables:
+            self.metadata: Read only dict of metadata
+            self.hashed: Tuple of the metadata keys that update the checksum
+                of DataPoints, in the order they were added
+
+        """
+        # Initialize key variables
+        metadata = {}
+        hashed = []
+        self._prefix = None
+
+        # Ensure there is a list of objects
+        if isinstance(items, list) is False:
+            items = [items]
+
+        # Validate
+        for item in items:
+            if isinstance(item, Metadata) is True:
+                # Ignore invalid values
+                if item.valid is False or item.key in DATAPOINT_KEYS:
+                    continue
+
+                # Process
+                if item.key not in metadata:
+                    metadata[item.key] = item.value
+                    if bool(item.update_checksum) is True:
+                        hashed.append(item.key)
+
+        self.metadata = _SharedMetadata(metadata)
+        self.hashed = tuple(hashed)
+        self._items = [(key, metadata[key]) for key in hashed]
+
+    def __repr__(self):
+        """Return a representation of the attributes of the class.
+
+        Args:
+            None
+
+        Returns:
+            result: String representation.
+
+        """
+        # Return
+        result = ('<{0} metadata={1}>'.format(
+            self.__class__.__name__, repr(self.metadata)))
+        return result
+
+    def merge(self, metadata, hashed):
+        """Create a MetadataSet of DataPoint metadata followed by this one.
+
+        The result has the same metadata and checksums as a DataPoint with
+        the metadata after this MetadataSet is added to it.
+
+        Args:
+            metadata: Dict of DataPoint metadata
+            hashed: Keys of the DataPoint metadata that update its checksum,
+                in the order they were added
+
+        Returns:
+            result: MetadataSet
+
+        """
+        # Initialize key variables
+        result = MetadataSet([])
+        _metadata = dict(metadata)
+        _hashed = list(hashed)
+
+        # Add each item the same way DataPoint.add() does
+        for key, value in self.metadata.items():
+            if key not in _metadata:
+                _metadata[key] = value
+                if key in self.hashed:
+                    _hashed.append(key)
+
+        # Return
+        result.metadata = _SharedMetadata(_metadata)
+        result.hashed = tuple(_hashed)
+        result._items = [(key, _metadata[key]) for key in _hashed]
+        return result
+
+    def checksum(self, key, data_type):
+        """Calculate the checksum of a DataPoint using this metadata.
+
+        Args:
+            key: DataPoint key
+            data_type: DataPoint data_type
+
+        Returns:
+            result: Checksum
+
+        """
+        # Compatible checksums hash the key first, so only the encoded
+        # metadata can be reused
+        (mode, prefix) = self._checksum_prefix()
+        if mode == CHECKSUM_COMPATIBLE:
+            result = _checksum_compatible(key, data_type, prefix)
+            return result
+
+        # Other checksums reuse the hash of the metadata
+        hasher = prefix.copy()
+        hasher.update('{}\x1f{}'.format(key, data_type).encode())
+        result = hasher.hexdigest()
+        return result
+
+    def checksums(self, keys, data_type):
+        """Calculate the checksums of many DataPoints using this metadata.
+
+        The result is the same as calling checksum() for each key, but each
+        step of the calculation is applied to all the keys at once.
+
+        Args:
+            keys: List of validated DataPoint keys. These must be strings.
+            data_type: Data type of all the DataPoints
+
+        Returns:
+            result: List of checksums, in the same order as the keys
+
+        """
+        # Rehash the hashes of all the keys with each metadata item
+        (mode, prefix) = self._checksum_prefix()
+        if mode == CHECKSUM_COMPATIBLE:
+            sha256 = hashlib.sha256
+            suffix = str(data_type)
+            result = [
+                sha256((key + suffix).encode()).hexdigest() for key in keys]
+            for item in prefix:
+                result = [
+                    sha256(digest.encode() + item).hexdigest()
+                    for digest in result]
+            return result
+
+        # Hash the encoded metadata and each key in a single call. This is
+        # the same as updating a copy of the hash of the metadata.
+        hasher = _CHECKSUM['hasher']
+        metadata = _checksum_metadata(self._items)
+        suffix = '\x1f{}'.format(data_type)
+        result = [
+            hasher(metadata + (key + suffix).encode()).hexdigest()
+            for key in keys]
+        return result
+
+    def _checksum_prefix(self):
+        """Encode or hash the metadata once for all DataPoint checksums.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple of (mode, prefix). "prefix" is the metadata
+                provided by _checksum_chain() in CHECKSUM_COMPATIBLE mode,
+                and by _checksum_prefix() in other modes.
+
+        """
+        # Recalculate the prefix if the checksum mode has changed
+        mode = _CHECKSUM['mode']
+        if self._prefix is None or self._prefix[0] != mode:
+            if mode == CHECKSUM_COMPATIBLE:
+                self._prefix = (mode, _checksum_chain(self._items))
+            else:
+                self._prefix = (mode, _checksum_prefix(self._items))
+        result = self._prefix
+        return result
+
+
+class DataPointBatch():
+    """Compact columnar storage for many DataPoint objects.
+
+    Polling large targets creates hundreds of thousands of DataPoint
+    objects. A DataPointBatch stores the values of their attributes in
+    columns instead. Data types and timestamps are stored in typed arrays,
+    keys are interned, and each distinct set of metadata is stored once as
+    a tuple shared by all the datapoints that have it.
+
+    """
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        Variables:
+            self.keys: List of DataPoint keys
+            self.values: List of DataPoint values
+            self.data_types: Array of DataPoint data types
+            self.timestamps: Array of DataPoint timestamps
+            self.checksums: List of DataPoint checksums
+
+        """
+        # Initialize key variables
+        self.keys = []
+        self.values = []
+        self.data_types = array('b')
+        self.timestamps = array('q')
+        self.checksums = []
+        self._metadata = array('L')
+        self._metadata_sets = []
+        self._metadata_index = {}
+        self._checksums = set()
+
+    def __repr__(self):
+        """Return a representation of the attributes of the class.
+
+        Args:
+            None
+
+        Returns:
+            result: String representation.
+
+        """
+        # Return
+        result = ('<{0} datapoints={1}>'.format(
+            self.__class__.__name__, len(self)))
+        return result
+
+    def __len__(self):
+        """Get the number of datapoints in the batch.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of datapoints
+
+        """
+        # Return
+        result = len(self.checksums)
+        return result
+
+    def __iter__(self):
+        """Recreate the DataPoint objects in the batch.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        Yields:
+            result: DataPoint object
+
+        """
+        # Create new objects so that the batch can't be modified
+        for index in range(len(self)):
+            datapoint = DataPoint.__new__(DataPoint)
+            datapoint.key = self.keys[index]
+            datapoint.value = self.values[index]
+            datapoint.valid = True
+            datapoint.data_type = self.data_types[index]
+            datapoint.timestamp = self.timestamps[index]
+            datapoint._checksum = self.checksums[index]
+            datapoint._metadata_set = None
+            metadata = self._metadata_sets[self._metadata[index]]
+            datapoint.metadata = {
+                key: value for key, value, _ in metadata}
+            datapoint._hashed = [
+                key for key, _, hashed in metadata if hashed is True]
+            yield datapoint
+
+    def add(self, items):
+        """Add DataPoint objects to the batch.
+
+        Invalid DataPoint objects, and those with the same checksum as a
+        DataPoint already in the batch, are ignored.
+
+        Args:
+            items: A DataPoint or DataPointBatch object list
+
+        Returns:
+            None
+
+        """
+        # Ensure there is a list of objects
+        if isinstance(items, list) is False:
+            items = [items]
+
+        # Only add approved data types
+        for item in items:
+            if isinstance(item, DataPoint) is True:
+                if item.valid is True:
+                    hashed = set(item._hashed)
+                    metadata = tuple(
+                        (key, value, key in hashed)
+                        for key, value in item.metadata.items())
+                    self._append(
+                        item.key, item.value, item.data_type, item.timestamp,
+                        item.checksum, self._index(metadata))
+            elif isinstance(item, DataPointBatch) is True:
+                indexes = [self._index(_) for _ in item._metadata_sets]
+                for index in range(len(item)):
+                    self._append(
+                        item.keys[index], item.values[index],
+                        item.data_types[index], item.timestamps[index],
+                        item.checksums[index],
+                        indexes[item._metadata[index]])
+
+    def add_columns(self, keys, values, data_type=DATA_INT, timestamp=None,
+                    metadata=None):
+        """Add DataPoints created from columns of keys and values.
+
+        The result is the same as adding DataPoint objects created from each
+        key and value, but the data type, timestamp and metadata are only
+        validated once, and each step is applied to whole columns. Invalid
+        keys and values are ignored.
+
+        Every value still needs its own checksum. CHECKSUM_COMPATIBLE
+        checksums hash each value once for each metadata item that updates
+        the checksum, so the other checksum modes are much faster.
+
+        Args:
+            keys: Sequence of DataPoint keys
+            values: Sequence of DataPoint values, the same length as keys.
+                Numeric NumPy arrays are converted without checking each
+                value if NumPy is installed.
+            data_type: Data type of all the values. This MUST be one of the
+                types listed in constants.py
+            timestamp: Integer EPOCH timestamp in milliseconds of all the
+                values
+            metadata: MetadataSet or DataPointMetadata object list to add
+                to all the DataPoints
+
+        Returns:
+            None
+
+        """
+        # Validate the data type
+        if data_type not in _DATA_TYPES or isinstance(data_type, bool):
+            return
+
+        # Round timestamp to the nearest millisecond.
+        if data.is_numeric(timestamp) is False:
+            timestamp = int(round(time(), 3) * 1000)
+        else:
+            timestamp = int(timestamp)
+
+        # Validate the metadata
+        if isinstance(metadata, MetadataSet) is False:
+            metadata = MetadataSet(metadata if metadata is not None else [])
+        index = self._index(tuple(
+            (key, value, key in metadata.hashed)
+            for key, value in metadata.metadata.items()))
+
+        # Numeric NumPy arrays only contain valid values
+        checked = False
+        if isinstance(values, _NDARRAY) is True:
+            checked = values.dtype.kind in 'iuf'
+            values = values.tolist()
+        if isinstance(keys, _NDARRAY) is True:
+            keys = keys.tolist()
+
+        # Validate and convert each column as a whole
+        keys = _key_column(keys)
+        if checked is False:
+            values = _value_column(values, data_type)
+        elif data_type == DATA_STRING:
+            values = list(map(str, values))
+        else:
+            values = list(values)
+
+        # Remove invalid DataPoints. Invalid keys and values are None.
+        count = min(len(keys), len(values))
+        if False in [
+                count == len(keys), count == len(values),
+                None not in keys, None not in values]:
+            rows = [
+                (key, value) for key, value in zip(keys, values)
+                if key is not None and value is not None]
+            keys = [key for key, _ in rows]
+            values = [value for _, value in rows]
+            count = len(rows)
+        checksums = metadata.checksums(keys, data_type)
+
+        # Add the columns directly unless there are duplicates
+        unique = set(checksums)
+        if len(unique) == count and self._checksums.isdisjoint(unique):
+            self._checksums.update(unique)
+            self.keys.extend(map(sys.intern, keys))
+            self.values.extend(values)
+            self.data_types.extend(array('b', [data_type]) * count)
+            self.timestamps.extend(array('q', [timestamp]) * count)
+            self.checksums.extend(checksums)
+            self._metadata.extend(array('L', [index]) * count)
+        else:
+            for key, value, checksum in zip(keys, values, checksums):
+                self._append(
+                    key, value, data_type, timestamp, checksum, index)
+
+    def _append(self, key, value, data_type, timestamp, checksum, index):
+        """Append the attributes of a DataPoint to the batch.
+
+        Args:
+            key: DataPoint key
+            value: DataPoint value
+            data_type: DataPoint data type
+            timestamp: DataPoint timestamp
+            checksum: DataPoint checksum
+            index: Index of the DataPoint metadata provided by _index()
+
+        Returns:
+            None
+
+        """
+        # Ignore duplicates
+        if checksum in self._checksums:
+            return
+        self._checksums.add(checksum)
+
+        # Store
+        self.keys.append(sys.intern(key))
+        self.values.append(value)
+        self.data_types.append(data_type)
+        self.timestamps.append(timestamp)
+        self.checksums.append(checksum)
+        self._metadata.append(index)
+
+    def _index(self, metadata):
+        """Get the index of a set of metadata, storing it only once.
+
+        Args:
+            metadata: Tuple of DataPoint metadata (key, value, hashed)
+                tuples. "hashed" is True if the metadata updates the
+                DataPoint checksum.
+
+        Returns:
+            result: Index
+
+        """
+        # Store each distinct set of metadata only once
+        result = self._metadata_index.get(metadata)
+        if result is None:
+            result = len(self._metadata_sets)
+            metadata = tuple(
+                (sys.intern(key), value, hashed)
+                for key, value, hashed in metadata)
+            self._metadata_sets.append(metadata)
+            self._metadata_index[metadata] = result
+        return result
 
 
 class PostingDataPoints():
     """Object defining DataPoint objects to post to the pattoo server."""
 
-    def __init__(self, agent_id, polling_interval, datapoints):
-        """Initialize the class.
+    def __init__(self, agent_id, polling_interval, datapoints):
+        """Initialize the class.
+
+        Args:
+            agent_id: Unique ID of agent posting data
+            polling_interval: Periodic interval over which the data was polled.
+            datapoints: List of DataPoint objects
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.pattoo_agent_id = agent_id
+        self.pattoo_agent_polling_interval = polling_interval
+        self.pattoo_datapoints = datapoints
+        self.pattoo_timestamp = int(time() * 1000)
+
+        # Validation tests
+        self.valid = False not in [
+            isinstance(self.pattoo_agent_id, str),
+            isinstance(self.pattoo_agent_polling_interval, int),
+            isinstance(self.pattoo_datapoints, dict),
+            self.pattoo_agent_polling_interval is not False,
+            self.pattoo_agent_polling_interval is not True,
+        ]
+        if self.valid is True:
+            self.valid = False not in [
+                self.valid,
+                'datapoint_pairs' in datapoints.keys(),
+                'key_value_pairs' in datapoints.keys()
+                ]
+        if self.valid is True:
+            self.valid = False not in [
+                self.valid,
+                isinstance(datapoints['datapoint_pairs'], list),
+                isinstance(datapoints['key_value_pairs'], dict)
+                ]
+
+
+class TargetDataPoints():
+    """Object defining a list of DataPoint objects.
+
+    Stores DataPoints polled from a specific ip_target.
+
+    """
+
+    def __init__(self, target):
+        """Initialize the class.
+
+        Args:
+            target: Target polled to get the DataPoint objects
+
+        Returns:
+            None
+
+        Variables:
+            self.data: List of all the DataPoints retrieved from the target
+            self.batch: DataPointBatch of DataPoints retrieved from the
+                target. Used when DataPointBatch objects are added.
+            self.valid: True if the object is populated with DataPoints
+
+        """
+        # Initialize key variables
+        self._data = []
+        self.batch = DataPointBatch()
+        self.target = target
+        self.valid = False
+        self._checksums = set()
+
+    def __repr__(self):
+        """Return a representation of the attributes of the class.
+
+        Args:
+            None
+
+        Returns:
+            result: String representation.
+
+        """
+        # Create a printable variation of the value
+        result = (
+            '<{0} target={1}, valid={2}, data={3}'
+            ''.format(
+                self.__class__.__name__,
+                repr(self.target), repr(self.valid), repr(self.data)
+            )
+        )
+        return result
+
+    @property
+    def data(self):
+        """Get all the DataPoint objects retrieved from the target.
+
+        DataPoints stored in self.batch are recreated on every call. The
+        datapoints() and rows() methods, or self.batch itself, are faster
+        ways to read targets with many DataPoints.
+
+        Args:
+            None
+
+        Returns:
+            result: List of DataPoint objects. DataPoints can only be added
+                to it if self.batch is empty, so use add() instead.
+
+        """
+        # Return
+        if bool(self.batch) is False:
+            result = self._data
+        else:
+            result = self._data + list(self.batch)
+        return result
+
+    def add(self, items):
+        """Append DataPoint to the internal self.data list.
+
+        The contents of DataPointBatch objects are added to the internal
+        self.batch DataPointBatch instead.
+
+        Args:
+            items: A DataPoint or DataPointBatch object list
+
+        Returns:
+            None
+
+        """
+        # Ensure there is a list of objects
+        if isinstance(items, list) is False:
+            items = [items]
+        self.extend(items)
+
+    def extend(self, items):
+        """Append many DataPoint objects to the internal self.data list.
+
+        Validity is evaluated once, after all the items are added.
+
+        Args:
+            items: Iterable of DataPoint or DataPointBatch objects
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        checksums = self._checksums
+        added = False
+
+        # Only add DataPoint objects that are not duplicated
+        for item in items:
+            if isinstance(item, DataPoint) is True:
+                checksum = item.checksum
+                if checksum not in checksums:
+                    self._data.append(item)
+                    checksums.add(checksum)
+
+            elif isinstance(item, DataPointBatch) is True:
+                duplicates = checksums.intersection(item.checksums)
+                if bool(duplicates) is False:
+                    # Add the whole batch if there are no duplicates
+                    self.batch.add(item)
+                    checksums.update(item.checksums)
+                else:
+                    # Otherwise add the datapoints one at a time
+                    for datapoint in item:
+                        if datapoint.checksum not in duplicates:
+                            self.batch.add(datapoint)
+                            checksums.add(datapoint.checksum)
+
+            else:
+                continue
+            added = True
+
+        # Set object as being.valid
+        if added is True:
+            self.valid = False not in [
+                bool(self._data) or bool(self.batch), bool(self.target)]
+
+    def add_bulk(self, keys, values, data_type=DATA_INT, timestamp=None,
+                 metadata=None):
+        """Add DataPoints created from columns of keys and values.
+
+        Args:
+            keys: Sequence of DataPoint keys
+            values: Sequence of DataPoint values, the same length as keys
+            data_type: Data type of all the values
+            timestamp: Integer EPOCH timestamp in milliseconds of all the
+                values
+            metadata: MetadataSet or DataPointMetadata object list to add
+                to all the DataPoints
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        batch = DataPoint.from_columns(
+            keys, values, data_type=data_type, timestamp=timestamp,
+            metadata=metadata)
+
+        # Use the new batch instead of copying it if possible
+        if False not in [
+                bool(self.batch) is False,
+                bool(self._checksums.intersection(batch.checksums)) is False]:
+            self.batch = batch
+            self._checksums.update(batch.checksums)
+            self.valid = False not in [
+                bool(self._data) or bool(self.batch), bool(self.target)]
+        else:
+            self.add(batch)
+
+    def datapoints(self):
+        """Get all the DataPoint objects retrieved from the target.
 
         Args:
-            agent_id: Unique ID of agent posting data
-            polling_interval: Periodic interval over which the data was polled.
-            datapoints: List of DataPoint objects
+            None
 
         Returns:
             None
 
+        Yields:
+            result: DataPoint object
+
         """
-        # Initialize key variables
-        self.pattoo_agent_id = agent_id
-        self.pattoo_agent_polling_interval = polling_interval
-        self.pattoo_datapoints = datapoints
-        self.pattoo_timestamp = int(time() * 1000)
+        # Return
+        yield from self._data
+        yield from self.batch
 
-        # Validation tests
-        self.valid = False not in [
-            isinstance(self.pattoo_agent_id, str),
-            isinstance(self.pattoo_agent_polling_interval, int),
-            isinstance(self.pattoo_datapoints, dict),
-            self.pattoo_agent_polling_interval is not False,
-            self.pattoo_agent_polling_interval is not True,
-        ]
-        if self.valid is True:
-            self.valid = False not in [
-                self.valid,
-                'datapoint_pairs' in datapoints.keys(),
-                'key_value_pairs' in datapoints.keys()
-                ]
-        if self.valid is True:
-            self.valid = False not in [
-                self.valid,
-                isinstance(datapoints['datapoint_pairs'], list),
-                isinstance(datapoints['key_value_pairs'], dict)
-                ]
+    def rows(self, metadata=None):
+        """Get the attributes of the valid DataPoints without changing them.
 
+        Rows are in the same order as datapoints(). Each DataPoint is
+        described as if the metadata was added to it, but neither the
+        DataPoint nor the metadata is modified.
 
-class TargetDataPoints():
-    """Object defining a list of DataPoint objects.
+        Args:
+            metadata: MetadataSet to add to each DataPoint
 
-    Stores DataPoints polled from a specific ip_target.
+        Returns:
+            None
+
+        Yields:
+            result: Tuple of (metadata, key, value, data_type, timestamp,
+                checksum). "metadata" is the MetadataSet of the DataPoint
+                and is shared by rows with the same metadata.
+
+        """
+        # Initialize key variables
+        if isinstance(metadata, MetadataSet) is False:
+            metadata = MetadataSet([])
+        unchanged = bool(metadata.hashed) is False
+        merged = {}
+
+        for datapoint in self._data:
+            # Ignore bad data
+            if datapoint.valid is False:
+                continue
+
+            # DataPoints that share a MetadataSet share its metadata dict
+            if bool(datapoint.metadata) is False:
+                _metadata = metadata
+            else:
+                _metadata = merged.get(id(datapoint.metadata))
+                if _metadata is None:
+                    _metadata = metadata.merge(
+                        datapoint.metadata, datapoint._hashed)
+                    merged[id(datapoint.metadata)] = _metadata
+
+            # Return
+            if unchanged is True:
+                checksum = datapoint.checksum
+            else:
+                checksum = _metadata.checksum(
+                    datapoint.key, datapoint.data_type)
+            yield (
+                _metadata, datapoint.key, datapoint.value,
+                datapoint.data_type, datapoint.timestamp, checksum)
+
+        # Merge each distinct set of metadata in the batch only once
+        batch = self.batch
+        sets = []
+        for items in batch._metadata_sets:
+            if bool(items) is False:
+                sets.append(metadata)
+            else:
+                sets.append(metadata.merge(
+                    {key: value for key, value, _ in items},
+                    [key for key, _, hashed in items if hashed is True]))
+
+        for index in range(len(batch)):
+            # Return
+            _metadata = sets[batch._metadata[index]]
+            if unchanged is True:
+                checksum = batch.checksums[index]
+            else:
+                checksum = _metadata.checksum(
+                    batch.keys[index], batch.data_types[index])
+            yield (
+                _metadata, batch.keys[index], batch.values[index],
+                batch.data_types[index], batch.timestamps[index], checksum)
+
+
+class AgentIdentity():
+    """Hostname, agent_id and configuration of an agent program.
+
+    Resolving these requires reading files and a DNS lookup that can take
+    seconds, so they are resolved when first needed and then reused until
+    they expire. Use agent_identity() to get the object shared by the
+    process.
 
     """
 
-    def __init__(self, target):
+    def __init__(self, agent_program, ttl=3600):
         """Initialize the class.
 
         Args:
-            target: Target polled to get the DataPoint objects
+            agent_program: Name of agent program
+            ttl: Seconds before the identity is resolved again
 
         Returns:
             None
 
         Variables:
-            self.data: List of DataPoints retrieved from the target
-            self.valid: True if the object is populated with DataPoints
+            self.hostname: Fully qualified hostname of the agent
+            self.agent_id: agent_id of the agent program
+            self.config: Config object used to get the agent_id
 
         """
         # Initialize key variables
-        self.data = []
-        self.target = target
-        self.valid = False
-        self._checksums = []
+        self.agent_program = agent_program
+        self.ttl = ttl
+        self.hostname = None
+        self.agent_id = None
+        self.config = None
+        self._expiry = None
+        self._lock = threading.Lock()
 
     def __repr__(self):
         """Return a representation of the attributes of the class.
@@ -342,39 +1202,65 @@ class TargetDataPoints():
             result: String representation.
 
         """
-        # Create a printable variation of the value
-        result = (
-            '<{0} target={1}, valid={2}, data={3}'
-            ''.format(
-                self.__class__.__name__,
-                repr(self.target), repr(self.valid), repr(self.data)
-            )
-        )
+        # Return
+        result = ('''\
+<{0} agent_program={1}, agent_id={2}, hostname={3}, ttl={4}>\
+'''.format(self.__class__.__name__, repr(self.agent_program),
+           repr(self.agent_id), repr(self.hostname), repr(self.ttl)))
         return result
 
-    def add(self, items):
-        """Append DataPoint to the internal self.data list.
+    def get(self):
+        """Get the identity, resolving it if it has expired.
+
+        Args:
+            None
+
+        Returns:
+            result: Tuple of (hostname, agent_id)
+
+        """
+        # Resolve only once when many threads find it has expired
+        if self._expiry is None or monotonic() >= self._expiry:
+            with self._lock:
+                if self._expiry is None or monotonic() >= self._expiry:
+                    self._resolve()
+        result = (self.hostname, self.agent_id)
+        return result
+
+    def refresh(self):
+        """Resolve the identity again.
 
         Args:
-            items: A DataPoint object list
+            None
 
         Returns:
             None
 
         """
-        # Ensure there is a list of objects
-        if isinstance(items, list) is False:
-            items = [items]
+        # Refresh
+        with self._lock:
+            self._resolve()
 
-        # Only add DataPoint objects that are not duplicated
-        for item in items:
-            if isinstance(item, DataPoint) is True:
-                if item.checksum not in self._checksums:
-                    self.data.append(item)
-                    self._checksums.append(item.checksum)
+    def _resolve(self):
+        """Resolve the identity.
 
-                # Set object as being.valid
-                self.valid = False not in [bool(self.data), bool(self.target)]
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Get the agent_id
+        from .configuration import Config
+        config = Config()
+        agent_id = files.get_agent_id(self.agent_program, config)
+        hostname = socket.getfqdn()
+
+        # Update
+        (self.config, self.agent_id, self.hostname) = (
+            config, agent_id, hostname)
+        self._expiry = monotonic() + self.ttl
 
 
 class AgentPolledData():
@@ -402,16 +1288,14 @@ class AgentPolledData():
         """
         # Initialize key variables
         self.agent_program = agent_program
-        self.agent_hostname = socket.getfqdn()
         self.agent_timestamp = int(time() * 1000)
         self.data = []
         self.valid = False
         self.agent_polling_interval = polling_interval * 1000
 
-        # Get the agent_id
-        from .configuration import Config
-        config = Config()
-        self.agent_id = files.get_agent_id(agent_program, config)
+        # Get the hostname and agent_id shared by the process
+        (self.agent_hostname, self.agent_id) = agent_identity(
+            agent_program).get()
 
     def __repr__(self):
         """Return a representation of the attributes of the class.
@@ -576,7 +1460,7 @@ class TargetPollingPoints():
         self.data = []
         self.target = target
         self.valid = False
-        self._checksums = []
+        self._checksums = set()
 
     def __repr__(self):
         """Return a representation of the attributes of the class.
@@ -611,6 +1495,22 @@ class TargetPollingPoints():
         # Ensure there is a list of objects
         if isinstance(items, list) is False:
             items = [items]
+        self.extend(items)
+
+    def extend(self, items):
+        """Append many PollingPoint objects to the internal self.data list.
+
+        Validity is evaluated once, after all the items are added.
+
+        Args:
+            items: Iterable of PollingPoint objects
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        added = False
 
         # Only add PollingPoint objects that are not duplicated
         for item in items:
@@ -622,9 +1522,26 @@ class TargetPollingPoints():
                 # Add data to the list
                 if item.checksum not in self._checksums:
                     self.data.append(item)
+                    self._checksums.add(item.checksum)
+                added = True
 
-                # Set object as being.valid
-                self.valid = False not in [bool(self.data), bool(self.target)]
+        # Set object as being.valid
+        if added is True:
+            self.valid = self._valid()
+
+    def _valid(self):
+        """Determine whether the object is valid.
+
+        Args:
+            None
+
+        Returns:
+            result: True if valid
+
+        """
+        # Return
+        result = False not in [bool(self.data), bool(self.target)]
+        return result
 
 
 class IPTargetPollingPoints(TargetPollingPoints):
@@ -652,34 +1569,22 @@ class IPTargetPollingPoints(TargetPollingPoints):
         # Inherit object
         TargetPollingPoints.__init__(self, target)
 
-    def add(self, items):
-        """Append PollingPoint to the internal self.data list.
+    def _valid(self):
+        """Determine whether the object is valid.
+
+        The target must resolve to an IP address.
 
         Args:
-            items: A PollingPoint object list
+            None
 
         Returns:
-            None
+            result: True if valid
 
         """
-        # Ensure there is a list of objects
-        if isinstance(items, list) is False:
-            items = [items]
-
-        # Only add PollingPoint objects that are not duplicated
-        for item in items:
-            if isinstance(item, PollingPoint) is True:
-                # Ignore invalid values
-                if item.valid is False:
-                    continue
-
-                # Add data to the list
-                if item.checksum not in self._checksums:
-                    self.data.append(item)
-
-                # Set object as being.valid
-                self.valid = False not in [
-                    bool(self.data), bool(network.get_ipaddress(self.target))]
+        # Return
+        result = False not in [
+            bool(self.data), bool(network.get_ipaddress(self.target))]
+        return result
 
 
 def _strip_non_printable(value):
@@ -730,43 +1635,266 @@ def _key_value_valid(key, value, metadata=False, override=False):
         result: Tuple of (key, value, valid)
 
     """
-    # Set variables
-    valid = False not in [
-        isinstance(key, (str, int, float)) is True,
-        key is not True,
-        key is not False,
-        key is not None,
-        isinstance(value, (str, int, float)) is True,
-        value is not True,
-        value is not False,
-        value is not None,
-        ]
+    # Validate the value
+    if isinstance(value, (str, int, float)) is False or isinstance(
+            value, bool) is True:
+        return (None, None, False)
+
+    # Validate the key. Keys that can't be cached are never valid.
+    try:
+        key = _key_valid(key, override is False)
+    except TypeError:
+        key = None
+    if key is None:
+        return (None, None, False)
+
+    # Return
+    if bool(metadata) is True:
+        value = str(value).strip()
+    result = (key, value, True)
+    return result
+
+
+@functools.lru_cache(maxsize=65536, typed=True)
+def _key_valid(key, strict):
+    """Create a standardized version of a key, remembering recent ones.
+
+    Agents use the same keys every polling cycle.
+
+    Args:
+        key: Key
+        strict: Don't allow the 'pattoo' string in the key if True
+
+    Returns:
+        result: Standardized key. None if invalid.
+
+    """
+    # Validate the key
+    if isinstance(key, (str, int, float)) is False or isinstance(
+            key, bool) is True:
+        return None
+    result = str(key).lower().strip()
+    if result == '' or (strict is True and 'pattoo' in result):
+        return None
+    return result
+
+
+def _key_column(keys):
+    """Validate a column of keys the same way as _key_valid().
 
-    # Assign key, value
-    if valid is True:
-        key = str(key).lower().strip()
-
-        # Reevaluate valid
-        valid = False not in [
-            valid,
-            key != '']
-
-        # 'pattoo' normally cannot be in the key.
-        if override is False:
-            valid = False not in [
-                valid,
-                'pattoo' not in key.lower()]
-
-    # Assign values
-    if valid is True:
-        if bool(metadata) is True:
-            value = str(value).strip()
+    Keys are not cached, as columns can have more keys than the cache.
+
+    Args:
+        keys: Sequence of keys
+
+    Returns:
+        result: List of standardized keys. None replaces invalid keys.
+
+    """
+    # Keys that are all strings are standardized with C string methods
+    keys = list(keys)
+    if set(map(type, keys)) <= {str}:
+        result = [
+            key if key != '' and 'pattoo' not in key else None
+            for key in map(str.strip, map(str.lower, keys))]
     else:
-        key = None
-        value = None
+        result = [_key_valid.__wrapped__(key, True) for key in keys]
+    return result
+
+
+def _value_column(values, data_type):
+    """Validate and convert a column of values the same way as DataPoint().
+
+    Args:
+        values: Sequence of values
+        data_type: Data type of all the values
+
+    Returns:
+        result: List of values. None replaces invalid values.
+
+    """
+    # Columns of numbers, or of strings to be stored as strings, are valid
+    values = list(values)
+    types = set(map(type, values))
+    if types <= {int, float}:
+        if data_type == DATA_STRING:
+            result = list(map(str, values))
+        else:
+            result = values
+    elif types <= {str} and data_type == DATA_STRING:
+        result = values
+    else:
+        result = [_value_valid(value, data_type) for value in values]
+    return result
+
+
+def _value_valid(value, data_type):
+    """Validate and convert a DataPoint value the same way as DataPoint().
+
+    Args:
+        value: Value
+        data_type: Data type of the value
+
+    Returns:
+        result: Converted value. None if invalid.
+
+    """
+    # Validate
+    if isinstance(value, (str, int, float)) is False or isinstance(
+            value, bool) is True:
+        return None
+
+    # Convert
+    if data_type == DATA_STRING:
+        result = str(value)
+    elif isinstance(value, str) is True:
+        try:
+            if data_type == DATA_INT:
+                result = int(float(value))
+            else:
+                result = float(value)
+        except:
+            result = None
+    else:
+        result = value
+    return result
+
+
+def agent_identity(agent_program):
+    """Get the AgentIdentity of an agent program shared by the process.
 
+    Args:
+        agent_program: Name of agent program
+
+    Returns:
+        result: AgentIdentity object
+
+    """
+    # Create the object once
+    with _IDENTITIES_LOCK:
+        result = _IDENTITIES.get(agent_program)
+        if result is None:
+            result = AgentIdentity(agent_program)
+            _IDENTITIES[agent_program] = result
+    return result
+
+
+def checksum_mode(mode):
+    """Set the way DataPoint checksums are calculated.
+
+    Args:
+        mode: CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL or CHECKSUM_FAST
+
+    Returns:
+        None
+
+    """
+    # Set mode
+    if mode not in [CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST]:
+        raise ValueError('Invalid checksum mode {}'.format(repr(mode)))
+    _CHECKSUM['mode'] = mode
+    if mode == CHECKSUM_FAST:
+        _CHECKSUM['hasher'] = data.fast_hasher
+    else:
+        _CHECKSUM['hasher'] = hashlib.sha256
+
+
+def _checksum(key, data_type, items):
+    """Calculate a DataPoint checksum.
+
+    In CHECKSUM_COMPATIBLE mode the key and data_type are hashed, and the
+    hash is then rehashed with each metadata item in the order it was added.
+    In CHECKSUM_CANONICAL mode everything is hashed once, metadata sorted by
+    key first, so the order in which metadata is added doesn't matter and
+    the hash of shared metadata can be reused. CHECKSUM_FAST is the same as
+    CHECKSUM_CANONICAL, but uses 128 bit BLAKE2b hashes.
+
+    Args:
+        key: DataPoint key
+        data_type: DataPoint data_type
+        items: List of metadata (key, value) tuples that update the checksum
+
+    Returns:
+        result: Checksum
+
+    """
+    # Canonical
+    if _CHECKSUM['mode'] != CHECKSUM_COMPATIBLE:
+        hasher = _checksum_prefix(items)
+        hasher.update('{}\x1f{}'.format(key, data_type).encode())
+        result = hasher.hexdigest()
+        return result
+
+    # Compatible
+    result = _checksum_compatible(key, data_type, _checksum_chain(items))
+    return result
+
+
+def _checksum_chain(items):
+    """Encode metadata for CHECKSUM_COMPATIBLE checksums.
+
+    Args:
+        items: List of metadata (key, value) tuples that update the checksum
+
+    Returns:
+        result: List of bytes to hash after the key and data_type, in order
+
+    """
+    # Return
+    result = [
+        '{}{}'.format(key, value).encode() for key, value in items]
+    return result
+
+
+def _checksum_compatible(key, data_type, chain):
+    """Calculate a CHECKSUM_COMPATIBLE DataPoint checksum.
+
+    Args:
+        key: DataPoint key
+        data_type: DataPoint data_type
+        chain: Encoded metadata provided by _checksum_chain()
+
+    Returns:
+        result: Checksum
+
+    """
+    # Rehash the hash of the key and data_type with each metadata item
+    sha256 = hashlib.sha256
+    result = sha256('{}{}'.format(key, data_type).encode()).hexdigest()
+    for item in chain:
+        result = sha256(result.encode() + item).hexdigest()
+    return result
+
+
+def _checksum_prefix(items):
+    """Hash metadata for CHECKSUM_CANONICAL and CHECKSUM_FAST checksums.
+
+    Args:
+        items: List of metadata (key, value) tuples that update the checksum
+
+    Returns:
+        result: hashlib hasher object
+
+    """
+    # Return
+    result = _CHECKSUM['hasher'](_checksum_metadata(items))
+    return result
+
+
+def _checksum_metadata(items):
+    """Encode metadata for CHECKSUM_CANONICAL and CHECKSUM_FAST checksums.
+
+    Args:
+        items: List of metadata (key, value) tuples that update the checksum
+
+    Returns:
+        result: Bytes to hash before the key and data_type
+
+    """
     # Return
-    result = (key, value, valid)
+    result = b''.join(
+        '{}\x1f{}\x1e'.format(key, value).encode()
+        for key, value in sorted(items))
     return result
 
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark the creation of DataPoints from columns of keys and values.
+
+This script compares the time taken to add DataPoints to a DataPointBatch
+one at a time and with DataPointBatch.add_columns(), in each checksum mode.
+
+"""
+
+from __future__ import print_function
+import os
+import sys
+import argparse
+from time import perf_counter
+
+# Try to create a working PYTHONPATH
+DEV_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(
+    os.path.abspath(os.path.join(DEV_DIR, os.pardir)), os.pardir))
+_EXPECTED = '{0}pattoo-shared{0}tests{0}bin'.format(os.sep)
+if DEV_DIR.endswith(_EXPECTED) is True:
+    sys.path.insert(0, ROOT_DIR)
+else:
+    print('''This script is not installed in the "{0}" directory. Please fix.\
+'''.format(_EXPECTED))
+    sys.exit(2)
+
+# pattoo-shared libraries
+from pattoo_shared import variables
+from pattoo_shared.variables import (
+    DataPoint, DataPointBatch, DataPointMetadata, MetadataSet)
+from pattoo_shared.constants import (
+    CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST)
+
+
+def main():
+    """Benchmark bulk DataPoint creation.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Set up parser
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--datapoints', help='Number of DataPoints in the columns',
+        type=int, default=100000)
+    parser.add_argument(
+        '--metadata', help='Number of metadata items of each DataPoint',
+        type=int, default=2)
+    args = parser.parse_args()
+
+    # Create the columns of a synthetic agent
+    keys = [
+        'interface_{}_ifhcinoctets'.format(_) for _ in range(args.datapoints)]
+    values = list(range(args.datapoints))
+    metadata = MetadataSet([
+        DataPointMetadata('koala_{}'.format(_), 'bear')
+        for _ in range(args.metadata)])
+
+    # Time each checksum mode
+    print('{:<12} {:>14} {:>12} {:>8}'.format(
+        'Mode', 'DataPoint (s)', 'Columns (s)', 'Speedup'))
+    for mode in [CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST]:
+        variables.checksum_mode(mode)
+        single_time = _single(keys, values, metadata)
+        columns_time = _columns(keys, values, metadata)
+        print('{:<12} {:>14.3f} {:>12.3f} {:>7.1f}x'.format(
+            mode, single_time, columns_time, single_time / columns_time))
+    variables.checksum_mode(CHECKSUM_COMPATIBLE)
+
+
+def _single(keys, values, metadata):
+    """Add DataPoints to a DataPointBatch one at a time.
+
+    Args:
+        keys: List of keys
+        values: List of values
+        metadata: MetadataSet of all the DataPoints
+
+    Returns:
+        result: Duration in seconds
+
+    """
+    # Return
+    start = perf_counter()
+    batch = DataPointBatch()
+    for key, value in zip(keys, values):
+        datapoint = DataPoint(key, value, timestamp=1)
+        datapoint.add(metadata)
+        batch.add(datapoint)
+    result = perf_counter() - start
+    return result
+
+
+def _columns(keys, values, metadata):
+    """Add DataPoints to a DataPointBatch from columns.
+
+    Args:
+        keys: List of keys
+        values: List of values
+        metadata: MetadataSet of all the DataPoints
+
+    Returns:
+        result: Duration in seconds
+
+    """
+    # Return
+    start = perf_counter()
+    DataPointBatch().add_columns(keys, values, timestamp=1, metadata=metadata)
+    result = perf_counter() - start
+    return result
+
+
+if __name__ == '__main__':
+    main()
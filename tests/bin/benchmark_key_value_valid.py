@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark the validation of DataPoint keys by a large synthetic agent.
+
+Agents validate the same keys every polling cycle, so the results of
+variables._key_value_valid() are cached. This script compares the time
+taken to validate keys and create DataPoints with and without the cache.
+
+"""
+
+from __future__ import print_function
+import os
+import sys
+import argparse
+from time import perf_counter
+
+# Try to create a working PYTHONPATH
+DEV_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(
+    os.path.abspath(os.path.join(DEV_DIR, os.pardir)), os.pardir))
+_EXPECTED = '{0}pattoo-shared{0}tests{0}bin'.format(os.sep)
+if DEV_DIR.endswith(_EXPECTED) is True:
+    sys.path.insert(0, ROOT_DIR)
+else:
+    print('''This script is not installed in the "{0}" directory. Please fix.\
+'''.format(_EXPECTED))
+    sys.exit(2)
+
+# pattoo-shared libraries
+from pattoo_shared import variables
+
+
+def main():
+    """Benchmark key validation.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Set up parser
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--datapoints', help='Number of DataPoints per polling cycle',
+        type=int, default=1000000)
+    parser.add_argument(
+        '--keys', help='Number of distinct keys used by the agent',
+        type=int, default=5000)
+    args = parser.parse_args()
+
+    # Create the keys of a synthetic agent
+    keys = [
+        'Interface_{}_ifHCInOctets '.format(_) for _ in range(args.keys)]
+
+    # Time each test with and without the cache
+    cached = variables._key_valid
+    print('{:<20} {:>12} {:>12} {:>8}'.format(
+        'Test', 'Uncached (s)', 'Cached (s)', 'Speedup'))
+    for name, function in [
+            ('_key_value_valid()', _validate), ('DataPoint()', _create)]:
+        variables._key_valid = cached.__wrapped__
+        uncached_time = function(keys, args.datapoints)
+        variables._key_valid = cached
+        cached.cache_clear()
+        cached_time = function(keys, args.datapoints)
+        print('{:<20} {:>12.3f} {:>12.3f} {:>7.1f}x'.format(
+            name, uncached_time, cached_time, uncached_time / cached_time))
+
+
+def _validate(keys, datapoints):
+    """Validate the keys and values of DataPoints.
+
+    Args:
+        keys: List of keys
+        datapoints: Number of DataPoints
+
+    Returns:
+        result: Duration in seconds
+
+    """
+    # Initialize key variables
+    count = len(keys)
+    _key_value_valid = variables._key_value_valid
+
+    # Return
+    start = perf_counter()
+    for index in range(datapoints):
+        _key_value_valid(keys[index % count], index)
+    result = perf_counter() - start
+    return result
+
+
+def _create(keys, datapoints):
+    """Create DataPoints.
+
+    Args:
+        keys: List of keys
+        datapoints: Number of DataPoints
+
+    Returns:
+        result: Duration in seconds
+
+    """
+    # Initialize key variables
+    count = len(keys)
+    DataPoint = variables.DataPoint
+
+    # Return
+    start = perf_counter()
+    for index in range(datapoints):
+        DataPoint(keys[index % count], index, timestamp=index)
+    result = perf_counter() - start
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Test the cache module."""
+
+# Standard imports
+import unittest
+import os
+import sys
+import json
+import zlib
+import tempfile
+
+# Try to create a working PYTHONPATH
+EXEC_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(
+    os.path.abspath(os.path.join(EXEC_DIR, os.pardir)), os.pardir))
+_EXPECTED = '{0}pattoo-shared{0}tests{0}test_pattoo_shared'.format(os.sep)
+if EXEC_DIR.endswith(_EXPECTED) is True:
+    # We need to prepend the path in case PattooShared has been installed
+    # elsewhere on the system using PIP. This could corrupt expected results
+    sys.path.insert(0, ROOT_DIR)
+else:
+    print('''This script is not installed in the "{0}" directory. Please fix.\
+'''.format(_EXPECTED))
+    sys.exit(2)
+
+# Pattoo imports
+from pattoo_shared import cache
+from pattoo_shared import compression
+from tests.libraries.configuration import UnittestConfig
+
+
+class TestSegmentLog(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        # Create a log with a partially written record
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(directory)
+        self.assertTrue(segment_log.append({'koala': 1}))
+        filepath = segment_log._filepath(0)
+        size = os.path.getsize(filepath)
+        with open(filepath, 'ab') as f_handle:
+            payload = cache.Payload({'panda': 2})
+            f_handle.write((cache._header(payload) + b''.join(payload))[:-3])
+
+        # The partial record must be removed
+        segment_log = cache.SegmentLog(directory)
+        self.assertEqual(os.path.getsize(filepath), size)
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], [{'koala': 1}])
+
+    def test_append(self):
+        """Testing method or function named append."""
+        # Create log with small segments
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(directory, segment_size=10)
+
+        # Each record must be placed in a new segment
+        for value in range(3):
+            self.assertTrue(segment_log.append({'koala': value}))
+        self.assertEqual(segment_log._segments(), [0, 1, 2])
+        self.assertEqual(segment_log._segment, 2)
+        self.assertEqual(
+            segment_log._size, os.path.getsize(segment_log._filepath(2)))
+
+        # Segments must not be listed when appending
+        segment_log._segments = None
+        self.assertTrue(segment_log.append({'koala': 3}))
+        del segment_log._segments
+        self.assertEqual(segment_log._segments(), [0, 1, 2, 3])
+
+        # Segments started by other processes must be followed
+        other = cache.SegmentLog(directory, segment_size=10)
+        self.assertEqual(other._segment, 3)
+        self.assertTrue(other.append({'koala': 4}))
+        self.assertTrue(segment_log.append({'koala': 5}))
+        self.assertEqual(segment_log._segment, 5)
+        self.assertEqual(
+            [_[0]['koala'] for _ in segment_log.records()], list(range(6)))
+
+    def test_append_compressed(self):
+        """Testing method or function named append with compression."""
+        # Initialize key variables
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(
+            directory, encoding='gzip', minimum=100)
+        small = {'koala': 0}
+        large = {'koala': 'bear' * 100}
+
+        # Only large data must be compressed
+        self.assertTrue(segment_log.append(small))
+        self.assertTrue(segment_log.append(large))
+        with open(segment_log._filepath(0), 'rb') as f_handle:
+            flags = [_[1] for _ in cache._records(f_handle, None)]
+        self.assertEqual(flags, [0, cache._FLAGS['gzip']])
+        self.assertTrue(
+            os.path.getsize(segment_log._filepath(0)) < len(str(large)))
+
+        # Compressed data must be replayed. Sizes are uncompressed.
+        result = list(segment_log.records())
+        self.assertEqual([_[0] for _ in result], [small, large])
+        self.assertEqual(
+            result[1][1], cache._HEADER.size + len(json.dumps(large)))
+
+    def test_records(self):
+        """Testing method or function named records."""
+        # Initialize key variables
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(directory, segment_size=10)
+        for value in range(3):
+            segment_log.append({'koala': value})
+
+        # Test
+        result = list(segment_log.records())
+        self.assertEqual(
+            [_[0] for _ in result], [{'koala': 0}, {'koala': 1}, {'koala': 2}])
+        for _, size, position in result:
+            self.assertEqual(size, cache._HEADER.size + len('{"koala": 0}'))
+            self.assertEqual(position[1], size)
+
+        # Corrupted data must be skipped
+        with open(segment_log._filepath(1), 'r+b') as f_handle:
+            f_handle.seek(cache._HEADER.size + 2)
+            f_handle.write(b'X')
+        result = list(segment_log.records())
+        self.assertEqual([_[0] for _ in result], [{'koala': 0}, {'koala': 2}])
+
+        # Data with unsupported compression must be reported as such
+        payload = b'{"koala": 3}'
+        _append_record(segment_log, 7, payload)
+        if compression.zstandard is None:
+            _append_record(segment_log, cache._FLAGS['zstd'], payload)
+        result = list(segment_log.records())[2:]
+        self.assertTrue(bool(result))
+        for data, size, _ in result:
+            self.assertIs(data, cache.UNSUPPORTED)
+            self.assertEqual(size, cache._HEADER.size + len(payload))
+
+    def test_commit(self):
+        """Testing method or function named commit."""
+        # Initialize key variables
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(directory, segment_size=10)
+        for value in range(3):
+            segment_log.append({'koala': value})
+        positions = [_[2] for _ in segment_log.records()]
+
+        # Committed records must not be replayed
+        segment_log.commit(positions[1])
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], [{'koala': 2}])
+        self.assertEqual(segment_log._segments(), [1, 2])
+
+        # The checkpoint must never move backwards
+        segment_log.commit(positions[0])
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], [{'koala': 2}])
+
+        # The checkpoint must survive restarts
+        segment_log = cache.SegmentLog(directory, segment_size=10)
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], [{'koala': 2}])
+        segment_log.commit(positions[2])
+        self.assertEqual(list(segment_log.records()), [])
+        segment_log.append({'koala': 3})
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], [{'koala': 3}])
+
+
+class TestPayload(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    data = {
+        'pattoo_agent_id': 'koala',
+        'pattoo_datapoints': {
+            'key_value_pairs': {0: ['bear', 1.5], 1: ['panda', None]},
+            'datapoint_pairs': [[0, 1], [1], []]},
+        'empty': {},
+        'unicode': 'münchen'}
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        # Uncompressed data must be identical to json.dumps()
+        payload = cache.Payload(self.data)
+        self.assertIsNone(payload.encoding)
+        self.assertEqual(payload.flags, 0)
+        self.assertEqual(b''.join(payload), json.dumps(self.data).encode())
+
+        # Small data must not be compressed
+        payload = cache.Payload(self.data, encoding='gzip', minimum=1000)
+        self.assertIsNone(payload.encoding)
+
+        # Large data must be compressed
+        payload = cache.Payload(self.data, encoding='gzip', minimum=10)
+        self.assertEqual(payload.encoding, 'gzip')
+        self.assertEqual(payload.flags, cache._FLAGS['gzip'])
+        self.assertEqual(
+            compression.decompress(b''.join(payload), 'gzip'),
+            json.dumps(self.data).encode())
+
+    def test___len__(self):
+        """Testing method or function named __len__."""
+        # Test
+        payload = cache.Payload(self.data)
+        self.assertEqual(len(payload), len(json.dumps(self.data)))
+
+    def test___iter__(self):
+        """Testing method or function named __iter__."""
+        # Large data must be moved to a temporary file
+        data = {'koala': ['bear' * 100] * 1000}
+        payload = cache.Payload(data, spool_size=1000)
+        self.assertIsNotNone(payload._file)
+        self.assertEqual(payload._chunks, [])
+
+        # Data must be readable more than once
+        for _ in range(2):
+            self.assertEqual(b''.join(payload), json.dumps(data).encode())
+
+
+class TestBasicFunctions(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test__iterencode(self):
+        """Testing method or function named _iterencode."""
+        # Test
+        for data in [
+                TestPayload.data, [], {}, [[[[1]]]], 'koala', 1, None,
+                {True: 1, False: 2, None: 3, 1.5: 4}]:
+            result = b''.join(cache._iterencode(data, chunk_size=5))
+            self.assertEqual(result, json.dumps(data).encode())
+
+    def test__records(self):
+        """Testing method or function named _records."""
+        # Initialize key variables
+        directory = tempfile.mkdtemp()
+        segment_log = cache.SegmentLog(directory)
+        for value in range(3):
+            segment_log.append({'koala': value})
+        filepath = segment_log._filepath(0)
+        record = cache._HEADER.size + len('{"koala": 0}')
+
+        # Records must be read from the start offset
+        with open(filepath, 'rb') as f_handle:
+            result = list(cache._records(f_handle, filepath, start=record))
+        self.assertEqual(
+            [_[0] for _ in result], [b'{"koala": 1}', b'{"koala": 2}'])
+        self.assertEqual(
+            [_[2:] for _ in result],
+            [(record, record * 2), (record * 2, record * 3)])
+
+        # Corrupted data and incomplete records must be skipped
+        with open(filepath, 'r+b') as f_handle:
+            f_handle.seek(record)
+            f_handle.write(b'XX')
+            f_handle.seek(0, os.SEEK_END)
+            f_handle.write(b'PC' + b'X' * cache._HEADER.size)
+        with open(filepath, 'rb') as f_handle:
+            result = list(cache._records(f_handle, filepath))
+        self.assertEqual(
+            [_[0] for _ in result], [b'{"koala": 0}', b'{"koala": 2}'])
+
+    def test__find(self):
+        """Testing method or function named _find."""
+        # Initialize key variables
+        with tempfile.TemporaryFile() as f_handle:
+            f_handle.write(b'XXXPCXXXPC')
+            f_handle.flush()
+
+            # Magic numbers split across chunks must be found
+            for chunk_size in [2, 3, 4, 100]:
+                self.assertEqual(cache._find(f_handle, 0, 10, chunk_size), 3)
+                self.assertEqual(cache._find(f_handle, 4, 10, chunk_size), 8)
+                self.assertEqual(cache._find(f_handle, 4, 9, chunk_size), -1)
+                self.assertEqual(cache._find(f_handle, 9, 10, chunk_size), -1)
+
+    def test__key(self):
+        """Testing method or function named _key."""
+        # Test
+        self.assertEqual(cache._key('koala'), '"koala"')
+        self.assertEqual(cache._key(1), '"1"')
+        self.assertEqual(cache._key(True), '"true"')
+        with self.assertRaises(TypeError):
+            cache._key((1, 2))
+
+
+def _append_record(segment_log, flags, payload):
+    """Append a record with any flags to the newest segment of a log.
+
+    Args:
+        segment_log: cache.SegmentLog object
+        flags: Record flags
+        payload: Bytes of the record
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    checksum = zlib.crc32(payload, zlib.crc32(bytes([flags])))
+    filepath = segment_log._filepath(segment_log._segments()[-1])
+
+    # Append
+    with open(filepath, 'ab') as f_handle:
+        f_handle.write(cache._HEADER.pack(
+            cache._MAGIC, flags, len(payload), checksum))
+        f_handle.write(payload)
+
+
+if __name__ == '__main__':
+    # Make sure the environment is OK to run unittests
+    UnittestConfig().create()
+
+    # Do the unit test
+    unittest.main()
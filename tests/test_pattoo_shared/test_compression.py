@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test the compression module."""
+
+# Standard imports
+import unittest
+import os
+import sys
+
+# Try to create a working PYTHONPATH
+EXEC_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(
+    os.path.abspath(os.path.join(EXEC_DIR, os.pardir)), os.pardir))
+_EXPECTED = '{0}pattoo-shared{0}tests{0}test_pattoo_shared'.format(os.sep)
+if EXEC_DIR.endswith(_EXPECTED) is True:
+    # We need to prepend the path in case PattooShared has been installed
+    # elsewhere on the system using PIP. This could corrupt expected results
+    sys.path.insert(0, ROOT_DIR)
+else:
+    print('''This script is not installed in the "{0}" directory. Please fix.\
+'''.format(_EXPECTED))
+    sys.exit(2)
+
+# Pattoo imports
+from pattoo_shared import compression
+from tests.libraries.configuration import UnittestConfig
+
+
+class TestBasicFunctions(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test_encoding(self):
+        """Testing method or function named encoding."""
+        # Test
+        self.assertEqual(compression.encoding('GZIP'), 'gzip')
+        self.assertIsNone(compression.encoding('none'))
+        self.assertIsNone(compression.encoding(None))
+        self.assertIsNone(compression.encoding(False))
+        self.assertIsNone(compression.encoding('koala'))
+
+        # zstd falls back to gzip if the zstandard package isn't installed
+        if compression.zstandard is None:
+            self.assertEqual(compression.encoding('zstd'), 'gzip')
+        else:
+            self.assertEqual(compression.encoding('zstd'), 'zstd')
+
+    def test_supported(self):
+        """Testing method or function named supported."""
+        # Test
+        self.assertTrue(compression.supported(None))
+        self.assertTrue(compression.supported('gzip'))
+        self.assertFalse(compression.supported('koala'))
+        self.assertEqual(
+            compression.supported('zstd'), compression.zstandard is not None)
+
+    def test_compressor(self):
+        """Testing method or function named compressor."""
+        # Initialize key variables
+        payload = b'{"koala": "bear"}' * 100
+
+        # Test
+        self.assertIsNone(compression.compressor(None))
+        compressor = compression.compressor('gzip')
+        result = compressor.compress(payload) + compressor.flush()
+        self.assertTrue(len(result) < len(payload))
+
+    def test_decompress(self):
+        """Testing method or function named decompress."""
+        # Initialize key variables
+        payload = b'{"koala": "bear"}' * 100
+
+        # Test
+        self.assertEqual(compression.decompress(payload, None), payload)
+        for encoding in ['gzip', 'zstd']:
+            encoding = compression.encoding(encoding)
+            compressor = compression.compressor(encoding)
+            result = compression.decompress(
+                compressor.compress(payload) + compressor.flush(), encoding)
+            self.assertEqual(result, payload)
+
+
+if __name__ == '__main__':
+    # Make sure the environment is OK to run unittests
+    UnittestConfig().create()
+
+    # Do the unit test
+    unittest.main()
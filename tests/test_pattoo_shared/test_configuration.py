@@ -5,6 +5,8 @@
 import unittest
 import os
 import sys
+import copy
+import signal
 
 
 # Try to create a working PYTHONPATH
@@ -87,6 +89,96 @@ class TestConfig(unittest.TestCase):
         result = self.config.agent_api_server_url(agent_id)
         self.assertEqual(result, expected)
 
+    def test_agent_api_pool_size(self):
+        """Testing function agent_api_pool_size."""
+        # Test default
+        result = self.config.agent_api_pool_size()
+        self.assertEqual(result, 10)
+
+    def test_agent_api_idle_timeout(self):
+        """Testing function agent_api_idle_timeout."""
+        # Test default
+        result = self.config.agent_api_idle_timeout()
+        self.assertEqual(result, 60)
+
+    def test_agent_api_batch_size_bytes(self):
+        """Testing function agent_api_batch_size_bytes."""
+        # Test default
+        result = self.config.agent_api_batch_size_bytes()
+        self.assertEqual(result, 5242880)
+
+    def test_agent_api_batch_size_datapoints(self):
+        """Testing function agent_api_batch_size_datapoints."""
+        # Test default
+        result = self.config.agent_api_batch_size_datapoints()
+        self.assertEqual(result, 50000)
+
+    def test_agent_api_queue_size(self):
+        """Testing function agent_api_queue_size."""
+        # Test default
+        result = self.config.agent_api_queue_size()
+        self.assertEqual(result, 100)
+
+    def test_agent_api_backoff_initial(self):
+        """Testing function agent_api_backoff_initial."""
+        # Test default
+        result = self.config.agent_api_backoff_initial()
+        self.assertEqual(result, 1)
+
+    def test_agent_api_backoff_maximum(self):
+        """Testing function agent_api_backoff_maximum."""
+        # Test default
+        result = self.config.agent_api_backoff_maximum()
+        self.assertEqual(result, 300)
+
+    def test_agent_api_connect_timeout(self):
+        """Testing function agent_api_connect_timeout."""
+        # Test default
+        result = self.config.agent_api_connect_timeout()
+        self.assertEqual(result, 10)
+
+    def test_agent_api_read_timeout(self):
+        """Testing function agent_api_read_timeout."""
+        # Test default
+        result = self.config.agent_api_read_timeout()
+        self.assertEqual(result, 30)
+
+    def test_agent_api_cycle_timeout(self):
+        """Testing function agent_api_cycle_timeout."""
+        # Test default
+        result = self.config.agent_api_cycle_timeout()
+        self.assertEqual(result, 120)
+
+    def test_agent_api_compression(self):
+        """Testing function agent_api_compression."""
+        # Test default
+        result = self.config.agent_api_compression()
+        self.assertEqual(result, 'none')
+
+    def test_agent_api_compression_minimum(self):
+        """Testing function agent_api_compression_minimum."""
+        # Test default
+        result = self.config.agent_api_compression_minimum()
+        self.assertEqual(result, 1024)
+
+    def test_agent_api_dictionary(self):
+        """Testing function agent_api_dictionary."""
+        # Test default
+        result = self.config.agent_api_dictionary()
+        self.assertFalse(result)
+
+    def test_agent_api_delta(self):
+        """Testing function agent_api_delta."""
+        # Test default
+        result = self.config.agent_api_delta()
+        self.assertFalse(result)
+
+    def test_agent_api_delta_keyframe(self):
+        """Testing function agent_api_delta_keyframe."""
+        # Test default
+        result = self.config.agent_api_delta_keyframe()
+        self.assertEqual(result, 10)
+
     def test_web_api_ip_address(self):
         """Testing method or function named web_api_ip_address."""
         # Test
@@ -214,6 +306,95 @@ class TestBasicFunctions(unittest.TestCase):
             self.assertEqual(value.address, oids[index])
             self.assertEqual(value.multiplier, 8)
 
+    def test__config_reader(self):
+        """Testing function _config_reader."""
+        # Initialize key variables
+        filename = '{}{}pattoo.yaml'.format(
+            os.path.expanduser(log.check_environment()), os.sep)
+        status = os.stat(filename)
+
+        # Files are only parsed once
+        result = configuration._config_reader('pattoo.yaml')
+        self.assertTrue(isinstance(result, dict))
+        self.assertTrue(bool(result))
+        self.assertIs(configuration._config_reader('pattoo.yaml'), result)
+
+        # Files are parsed again after they change
+        os.utime(filename, ns=(status.st_atime_ns, status.st_mtime_ns + 1))
+        changed = configuration._config_reader('pattoo.yaml')
+        os.utime(filename, ns=(status.st_atime_ns, status.st_mtime_ns))
+        self.assertIsNot(changed, result)
+        self.assertEqual(changed, result)
+
+        # The result can't be changed
+        with self.assertRaises(TypeError):
+            result['pattoo'] = None
+        with self.assertRaises(TypeError):
+            result['pattoo'].update({'language': 'koala'})
+
+    def test__read_only_copy(self):
+        """Testing function _read_only_copy."""
+        # Initialize key variables
+        value = {'a': {'b': [1, {'c': 2}]}, 'd': None}
+        result = configuration._read_only_copy(value)
+        self.assertEqual(result, value)
+
+        # Test changes
+        for function in [
+                lambda: result.update({'e': 1}),
+                lambda: result.pop('d'),
+                lambda: result['a'].setdefault('e', 1),
+                lambda: result['a']['b'].append(3),
+                lambda: result['a']['b'].sort(),
+                lambda: result['a']['b'][1].clear()]:
+            with self.assertRaises(TypeError):
+                function()
+        with self.assertRaises(TypeError):
+            del result['d']
+        with self.assertRaises(TypeError):
+            result['a']['b'][0] = 3
+        self.assertEqual(result, value)
+
+        # Copies can be changed
+        duplicate = copy.deepcopy(result)
+        duplicate['a']['b'].append(3)
+        self.assertEqual(duplicate['a']['b'], [1, {'c': 2}, 3])
+
+    def test_reload(self):
+        """Testing function reload."""
+        # Test
+        result = configuration._config_reader('pattoo.yaml')
+        configuration.reload()
+        self.assertIsNot(configuration._config_reader('pattoo.yaml'), result)
+
+    def test_generation(self):
+        """Testing function generation."""
+        # The generation only changes when files are parsed again
+        configuration.Config()
+        result = configuration.generation()
+        configuration.Config()
+        self.assertEqual(configuration.generation(), result)
+        configuration.reload()
+        self.assertNotEqual(configuration.generation(), result)
+        result = configuration.generation()
+        configuration.Config()
+        self.assertNotEqual(configuration.generation(), result)
+
+    def test_reload_on_sighup(self):
+        """Testing function reload_on_sighup."""
+        # Initialize key variables
+        previous = signal.getsignal(signal.SIGHUP)
+        calls = []
+        signal.signal(signal.SIGHUP, lambda *args: calls.append(args))
+
+        # Test
+        configuration.reload_on_sighup()
+        result = configuration._config_reader('pattoo.yaml')
+        os.kill(os.getpid(), signal.SIGHUP)
+        self.assertIsNot(configuration._config_reader('pattoo.yaml'), result)
+        self.assertEqual(len(calls), 1)
+        signal.signal(signal.SIGHUP, previous)
+
     def test_search(self):
         """Testing function search."""
         # Initialize key variables
@@ -5,6 +5,7 @@
 import unittest
 import os
 import sys
+import json
 from time import sleep
 
 # Try to create a working PYTHONPATH
@@ -23,15 +24,251 @@ else:
 
 # Pattoo imports
 from pattoo_shared import converter
+from pattoo_shared import data
 from pattoo_shared.configuration import Config
 from pattoo_shared.variables import (
-    DataPointMetadata, DataPoint, TargetDataPoints, AgentPolledData)
+    DataPointMetadata, DataPoint, DataPointBatch, TargetDataPoints,
+    AgentPolledData, MetadataSet)
 from pattoo_shared.constants import (
     DATA_FLOAT, DATA_INT, DATA_COUNT64, DATA_COUNT, DATA_STRING, DATA_NONE,
     DATAPOINT_KEYS, PattooDBrecord)
 from tests.libraries.configuration import UnittestConfig
 
 
+class TestPairDictionary(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing function __init__."""
+        # Test
+        dictionary = converter.PairDictionary()
+        self.assertEqual(len(dictionary.version), 32)
+        self.assertEqual(dictionary.pairs, {})
+
+    def test_reset(self):
+        """Testing function reset."""
+        # Test
+        dictionary = converter.PairDictionary()
+        version = dictionary.version
+        dictionary.counter('koala', 'bear')
+        dictionary.reset()
+        self.assertNotEqual(dictionary.version, version)
+        self.assertEqual(dictionary.pairs, {})
+        dictionary.reset(version='panda')
+        self.assertEqual(dictionary.version, 'panda')
+
+    def test_encode(self):
+        """Testing function encode."""
+        # Initialize key variables
+        dictionary = converter.PairDictionary()
+
+        # All pairs must be posted the first time
+        result = dictionary.encode(_posting_data(1))
+        self.assertEqual(
+            result['pattoo_dictionary'],
+            {'version': dictionary.version, 'base': 0, 'size': 10})
+        self.assertEqual(
+            len(result['pattoo_datapoints']['key_value_pairs']), 12)
+        dictionary.commit()
+
+        # Only values and timestamps must be posted after that
+        result = dictionary.encode(_posting_data(2))
+        self.assertEqual(
+            result['pattoo_dictionary'],
+            {'version': dictionary.version, 'base': 10, 'size': 10})
+        self.assertEqual(
+            sorted(result['pattoo_datapoints']['key_value_pairs'].values()),
+            [('pattoo_timestamp', 2), ('pattoo_value', 2)])
+
+        # Dictionaries must be reset when they get too large
+        dictionary = converter.PairDictionary(maximum=1)
+        dictionary.encode(_posting_data(1))
+        dictionary.commit()
+        version = dictionary.version
+        result = dictionary.encode(_posting_data(1))
+        self.assertEqual(result['pattoo_dictionary']['base'], 0)
+        self.assertNotEqual(version, dictionary.version)
+
+    def test_commit(self):
+        """Testing function commit."""
+        # Test
+        dictionary = converter.PairDictionary()
+        dictionary.encode(_posting_data(1))
+        dictionary.commit()
+        result = dictionary.encode(_posting_data(1))
+        self.assertEqual(result['pattoo_dictionary']['base'], 10)
+
+    def test_rollback(self):
+        """Testing function rollback."""
+        # Uncommitted pairs must be posted again
+        dictionary = converter.PairDictionary()
+        dictionary.encode(_posting_data(1))
+        dictionary.rollback()
+        self.assertEqual(dictionary.pairs, {})
+        result = dictionary.encode(_posting_data(1))
+        self.assertEqual(
+            len(result['pattoo_datapoints']['key_value_pairs']), 12)
+
+    def test_decode(self):
+        """Testing function decode."""
+        # Initialize key variables
+        agent = converter.PairDictionary()
+        server = converter.PairDictionary()
+
+        # Test posting data through JSON several times
+        for value in range(3):
+            expected = _posting_data(value)
+            _data = json.loads(json.dumps(agent.encode(expected)))
+            result = server.decode(_data)
+            self.assertEqual(
+                json.dumps(result, sort_keys=True),
+                json.dumps(expected, sort_keys=True))
+            agent.commit()
+
+        # Posts that are lost must be posted again
+        agent.encode(_posting_data(4))
+        server.decode(agent.encode(_posting_data(4)))
+        agent.rollback()
+        expected = _posting_data(5)
+        result = server.decode(agent.encode(expected))
+        self.assertEqual(
+            json.dumps(result, sort_keys=True),
+            json.dumps(expected, sort_keys=True))
+
+        # Unknown dictionaries must be rejected
+        server = converter.PairDictionary()
+        self.assertIsNone(server.decode(agent.encode(_posting_data(6))))
+        self.assertIsNone(server.decode({}))
+
+        # Agents must be able to reset the dictionary
+        agent.reset()
+        expected = _posting_data(7)
+        result = server.decode(agent.encode(expected))
+        self.assertEqual(
+            json.dumps(result, sort_keys=True),
+            json.dumps(expected, sort_keys=True))
+
+
+class TestDelta(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing function __init__."""
+        # Test
+        delta = converter.Delta()
+        self.assertEqual(len(delta.version), 32)
+        self.assertEqual(delta.sequence, 0)
+        self.assertEqual(delta.values, {})
+
+    def test_reset(self):
+        """Testing function reset."""
+        # Test
+        delta = converter.Delta()
+        version = delta.version
+        delta.encode(_posting_data(1))
+        delta.commit()
+        delta.reset()
+        self.assertNotEqual(delta.version, version)
+        self.assertEqual(delta.sequence, 0)
+        self.assertEqual(delta.values, {})
+
+    def test_encode(self):
+        """Testing function encode."""
+        # Initialize key variables
+        delta = converter.Delta(keyframe=3)
+        expected = []
+
+        # Only changed values must be posted between keyframes
+        for value in [1, 1, 2, 2, 2]:
+            result = delta.encode(_posting_data(value))
+            delta.commit()
+            expected.append((
+                result['pattoo_delta']['keyframe'],
+                len(result['pattoo_datapoints']['datapoint_pairs'])))
+            self.assertEqual(
+                result['pattoo_delta']['version'], delta.version)
+        self.assertEqual(
+            expected,
+            [(True, 2), (False, 0), (False, 2), (True, 2), (False, 0)])
+
+        # Posted datapoints must be unchanged
+        expected = _posting_data(3)
+        result = delta.encode(expected)
+        del result['pattoo_delta']
+        self.assertEqual(result, expected)
+
+    def test_commit(self):
+        """Testing function commit."""
+        # Test
+        delta = converter.Delta()
+        delta.encode(_posting_data(1))
+        delta.commit()
+        self.assertEqual(delta.sequence, 1)
+        self.assertEqual(sorted(delta.values.values()), [1, 1])
+
+    def test_rollback(self):
+        """Testing function rollback."""
+        # Values that were not received must be posted again
+        delta = converter.Delta()
+        delta.encode(_posting_data(1))
+        delta.commit()
+        delta.encode(_posting_data(2))
+        delta.rollback()
+        delta.commit()
+        self.assertEqual(delta.sequence, 1)
+        result = delta.encode(_posting_data(2))
+        self.assertEqual(
+            len(result['pattoo_datapoints']['datapoint_pairs']), 2)
+
+    def test_decode(self):
+        """Testing function decode."""
+        # Initialize key variables
+        agent = converter.Delta()
+        server = converter.Delta()
+        dictionary = converter.PairDictionary()
+        server_dictionary = converter.PairDictionary()
+
+        # Test with a PairDictionary through JSON
+        for value in [1, 2, 2]:
+            _data = dictionary.encode(agent.encode(_posting_data(value)))
+            result = server.decode(server_dictionary.decode(
+                json.loads(json.dumps(_data))))
+            self.assertEqual(
+                result['pattoo_agent_id'], _data['pattoo_agent_id'])
+            dictionary.commit()
+            agent.commit()
+        self.assertEqual(result['pattoo_datapoints']['datapoint_pairs'], [])
+
+        # Posts that the agent didn't know were received must be accepted
+        _data = agent.encode(_posting_data(3))
+        self.assertIsNotNone(server.decode(_data))
+        agent.rollback()
+        self.assertIsNotNone(server.decode(agent.encode(_posting_data(3))))
+        agent.commit()
+
+        # Servers that missed posts must reject deltas
+        agent.encode(_posting_data(4))
+        agent.commit()
+        self.assertIsNone(server.decode(agent.encode(_posting_data(5))))
+        self.assertIsNone(converter.Delta().decode(
+            agent.encode(_posting_data(5))))
+        self.assertIsNone(server.decode({}))
+
+        # Agents must be able to resynchronize the server
+        agent.reset()
+        expected = _posting_data(6)
+        result = server.decode(agent.encode(expected))
+        self.assertEqual(result, expected)
+
+
 class TestBasicFunctions(unittest.TestCase):
     """Checks all functions and methods."""
 
@@ -123,9 +360,60 @@ class TestBasicFunctions(unittest.TestCase):
             pattoo_agent_polling_interval='10000')
         self.assertEqual(result, expected)
 
+        # String pair IDs must give the same result
+        cache['pattoo_datapoints']['datapoint_pairs'] = [
+            [str(_) for _ in item]
+            for item in cache['pattoo_datapoints']['datapoint_pairs']]
+        self.assertEqual(
+            converter.cache_to_keypairs(cache), pattoo_db_records)
+
+        # Invalid and missing key-value pairs must be detected
+        key_value_pairs = cache['pattoo_datapoints']['key_value_pairs']
+        for pair in [None, ['pattoo_value'], ('pattoo_value', 1)]:
+            key_value_pairs['12'] = pair
+            self.assertEqual(converter.cache_to_keypairs(cache), [])
+
+    def test__pair_table(self):
+        """Testing method or function named _pair_table."""
+        # Test
+        (table, pairs) = converter._pair_table({
+            '0': ['koala', 'bear'], '01': ['panda', 'bear'], 2: ['a', 'b'],
+            '1': 'bear', '3': ['koala'], '5': ['grizzly', 'bear']})
+        self.assertEqual(table, [
+            ['koala', 'bear', None], None, None, [], None,
+            ['grizzly', 'bear', None]])
+        self.assertEqual(sorted(pairs.keys()), ['0', '01', '1', '3', '5'])
+        self.assertEqual(pairs['01'], ['panda', 'bear', None])
+
     def test__make_pattoo_db_record(self):
         """Testing method or function named _make_pattoo_db_record."""
-        pass
+        # Initialize key variables
+        item = {
+            'pattoo_agent_hostname': 'swim',
+            'pattoo_agent_id': 'koala',
+            'pattoo_agent_polled_target': 'localhost',
+            'pattoo_agent_polling_interval': '10000',
+            'pattoo_agent_program': 'pattoo_agent_snmpd',
+            'pattoo_key': 'bear',
+            'pattoo_data_type': DATA_FLOAT,
+            'pattoo_value': 1.5,
+            'pattoo_timestamp': 1575789070107,
+            'pattoo_checksum': 'panda',
+            'Zoo Name': 'city',
+            'animal': 'koala'}
+
+        # Test
+        result = converter._make_pattoo_db_record(item)
+        self.assertEqual(
+            result.pattoo_metadata,
+            [('zoo_name', 'city'), ('animal', 'koala')])
+        self.assertEqual(result.pattoo_checksum, converter._checksum(
+            'koala', 'localhost', 'panda'))
+
+        # Test with invalid data
+        self.assertIsNone(converter._make_pattoo_db_record(
+            dict(item, pattoo_data_type='koala')))
+        self.assertIsNone(converter._make_pattoo_db_record({'koala': 'bear'}))
 
     def test_agentdata_to_datapoints(self):
         """Testing method or function named agentdata_to_datapoints."""
@@ -173,6 +461,18 @@ class TestBasicFunctions(unittest.TestCase):
             self.assertTrue(isinstance(key, str))
             self.assertEqual(value, str(expected_metadata[key]))
 
+        # DataPoints in a DataPointBatch must be converted the same way
+        ddv = TargetDataPoints(target)
+        batch = DataPointBatch()
+        batch.add(DataPoint('gummy_bear', 457, data_type=DATA_INT))
+        ddv.add(batch)
+        apd = AgentPolledData(agent_program, polling_interval)
+        apd.add(ddv)
+        _result = converter.agentdata_to_datapoints(apd)
+        self.assertEqual(len(_result), 1)
+        self.assertEqual(_result[0].checksum, item.checksum)
+        self.assertEqual(_result[0].metadata, item.metadata)
+
     def test_datapoints_to_dicts(self):
         """Testing method or function named datapoints_to_dicts."""
         # Initialize key variables
@@ -229,6 +529,50 @@ class TestBasicFunctions(unittest.TestCase):
             if key not in [5, 9]:
                 self.assertEqual(expected['key_value_pairs'][key], value)
 
+    def test_agentdata_to_dicts(self):
+        """Testing method or function named agentdata_to_dicts."""
+        # Setup AgentPolledData with a mix of DataPoints
+        apd = AgentPolledData('panda_bear', 20)
+        shared = MetadataSet([
+            DataPointMetadata('zoo', 'city'),
+            DataPointMetadata('keeper', 'bob', update_checksum=False)])
+        for target in ['teddy_bear', 'koala_bear']:
+            ddv = TargetDataPoints(target)
+            datapoint = DataPoint('gummy_bear', 457, timestamp=10)
+            ddv.add(datapoint)
+            datapoint = DataPoint('grizzly_bear', 1.5, data_type=DATA_FLOAT)
+            datapoint.add(DataPointMetadata('food', 'fish'))
+            ddv.add(datapoint)
+            for value in range(3):
+                datapoint = DataPoint(
+                    'polar_bear_{}'.format(value), value, timestamp=10)
+                datapoint.add(shared)
+                ddv.add(datapoint)
+            ddv.add(DataPoint('brown_bear', 'invalid', timestamp=10))
+            ddv.add_bulk(
+                ['black_bear', 'sun_bear'], [1, 2], timestamp=10,
+                metadata=shared)
+            apd.add(ddv)
+        metadata = [
+            dict(_.metadata) for ddv in apd.data for _ in ddv.datapoints()]
+
+        # DataPoints must not be changed
+        result = converter.agentdata_to_dicts(apd)
+        self.assertEqual(
+            metadata,
+            [_.metadata for ddv in apd.data for _ in ddv.datapoints()])
+
+        # The result must match that of the separate conversion steps
+        expected = converter.datapoints_to_dicts(
+            converter.agentdata_to_datapoints(apd))
+        self.assertEqual(result, expected)
+        self.assertEqual(len(result['datapoint_pairs']), 14)
+
+        # Test invalid data
+        self.assertEqual(
+            converter.agentdata_to_dicts(None),
+            {'key_value_pairs': {}, 'datapoint_pairs': []})
+
     def test_agentdata_to_post(self):
         """Testing method or function named agentdata_to_post."""
         # Setup AgentPolledData
@@ -324,6 +668,73 @@ class TestBasicFunctions(unittest.TestCase):
         self.assertEqual(result['pattoo_datapoints'][0].key, key)
         self.assertEqual(result['pattoo_datapoints'][0].value, value)
 
+    def test_merge_posting_data_points(self):
+        """Testing method or function named merge_posting_data_points."""
+        # Create cache-like data
+        items = [
+            {
+                'pattoo_agent_id': 'koala',
+                'pattoo_agent_polling_interval': 10000,
+                'pattoo_agent_timestamp': 1000,
+                'pattoo_datapoints': {
+                    'key_value_pairs': {
+                        '0': ['pattoo_key', 'bear'],
+                        '1': ['pattoo_value', 1]},
+                    'datapoint_pairs': [[0, 1]]}
+            },
+            {
+                'pattoo_agent_id': 'koala',
+                'pattoo_agent_polling_interval': 10000,
+                'pattoo_agent_timestamp': 2000,
+                'pattoo_datapoints': {
+                    'key_value_pairs': {
+                        '0': ['pattoo_value', 2],
+                        '1': ['pattoo_key', 'bear']},
+                    'datapoint_pairs': [[1, 0]]}
+            }
+        ]
+
+        # Test. Duplicate pairs must be merged
+        result = converter.merge_posting_data_points(items)
+        self.assertEqual(result['pattoo_agent_id'], 'koala')
+        self.assertEqual(result['pattoo_agent_polling_interval'], 10000)
+        self.assertEqual(result['pattoo_agent_timestamp'], 2000)
+        self.assertEqual(
+            result['pattoo_datapoints']['key_value_pairs'],
+            {0: ('pattoo_key', 'bear'), 1: ('pattoo_value', 1),
+             2: ('pattoo_value', 2)})
+        self.assertEqual(
+            result['pattoo_datapoints']['datapoint_pairs'],
+            [[0, 1], [0, 2]])
+
+        # Test data from different agents
+        items[1]['pattoo_agent_id'] = 'panda'
+        self.assertIsNone(converter.merge_posting_data_points(items))
+
+        # Test invalid data
+        self.assertIsNone(converter.merge_posting_data_points([]))
+        self.assertIsNone(converter.merge_posting_data_points([{}]))
+
+    def test_valid_posting_data_points(self):
+        """Testing method or function named valid_posting_data_points."""
+        # Create cache-like data
+        item = {
+            'pattoo_agent_id': 'koala',
+            'pattoo_agent_polling_interval': 10000,
+            'pattoo_agent_timestamp': 1000,
+            'pattoo_datapoints': {
+                'key_value_pairs': {'0': ['pattoo_key', 'bear']},
+                'datapoint_pairs': [[0]]}
+        }
+
+        # Test
+        self.assertTrue(converter.valid_posting_data_points(item))
+        item['pattoo_datapoints']['datapoint_pairs'] = [[1]]
+        self.assertFalse(converter.valid_posting_data_points(item))
+        item['pattoo_datapoints'] = []
+        self.assertFalse(converter.valid_posting_data_points(item))
+        self.assertFalse(converter.valid_posting_data_points(None))
+
     def test__keypairs(self):
         """Testing method or function named _keypairs."""
         # Test
@@ -346,6 +757,57 @@ class TestBasicFunctions(unittest.TestCase):
 ba613b31bb5c9c36214dc9f14a42fd7a2fdb84856bca5c44c2''')
         self.assertEqual(result, expected)
 
+        # Results must be the same as hashing the values directly
+        for values in [
+                ('koala', 'bear', 'panda'), (1, 2.0, True),
+                (1.0, 2, 'True'), (['koala'], 'bear', 'panda')]:
+            expected = data.hashstring(
+                '{}{}{}'.format(*values), sha=512)
+            self.assertEqual(converter._checksum(*values), expected)
+            self.assertEqual(converter._checksum(*values), expected)
+
+    def test__cached_checksum(self):
+        """Testing method or function named _cached_checksum."""
+        # Test
+        hits = converter._cached_checksum.cache_info().hits
+        result = converter._cached_checksum('koala', 'bear', 'gummy')
+        self.assertEqual(
+            converter._cached_checksum('koala', 'bear', 'gummy'), result)
+        self.assertEqual(
+            converter._cached_checksum.cache_info().hits, hits + 1)
+
+    def test__checksum_prefix(self):
+        """Testing method or function named _checksum_prefix."""
+        # Test
+        result = converter._checksum_prefix('koala', 'bear')
+        self.assertEqual(
+            result.hexdigest(), data.hashstring('koalabear', sha=512))
+        self.assertEqual(id(result), id(
+            converter._checksum_prefix('koala', 'bear')))
+
+
+def _posting_data(value):
+    """Create posting data for testing.
+
+    Args:
+        value: Value and timestamp of the datapoints
+
+    Returns:
+        result: Dict of data to post
+
+    """
+    # Initialize key variables
+    agentdata = AgentPolledData('panda_bear', 20)
+    ddv = TargetDataPoints('teddy_bear')
+    for key in ['koala_bear', 'gummy_bear']:
+        ddv.add(DataPoint(key, value, timestamp=value))
+    agentdata.add(ddv)
+
+    # Return
+    result = converter.posting_data_points(
+        converter.agentdata_to_post(agentdata))
+    return result
+
 
 if __name__ == '__main__':
     # Make sure the environment is OK to run unittests
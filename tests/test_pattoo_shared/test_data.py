@@ -73,6 +73,16 @@ def51cb07699f90b1613d0f4da13574e415323b2fcb98c1f072218a8ba82a44432da79bdf90ebf\
 82581d933dc4128e83bda0c9f9f7b8b32e41b8ee8bb16be531'''
         self.assertEqual(result, expected)
 
+    def test_fast_hasher(self):
+        """Testing function fast_hasher."""
+        # Test
+        result = data.fast_hasher(b'unittest')
+        self.assertEqual(len(result.hexdigest()), 32)
+        hasher = data.fast_hasher()
+        hasher.update(b'unit')
+        hasher.update(b'test')
+        self.assertEqual(hasher.hexdigest(), result.hexdigest())
+
     def test_is_numeric(self):
         """Testing function is_numeric."""
         # Test False
@@ -87,6 +97,22 @@ def51cb07699f90b1613d0f4da13574e415323b2fcb98c1f072218a8ba82a44432da79bdf90ebf\
             result = data.is_numeric(item)
             self.assertTrue(result)
 
+    def test_to_float(self):
+        """Testing function to_float."""
+        # Test False
+        items = [None, True, False, 'False', '', [1]]
+        for item in items:
+            result = data.to_float(item)
+            self.assertEqual(result, (False, None))
+
+        # Test True
+        items = [(1, 1.0), (1.1, 1.1), ('1.1', 1.1), (' 2 ', 2.0)]
+        for item, expected in items:
+            (valid, value) = data.to_float(item)
+            self.assertTrue(valid)
+            self.assertEqual(value, expected)
+            self.assertTrue(isinstance(value, float))
+
     def test_is_data_type_numeric(self):
         """Testing function is_data_type_numeric."""
         # Test False
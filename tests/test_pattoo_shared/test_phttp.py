@@ -5,7 +5,17 @@
 import unittest
 import os
 import sys
-from time import time
+import json
+import gzip
+import zlib
+import threading
+import urllib.request
+from time import time, sleep
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# PIP imports
+import requests
+import yaml
 
 # Try to create a working PYTHONPATH
 EXEC_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -23,7 +33,16 @@ else:
 
 # Pattoo imports
 from pattoo_shared import phttp
+from pattoo_shared import cache
 from pattoo_shared import data
+from pattoo_shared import compression
+from pattoo_shared import converter
+from pattoo_shared import configuration
+from pattoo_shared import log
+from pattoo_shared.constants import (
+    RELAY_POSTED, RELAY_UNCHANGED, RELAY_FAILED)
+from pattoo_shared.variables import (
+    DataPoint, TargetDataPoints, AgentPolledData)
 from pattoo_shared.configuration import Config
 from tests.libraries.configuration import UnittestConfig
 
@@ -35,13 +54,46 @@ class TestPost(unittest.TestCase):
     # General object setup
     #########################################################################
 
+    def setUp(self):
+        """Restore process-wide phttp state after each test."""
+        _restore_state(self)
+
     def test___init__(self):
         """Testing method or function named __init__."""
         pass
 
     def test_post(self):
         """Testing method or function named post."""
-        pass
+        # Start a pattoo server
+        server = HTTPServer(('127.0.0.1', 0), _StatusServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        config = _ServerConfig(
+            'http://127.0.0.1:{}/post'.format(server.server_port))
+        _StatusServerHandler.status = 200
+
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        segment_log = phttp._segment_log(identifier)
+        post_queue = phttp.post_queue()
+        posted = post_queue.posted
+        failed = post_queue.failed
+
+        # Post in the background using the config of the Post object
+        poster = phttp.Post(identifier, {'Test': 'data'}, config=config)
+        self.assertTrue(poster.post(blocking=False))
+        post_queue.flush()
+        self.assertEqual(post_queue.posted, posted + 1)
+        self.assertEqual(len(list(segment_log.records())), 0)
+
+        # Data must be cached if the deadline expires while it is queued
+        self.assertTrue(
+            poster.post(blocking=False, deadline=phttp.Deadline(total=0)))
+        post_queue.flush()
+        self.assertEqual(post_queue.failed, failed + 1)
+        self.assertEqual(len(list(segment_log.records())), 1)
 
     def test_purge(self):
         """Testing method or function named purge."""
@@ -55,19 +107,565 @@ class TestPassiveAgent(unittest.TestCase):
     # General object setup
     #########################################################################
 
+    def setUp(self):
+        """Restore process-wide phttp state after each test."""
+        _restore_state(self)
+
     def test___init__(self):
         """Testing method or function named __init__."""
         pass
 
     def test_relay(self):
         """Testing method or function named relay."""
-        pass
+        # Nothing is relayed from unreachable agents
+        agent = phttp.PassiveAgent(
+            'koala_bear', data.hashstring(str(time())),
+            'http://127.0.0.1:1/passive')
+        self.assertFalse(agent.relay())
 
     def test_get(self):
         """Testing method or function named get."""
+        # Nothing is retrieved from unreachable agents
+        agent = phttp.PassiveAgent(
+            'koala_bear', data.hashstring(str(time())),
+            'http://127.0.0.1:1/passive')
+        self.assertEqual(agent.get(), {})
+
+        # Start a passive agent
+        server = HTTPServer(('127.0.0.1', 0), _PassiveAgentHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        agent = phttp.PassiveAgent('koala_bear', 'passive', url)
+
+        # Compressed data must be retrieved
+        self.assertEqual(agent.get(), _PassiveAgentHandler.data)
+        self.assertEqual(_PassiveAgentHandler.requests[-1], (None, 'gzip'))
+
+        # Unchanged data must not be retrieved again
+        self.assertIs(agent.get(), phttp.NOT_MODIFIED)
+        self.assertEqual(phttp.NOT_MODIFIED, {})
+        self.assertEqual(
+            _PassiveAgentHandler.requests[-1],
+            (_PassiveAgentHandler.etag, 'gzip'))
+
+        # Changed data must be retrieved
+        _PassiveAgentHandler.etag = '"2"'
+        self.assertEqual(agent.get(), _PassiveAgentHandler.data)
+        server.shutdown()
+        server.server_close()
+
+    def test_relay_status(self):
+        """Testing method or function named relay_status."""
+        # Nothing is relayed from unreachable agents
+        agent = phttp.PassiveAgent(
+            'koala_bear', data.hashstring(str(time())),
+            'http://127.0.0.1:1/passive')
+        self.assertEqual(agent.relay_status(), RELAY_FAILED)
+
+        # Start a passive agent
+        server = HTTPServer(('127.0.0.1', 0), _PassiveAgentHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/status'.format(server.server_port)
+        agent = phttp.PassiveAgent(
+            'koala_bear', data.hashstring(str(time())), url)
+        _PassiveAgentHandler.etag = '"status"'
+
+        # Data that can't be posted must fail. Unchanged data must be
+        # reported separately.
+        self.assertEqual(agent.relay_status(), RELAY_FAILED)
+        self.assertEqual(agent.relay_status(), RELAY_UNCHANGED)
+        self.assertFalse(agent.relay())
+
+        # Unchanged agents must not be reported as failures by pools
+        result = phttp.PassiveAgentPool([agent]).relay()[0]
+        self.assertEqual(result.status, RELAY_UNCHANGED)
+        self.assertTrue(result.success)
+
+
+class _PassiveAgentHandler(BaseHTTPRequestHandler):
+    """Passive agent that supports compression and revalidation."""
+
+    data = {'koala': 'bear' * 100}
+    etag = '"1"'
+    requests = []
+
+    def do_GET(self):
+        """Respond to GET requests."""
+        # Record the request
+        if_none_match = self.headers.get('If-None-Match')
+        accept_encoding = self.headers.get('Accept-Encoding')
+        self.requests.append((if_none_match, accept_encoding))
+
+        # Data hasn't changed
+        if if_none_match == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        # Send data
+        body = gzip.compress(json.dumps(self.data).encode())
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Don't log requests."""
+        pass
+
+
+class _EncodedServerHandler(BaseHTTPRequestHandler):
+    """pattoo server that supports PairDictionary and Delta posts."""
+
+    dictionary = converter.PairDictionary()
+    delta = converter.Delta()
+    received = []
+
+    def do_POST(self):
+        """Respond to POST requests."""
+        # Decode the data
+        length = int(self.headers.get('Content-Length'))
+        result = json.loads(self.rfile.read(length).decode())
+        if 'pattoo_dictionary' in result:
+            result = self.dictionary.decode(result)
+        if result is not None and 'pattoo_delta' in result:
+            result = self.delta.decode(result)
+
+        # Respond
+        if result is None:
+            self.send_response(409)
+        else:
+            self.received.append(result)
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        """Don't log requests."""
+        pass
+
+
+class _StatusServerHandler(BaseHTTPRequestHandler):
+    """pattoo server that records posts and responds with set statuses."""
+
+    status = 200
+    statuses = []
+    received = []
+
+    def do_POST(self):
+        """Respond to POST requests."""
+        # Record the data
+        body = self.rfile.read(int(self.headers.get('Content-Length')))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.received.append(json.loads(body.decode()))
+
+        # Respond with the next of the statuses, if any
+        if bool(self.statuses) is True:
+            status = self.statuses.pop(0)
+        else:
+            status = self.status
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        """Don't log requests."""
         pass
 
 
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Webserver that responds with the same body and headers."""
+
+    body = b''
+    headers_ = {}
+
+    def do_GET(self):
+        """Respond to GET requests."""
+        # Respond
+        self.send_response(200)
+        for key, value in self.headers_.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        """Don't log requests."""
+        pass
+
+
+class _ServerConfig(Config):
+    """Config that posts to a test pattoo server."""
+
+    def __init__(self, url):
+        """Initialize the class."""
+        Config.__init__(self)
+        self._url = url
+
+    def agent_api_server_url(self, agent_id):
+        """Get the URL of the test pattoo server."""
+        return self._url
+
+
+class _SlowAgent(phttp.PassiveAgent):
+    """PassiveAgent that takes time to relay."""
+
+    def relay_status(self, deadline=None):
+        """Relay nothing slowly."""
+        sleep(0.2)
+        return RELAY_POSTED
+
+
+class _TimeoutConfig(Config):
+    """Config with custom agent API timeouts."""
+
+    def __init__(self, timeout):
+        """Initialize the class."""
+        Config.__init__(self)
+        self._timeout = timeout
+
+    def agent_api_connect_timeout(self):
+        """Get the connect timeout."""
+        return self._timeout
+
+    def agent_api_read_timeout(self):
+        """Get the read timeout."""
+        return self._timeout
+
+
+class _DeadlineAgent(phttp.PassiveAgent):
+    """PassiveAgent that records the Deadline it relays with."""
+
+    def relay_status(self, deadline=None):
+        """Record the deadline."""
+        self.deadline = deadline
+        return RELAY_UNCHANGED
+
+
+class _BrokenAgent(phttp.PassiveAgent):
+    """PassiveAgent that fails to relay."""
+
+    def relay_status(self, deadline=None):
+        """Fail to relay."""
+        raise RuntimeError('Broken')
+
+
+class TestPassiveAgentPool(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        pass
+
+    def test_relay(self):
+        """Testing method or function named relay."""
+        # Initialize key variables
+        agents = [
+            _SlowAgent('koala_bear', 'slow_{}'.format(_), 'http://slow')
+            for _ in range(5)]
+        agents.append(
+            phttp.PassiveAgent(
+                'koala_bear', 'unreachable', 'http://127.0.0.1:1/passive'))
+        agents.append(_BrokenAgent('koala_bear', 'broken', 'http://broken'))
+
+        # Agents are relayed concurrently
+        start = time()
+        result = phttp.PassiveAgentPool(agents, workers=10).relay()
+        self.assertTrue(time() - start < 1)
+
+        # Results are returned in the same order as the agents
+        self.assertEqual(len(result), len(agents))
+        for index, item in enumerate(result):
+            self.assertEqual(item.identifier, agents[index].identifier)
+            self.assertEqual(item.url, agents[index].url)
+            self.assertTrue(item.latency >= 0)
+        for item in result[:5]:
+            self.assertTrue(item.success)
+            self.assertEqual(item.status, RELAY_POSTED)
+            self.assertTrue(item.latency >= 0.2)
+        for item in result[5:]:
+            self.assertFalse(item.success)
+            self.assertEqual(item.status, RELAY_FAILED)
+
+        # Test with no agents
+        self.assertEqual(phttp.PassiveAgentPool([]).relay(), [])
+
+    def test_relay_config(self):
+        """Testing method or function named relay with agent configs."""
+        # Initialize key variables
+        agents = [
+            _DeadlineAgent(
+                'koala_bear', 'agent_{}'.format(_), 'http://agent',
+                config=_TimeoutConfig(timeout))
+            for _, timeout in enumerate([2, 3])]
+        pool = phttp.PassiveAgentPool(
+            agents, timeout=100, config=_TimeoutConfig(9))
+
+        # Each agent's timeouts must be used, limited by the pool's timeout
+        result = pool.relay()
+        self.assertEqual(
+            [_.status for _ in result], [RELAY_UNCHANGED, RELAY_UNCHANGED])
+        self.assertEqual(agents[0].deadline.timeout(), (2, 2))
+        self.assertEqual(agents[1].deadline.timeout(), (3, 3))
+        self.assertTrue(agents[0].deadline.remaining() > 90)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        pass
+
+    def test_allow(self):
+        """Testing method or function named allow."""
+        # A new breaker is closed
+        breaker = phttp.CircuitBreaker(initial=0, maximum=0)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+        # Only one probe is allowed after a failure
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        # Breaker closes after a successful probe
+        breaker.success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+        # Nothing is allowed during the backoff period
+        breaker = phttp.CircuitBreaker(initial=100, maximum=100)
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+
+    def test_remaining(self):
+        """Testing method or function named remaining."""
+        # Test
+        breaker = phttp.CircuitBreaker(initial=100, maximum=1000)
+        self.assertEqual(breaker.remaining(), 0)
+        breaker.failure()
+        self.assertTrue(50 - 1 <= breaker.remaining() <= 100)
+
+        # Backoff must double up to the maximum
+        for _ in range(10):
+            breaker.failure()
+        self.assertTrue(500 - 1 <= breaker.remaining() <= 1000)
+
+    def test_success(self):
+        """Testing method or function named success."""
+        pass
+
+    def test_release(self):
+        """Testing method or function named release."""
+        # Another probe is allowed without changing the backoff period
+        breaker = phttp.CircuitBreaker(initial=0, maximum=0)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.release()
+        self.assertTrue(breaker.allow())
+
+    def test_failure(self):
+        """Testing method or function named failure."""
+        pass
+
+
+class TestPostQueue(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def setUp(self):
+        """Restore process-wide phttp state after each test."""
+        _restore_state(self)
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        pass
+
+    def test_put(self):
+        """Testing method or function named put."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        url = 'http://127.0.0.1:1/unreachable'
+        _data = {'Test': 'data'}
+
+        # Failed posts must be cached by the background thread
+        post_queue = phttp.PostQueue()
+        self.assertTrue(post_queue.put(url, _data, identifier))
+        post_queue.flush()
+        self.assertEqual(post_queue.failed, 1)
+        self.assertEqual(post_queue.posted, 0)
+        self.assertEqual(
+            len(list(phttp._segment_log(identifier).records())), 1)
+
+        # Data that doesn't fit in the queue must be cached
+        post_queue = phttp.PostQueue(size=1)
+        post_queue._start = lambda: None
+        self.assertTrue(post_queue.put(url, _data, identifier))
+        self.assertTrue(post_queue.put(url, _data, identifier))
+        self.assertEqual(post_queue.depth(), 1)
+        self.assertEqual(post_queue.spilled, 1)
+        self.assertEqual(post_queue.dropped, 0)
+        self.assertEqual(
+            len(list(phttp._segment_log(identifier).records())), 2)
+
+        # Queued data must be cached on exit
+        post_queue._spill()
+        self.assertEqual(post_queue.depth(), 0)
+        self.assertEqual(
+            len(list(phttp._segment_log(identifier).records())), 3)
+
+    def test_depth(self):
+        """Testing method or function named depth."""
+        pass
+
+    def test_flush(self):
+        """Testing method or function named flush."""
+        pass
+
+
+class TestDeadline(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing method or function named __init__."""
+        # Default deadline is the configured cycle timeout
+        deadline = phttp.Deadline(config=Config())
+        self.assertTrue(
+            Config().agent_api_cycle_timeout() - 1 <= deadline.remaining())
+
+    def test_expired(self):
+        """Testing method or function named expired."""
+        # Test
+        self.assertFalse(phttp.Deadline(total=100).expired())
+        self.assertTrue(phttp.Deadline(total=0).expired())
+
+    def test_remaining(self):
+        """Testing method or function named remaining."""
+        # Test
+        self.assertTrue(99 <= phttp.Deadline(total=100).remaining() <= 100)
+        self.assertEqual(phttp.Deadline(total=-1).remaining(), 0)
+
+    def test_timeout(self):
+        """Testing method or function named timeout."""
+        # Initialize key variables
+        config = Config()
+
+        # Configured timeouts are used far from the deadline
+        deadline = phttp.Deadline(total=1000, config=config)
+        self.assertEqual(
+            deadline.timeout(),
+            (config.agent_api_connect_timeout(),
+             config.agent_api_read_timeout()))
+
+        # Timeouts are limited by the deadline
+        (connect, read) = phttp.Deadline(total=2, config=config).timeout()
+        self.assertTrue(0 < connect <= 2)
+        self.assertTrue(0 < read <= 2)
+
+        # Timeouts are never zero
+        (connect, read) = phttp.Deadline(total=0, config=config).timeout()
+        self.assertTrue(connect > 0)
+        self.assertTrue(read > 0)
+
+
+class Test_Batch(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def setUp(self):
+        """Restore process-wide phttp state after each test."""
+        _restore_state(self)
+
+    def test_fits(self):
+        """Testing method or function named fits."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        item = _posting_data(identifier, 1)
+        batch = phttp._Batch(100, 4, phttp.Deadline(total=10))
+
+        # Empty batches accept data of any size
+        self.assertTrue(batch.fits(item, 1000))
+
+        # Data must fit within the byte and datapoint limits
+        batch.add(item, 60, 0)
+        self.assertTrue(batch.fits(item, 40))
+        self.assertFalse(batch.fits(item, 41))
+        batch.add(item, 10, 1)
+        self.assertFalse(batch.fits(item, 1))
+        self.assertEqual(batch.references, [0, 1])
+
+        # Data must come from the same source
+        batch.clear()
+        batch.add(item, 10, 0)
+        other = _posting_data(identifier, 2)
+        other['pattoo_agent_polling_interval'] += 1
+        self.assertFalse(batch.fits(other, 10))
+        other = _posting_data('{}_other'.format(identifier), 2)
+        self.assertFalse(batch.fits(other, 10))
+
+    def test_post(self):
+        """Testing method or function named post."""
+        # Start a pattoo server
+        server = HTTPServer(('127.0.0.1', 0), _StatusServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/batch'.format(server.server_port)
+        _StatusServerHandler.status = 200
+        received = _StatusServerHandler.received
+
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        items = [_posting_data(identifier, _) for _ in range(3)]
+        batch = phttp._Batch(1000000, 1000, phttp.Deadline(total=10))
+
+        # Empty batches are not posted
+        del received[:]
+        self.assertTrue(batch.post(url, identifier))
+        self.assertEqual(received, [])
+
+        # The items of the batch must be merged into a single post
+        for index, item in enumerate(items):
+            batch.add(item, 1, index)
+        self.assertTrue(batch.post(url, identifier))
+        self.assertEqual(len(received), 1)
+        self.assertEqual(
+            received[0],
+            json.loads(json.dumps(
+                converter.merge_posting_data_points(items))))
+        self.assertEqual(
+            len(received[0]['pattoo_datapoints']['datapoint_pairs']), 6)
+
+
 class TestBasicFunctions(unittest.TestCase):
     """Checks all functions and methods."""
 
@@ -75,13 +673,505 @@ class TestBasicFunctions(unittest.TestCase):
     # General object setup
     #########################################################################
 
+    def setUp(self):
+        """Restore process-wide phttp state after each test."""
+        _restore_state(self)
+
     def test_post(self):
         """Testing method or function named post."""
-        pass
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        url = 'http://127.0.0.1:1/post'
+        _data = {'Test': 'data'}
+        segment_log = phttp._segment_log(identifier)
+
+        # Failed posts must be cached, and open the circuit breaker
+        self.assertFalse(phttp.post(url, _data, identifier))
+        self.assertEqual(len(list(segment_log.records())), 1)
+        self.assertTrue(phttp.circuit_breaker(url).remaining() > 0)
+
+        # Posts must be cached without contacting the server while the
+        # circuit breaker is open
+        self.assertFalse(phttp.post(url, _data, identifier))
+        self.assertEqual(len(list(segment_log.records())), 2)
+        self.assertFalse(phttp.post(url, _data, identifier, save=False))
+        self.assertEqual(len(list(segment_log.records())), 2)
+
+        # Posts must be cached without contacting the server after the
+        # deadline expires
+        url = 'http://127.0.0.1:2/deadline'
+        deadline = phttp.Deadline(total=0)
+        self.assertFalse(
+            phttp.post(url, _data, identifier, deadline=deadline))
+        self.assertEqual(len(list(segment_log.records())), 3)
+        self.assertEqual(phttp.circuit_breaker(url).remaining(), 0)
+
+    def test_post_status(self):
+        """Testing method or function named post with HTTP errors."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        server = HTTPServer(('127.0.0.1', 0), _StatusServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/{}'.format(server.server_port, identifier)
+        breaker = phttp.circuit_breaker(url)
+        segment_log = phttp._segment_log(identifier)
+        _data = {'Test': 'data'}
+
+        # Client errors must be cached, but not open the circuit breaker
+        _StatusServerHandler.status = 400
+        self.assertFalse(phttp.post(url, _data, identifier))
+        self.assertEqual(len(list(segment_log.records())), 1)
+        self.assertEqual(breaker.remaining(), 0)
+
+        # Server errors must open the circuit breaker
+        _StatusServerHandler.status = 500
+        self.assertFalse(phttp.post(url, _data, identifier))
+        self.assertEqual(len(list(segment_log.records())), 2)
+        self.assertTrue(breaker.remaining() > 0)
+
+        # A successful probe must close the circuit breaker
+        _StatusServerHandler.status = 200
+        breaker._retry = 0
+        self.assertTrue(phttp.post(url, _data, identifier))
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_post_exception(self):
+        """Testing method or function named post with exceptions."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        url = 'http://127.0.0.1:1/exception'
+        breaker = phttp.circuit_breaker(url)
+        _encoders = phttp._encoders
+        self.addCleanup(setattr, phttp, '_encoders', _encoders)
+
+        def broken(*args):
+            """Fail to get encoders."""
+            raise RuntimeError('Broken')
+
+        # Probes that fail without contacting the server must not leave the
+        # circuit breaker half open
+        breaker.failure()
+        breaker._retry = 0
+        phttp._encoders = broken
+        self.assertFalse(
+            phttp.post(url, {'Test': 'data'}, identifier, save=False))
+        self.assertTrue(breaker.allow())
+
+        # Exceptions while caching data must not either
+        breaker.release()
+        _save_data = phttp._save_data
+        self.addCleanup(setattr, phttp, '_save_data', _save_data)
+        phttp._save_data = broken
+        with self.assertRaises(RuntimeError):
+            phttp.post(url, {'Test': 'data'}, identifier)
+        self.assertTrue(breaker.allow())
+
+    def test_post_dictionary(self):
+        """Testing method or function named post with a PairDictionary."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        settings = phttp._settings()
+        settings['dictionary'] = True
+        settings['compression'] = None
+        server = HTTPServer(('127.0.0.1', 0), _EncodedServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        items = [_posting_data(identifier, _) for _ in range(3)]
+
+        # The server must receive the original data
+        for item in items[:2]:
+            self.assertTrue(phttp.post(url, item, identifier))
+            self.assertEqual(
+                json.dumps(_EncodedServerHandler.received[-1]),
+                json.dumps(item))
+
+        # Data must be posted again if the server loses its dictionary
+        _EncodedServerHandler.dictionary = converter.PairDictionary()
+        self.assertTrue(phttp.post(url, items[2], identifier))
+        self.assertEqual(
+            json.dumps(_EncodedServerHandler.received[-1]),
+            json.dumps(items[2]))
+        server.shutdown()
+        server.server_close()
+
+        # Failed posts must be cached without the dictionary
+        segment_log = phttp._segment_log(identifier)
+        self.assertFalse(phttp.post(url, items[0], identifier))
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()],
+            [json.loads(json.dumps(items[0]))])
+
+    def test_post_delta(self):
+        """Testing method or function named post with a Delta."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        settings = phttp._settings()
+        settings['delta'] = True
+        settings['delta_keyframe'] = 10
+        settings['dictionary'] = True
+        server = HTTPServer(('127.0.0.1', 0), _EncodedServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        items = [_posting_data(identifier, _) for _ in [1, 1, 2]]
+
+        # Only changed datapoints must be received
+        for item in items[:2]:
+            self.assertTrue(phttp.post(url, item, identifier))
+        received = _EncodedServerHandler.received
+        self.assertEqual(
+            json.dumps(received[-2]['pattoo_datapoints']),
+            json.dumps(items[0]['pattoo_datapoints']))
+        self.assertEqual(received[-1]['pattoo_datapoints'], {
+            'key_value_pairs': {}, 'datapoint_pairs': []})
+
+        # All data must be posted again if the server loses its state
+        _EncodedServerHandler.delta = converter.Delta()
+        _EncodedServerHandler.dictionary = converter.PairDictionary()
+        self.assertTrue(phttp.post(url, items[2], identifier))
+        self.assertEqual(
+            json.dumps(received[-1]['pattoo_datapoints']),
+            json.dumps(items[2]['pattoo_datapoints']))
+        server.shutdown()
+        server.server_close()
+
+    def test_purge_delta(self):
+        """Testing method or function named purge with a Delta."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        settings = phttp._settings()
+        settings['delta'] = True
+        settings['delta_keyframe'] = 10
+        settings['dictionary'] = True
+        settings['compression'] = None
+        _EncodedServerHandler.delta = converter.Delta()
+        _EncodedServerHandler.dictionary = converter.PairDictionary()
+        server = HTTPServer(('127.0.0.1', 0), _EncodedServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        received = _EncodedServerHandler.received
+
+        # Unchanged live values are not posted
+        self.assertTrue(
+            phttp.post(url, _posting_data(identifier, 5), identifier))
+        self.assertTrue(
+            phttp.post(url, _posting_data(identifier, 5), identifier))
+        self.assertEqual(received[-1]['pattoo_datapoints'], {
+            'key_value_pairs': {}, 'datapoint_pairs': []})
+
+        # Cached data must be replayed in full, even if it ends with the
+        # values last posted by the Delta
+        items = [_posting_data(identifier, _) for _ in [3, 5]]
+        for item in items:
+            self.assertTrue(phttp._save_data(item, identifier))
+        del received[:]
+        phttp.purge(url, identifier)
+        self.assertEqual(len(received), 1)
+        self.assertNotIn('pattoo_delta', received[0])
+        self.assertEqual(
+            json.dumps(received[0]['pattoo_datapoints']),
+            json.dumps(converter.merge_posting_data_points(
+                json.loads(json.dumps(items)))['pattoo_datapoints']))
+        self.assertEqual(list(phttp._segment_log(identifier).records()), [])
+
+        # Replays must not change the Delta used by live posts
+        self.assertTrue(
+            phttp.post(url, _posting_data(identifier, 5), identifier))
+        self.assertEqual(received[-1]['pattoo_datapoints'], {
+            'key_value_pairs': {}, 'datapoint_pairs': []})
 
     def test_purge(self):
         """Testing method or function named purge."""
-        pass
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        cache_dir = Config().agent_cache_directory(identifier)
+        url = 'http://127.0.0.1:1/unreachable'
+        _data = {
+            'pattoo_agent_id': identifier,
+            'pattoo_agent_polling_interval': 10000,
+            'pattoo_agent_timestamp': 1000,
+            'pattoo_datapoints': {
+                'key_value_pairs': {0: ('pattoo_key', 'bear')},
+                'datapoint_pairs': [[0]]}
+        }
+
+        # Create cache data
+        segment_log = phttp._segment_log(identifier)
+        self.assertTrue(phttp._save_data('corrupted', identifier))
+        self.assertTrue(phttp._save_data(_data, identifier))
+        self.assertEqual(len(list(segment_log.records())), 2)
+
+        # Valid cache data must be kept if the server is unreachable.
+        # Corrupted cache data must be deleted.
+        phttp.purge(url, identifier)
+        self.assertEqual(len(list(segment_log.records())), 1)
+
+        # Test with a file cached by an older version of pattoo_shared
+        filepath = '{}{}{}_{}.json'.format(cache_dir, os.sep, 1, identifier)
+        with open(filepath, 'w') as f_handle:
+            json.dump(_data, f_handle)
+        phttp.purge(url, identifier)
+        self.assertEqual(len(list(segment_log.records())), 1)
+        self.assertTrue(os.path.isfile(filepath))
+
+    def test_purge_batches(self):
+        """Testing method or function named purge with a pattoo server."""
+        # Initialize key variables
+        identifier = data.hashstring(str(time()))
+        cache_dir = Config().agent_cache_directory(identifier)
+        segment_log = phttp._segment_log(identifier)
+        items = [_posting_data(identifier, _) for _ in range(5)]
+        cached = json.loads(json.dumps(items))
+
+        # Limit batches to two items of two datapoints each
+        filename = '{}{}pattoo.yaml'.format(
+            os.path.expanduser(log.check_environment()), os.sep)
+        with open(filename) as f_handle:
+            original = f_handle.read()
+        self.addCleanup(configuration.reload)
+        self.addCleanup(_write, filename, original)
+        config = yaml.safe_load(original)
+        config['pattoo_agent_api']['batch_size_datapoints'] = 4
+        _write(filename, yaml.dump(config, default_flow_style=False))
+
+        # Start a pattoo server
+        server = HTTPServer(('127.0.0.1', 0), _StatusServerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/purge'.format(server.server_port)
+        received = _StatusServerHandler.received
+        _StatusServerHandler.status = 200
+        _StatusServerHandler.statuses[:] = []
+        self.addCleanup(_StatusServerHandler.statuses.clear)
+        expected = [
+            json.loads(json.dumps(converter.merge_posting_data_points(_)))
+            for _ in [cached[0:2], cached[2:4], cached[4:5]]]
+
+        # Cache data
+        for item in items:
+            self.assertTrue(phttp._save_data(item, identifier))
+        self.assertEqual([_[0] for _ in segment_log.records()], cached)
+
+        # Nothing must be removed from the cache after a server error, and
+        # purging must stop at the first failed batch
+        del received[:]
+        _StatusServerHandler.statuses[:] = [500]
+        phttp.purge(url, identifier)
+        self.assertEqual(received, expected[:1])
+        self.assertEqual([_[0] for _ in segment_log.records()], cached)
+        phttp.circuit_breaker(url).success()
+
+        # Batches acknowledged before a failure must be committed
+        del received[:]
+        _StatusServerHandler.statuses[:] = [200, 500]
+        phttp.purge(url, identifier)
+        self.assertEqual(received, expected[:2])
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()], cached[2:])
+        phttp.circuit_breaker(url).success()
+
+        # The remaining batches must be posted and committed
+        del received[:]
+        phttp.purge(url, identifier)
+        self.assertEqual(received, expected[1:])
+        self.assertEqual(list(segment_log.records()), [])
+
+        # Data with unsupported compression must be kept, along with the
+        # data cached after it
+        self.assertTrue(phttp._save_data(items[0], identifier))
+        _append_record(segment_log, 7, json.dumps(items[1]).encode())
+        self.assertTrue(phttp._save_data(items[2], identifier))
+        del received[:]
+        phttp.purge(url, identifier)
+        self.assertEqual(
+            received,
+            [json.loads(json.dumps(
+                converter.merge_posting_data_points(cached[0:1])))])
+        self.assertEqual(
+            [_[0] for _ in segment_log.records()],
+            [cache.UNSUPPORTED, cached[2]])
+        segment_log.commit(list(segment_log.records())[-1][2])
+
+        # Files cached by older versions of pattoo_shared must be merged,
+        # and only deleted after the server acknowledges them
+        filepaths = []
+        for index, item in enumerate(items[:3]):
+            filepath = '{}{}{}_{}.json'.format(
+                cache_dir, os.sep, index, identifier)
+            with open(filepath, 'w') as f_handle:
+                json.dump(item, f_handle)
+            filepaths.append(filepath)
+        del received[:]
+        _StatusServerHandler.statuses[:] = [500]
+        phttp.purge(url, identifier)
+        self.assertEqual(received, expected[:1])
+        self.assertTrue(all([os.path.isfile(_) for _ in filepaths]))
+        phttp.circuit_breaker(url).success()
+
+        del received[:]
+        phttp.purge(url, identifier)
+        self.assertEqual(len(received), 2)
+        self.assertEqual(received[0], expected[0])
+        self.assertEqual(
+            received[1],
+            json.loads(json.dumps(
+                converter.merge_posting_data_points(cached[2:3]))))
+        self.assertFalse(any([os.path.isfile(_) for _ in filepaths]))
+
+    def test__read_json(self):
+        """Testing method or function named _read_json."""
+        # Start a webserver
+        server = HTTPServer(('127.0.0.1', 0), _JSONHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}/json'.format(server.server_port)
+        expected = {'koala': 'b\u00e4r', 'values': list(range(100))}
+
+        # Test each charset, with and without compression
+        for charset, content_encoding in [
+                (None, None), ('latin-1', None), ('utf-16', 'gzip')]:
+            body = json.dumps(expected, ensure_ascii=False).encode(
+                charset or 'utf-8')
+            headers = {'Content-Type': 'application/json'}
+            if charset is not None:
+                headers['Content-Type'] = '{}; charset={}'.format(
+                    'application/json', charset)
+            if content_encoding is not None:
+                body = gzip.compress(body)
+                headers['Content-Encoding'] = content_encoding
+            _JSONHandler.body = body
+            _JSONHandler.headers_ = headers
+            with urllib.request.urlopen(url) as u_handle:
+                self.assertEqual(phttp._read_json(u_handle), expected)
+
+    def test_circuit_breaker(self):
+        """Testing method or function named circuit_breaker."""
+        # The same breaker must be used for the same server
+        url = 'http://127.0.0.1:1/breaker'
+        result = phttp.circuit_breaker(url)
+        self.assertTrue(isinstance(result, phttp.CircuitBreaker))
+        self.assertIs(result, phttp.circuit_breaker(url))
+        self.assertIs(result, phttp.circuit_breaker('{}/2'.format(url)))
+        self.assertIsNot(
+            result, phttp.circuit_breaker('http://127.0.0.1:2/breaker'))
+        self.assertIsNot(
+            result, phttp.circuit_breaker('https://127.0.0.1:1/breaker'))
+        self.assertIs(
+            phttp.circuit_breaker('http://Koala/1'),
+            phttp.circuit_breaker('http://koala:80/2'))
+
+    def test_relay_many(self):
+        """Testing method or function named relay_many."""
+        # Test
+        agents = [
+            _SlowAgent('koala_bear', 'slow_{}'.format(_), 'http://slow')
+            for _ in range(3)]
+        result = phttp.relay_many(agents, workers=1)
+        self.assertEqual(
+            [item.identifier for item in result],
+            ['slow_0', 'slow_1', 'slow_2'])
+        self.assertTrue(all([item.success for item in result]))
+
+    def test_post_queue(self):
+        """Testing method or function named post_queue."""
+        # The same queue must be reused by the process
+        result = phttp.post_queue()
+        self.assertTrue(isinstance(result, phttp.PostQueue))
+        self.assertEqual(id(result), id(phttp.post_queue()))
+
+    def test_session(self):
+        """Testing method or function named session."""
+        # The same session must be reused by the process
+        result = phttp.session()
+        self.assertTrue(isinstance(result, requests.Session))
+        self.assertEqual(id(result), id(phttp.session()))
+
+        # Idle sessions must be replaced
+        phttp._SESSION['last_used'] = 0
+        self.assertNotEqual(id(result), id(phttp.session()))
+
+        # Sessions inherited from a parent process must be replaced
+        result = phttp.session()
+        phttp._SESSION['pid'] = -1
+        self.assertNotEqual(id(result), id(phttp.session()))
+
+    def test__encode(self):
+        """Testing method or function named _encode."""
+        # Initialize key variables
+        _data = {'koala': 'bear' * 1000}
+        settings = phttp._settings()
+
+        # Test without compression
+        settings['compression'] = None
+        (payload, headers) = phttp._encode(_data)
+        self.assertEqual(json.loads(b''.join(payload).decode()), _data)
+        self.assertEqual(headers, {'Content-Type': 'application/json'})
+
+        # Test with compression
+        settings['compression'] = 'gzip'
+        settings['compression_minimum'] = 1024
+        (payload, headers) = phttp._encode(_data)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        body = compression.decompress(b''.join(payload), 'gzip')
+        self.assertEqual(json.loads(body.decode()), _data)
+
+        # Small data must not be compressed
+        (body, headers) = phttp._encode({'koala': 'bear'})
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test__settings(self):
+        """Testing method or function named _settings."""
+        # Initialize key variables
+        filename = '{}{}pattoo.yaml'.format(
+            os.path.expanduser(log.check_environment()), os.sep)
+        with open(filename) as f_handle:
+            original = f_handle.read()
+        self.addCleanup(configuration.reload)
+        self.addCleanup(_write, filename, original)
+        url = 'http://127.0.0.1:1/settings'
+        breaker = phttp.circuit_breaker(url)
+        session = phttp.session()
+        closed = []
+        session.close = lambda: closed.append(session)
+
+        # The same settings must be reused while the configuration is
+        # unchanged
+        settings = phttp._settings()
+        self.assertIs(phttp._settings(), settings)
+        self.assertIs(phttp.circuit_breaker(url), breaker)
+        self.assertEqual(settings['connect_timeout'], 10)
+
+        # Changes to the configuration file must be used
+        config = yaml.safe_load(original)
+        config['pattoo_agent_api']['connect_timeout'] = 7
+        config['pattoo_agent_api']['queue_size'] = 5
+        _write(filename, yaml.dump(config, default_flow_style=False))
+        self.assertEqual(settings['connect_timeout'], 10)
+        self.assertEqual(phttp._settings()['connect_timeout'], 7)
+        self.assertEqual(phttp.Deadline(total=100).timeout()[0], 7)
+        self.assertEqual(phttp.post_queue()._queue.maxsize, 5)
+
+        # Objects created with the previous settings must be replaced
+        self.assertIsNot(phttp.circuit_breaker(url), breaker)
+        self.assertIsNot(phttp.session(), session)
+        self.assertEqual(closed, [session])
+
+        # Settings must be read again after reloading the configuration
+        settings['connect_timeout'] = 3
+        configuration.reload()
+        self.assertEqual(phttp._settings()['connect_timeout'], 7)
 
     def test__save_data(self):
         """Testing method or function named _save_data."""
@@ -103,6 +1193,101 @@ class TestBasicFunctions(unittest.TestCase):
         pass
 
 
+def _restore_state(test):
+    """Restore the process-wide phttp state when a test finishes.
+
+    Args:
+        test: unittest.TestCase object
+
+    Returns:
+        None
+
+    """
+    # Restore the settings and circuit breakers even if the test fails
+    for original in [phttp._settings(), phttp._CIRCUIT_BREAKERS]:
+        test.addCleanup(_replace, original, dict(original))
+
+
+def _write(filename, contents):
+    """Write a file.
+
+    Args:
+        filename: Name of file
+        contents: String to write
+
+    Returns:
+        None
+
+    """
+    # Write
+    with open(filename, 'w') as f_handle:
+        f_handle.write(contents)
+
+
+def _replace(original, contents):
+    """Replace the contents of a dict.
+
+    Args:
+        original: Dict to update
+        contents: New contents
+
+    Returns:
+        None
+
+    """
+    # Replace
+    original.clear()
+    original.update(contents)
+
+
+def _posting_data(identifier, value):
+    """Create posting data for testing.
+
+    Args:
+        identifier: Agent ID
+        value: Value and timestamp of the datapoints
+
+    Returns:
+        result: Dict of data to post
+
+    """
+    # Initialize key variables
+    agentdata = AgentPolledData('panda_bear', 20)
+    ddv = TargetDataPoints('teddy_bear')
+    for key in ['koala_bear', 'gummy_bear']:
+        ddv.add(DataPoint(key, value, timestamp=value))
+    agentdata.add(ddv)
+
+    # Return
+    result = converter.posting_data_points(
+        converter.agentdata_to_post(agentdata))
+    result['pattoo_agent_id'] = identifier
+    return result
+
+
+def _append_record(segment_log, flags, payload):
+    """Append a record with any flags to the newest segment of a log.
+
+    Args:
+        segment_log: cache.SegmentLog object
+        flags: Record flags
+        payload: Bytes of the record
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    checksum = zlib.crc32(payload, zlib.crc32(bytes([flags])))
+    filepath = segment_log._filepath(segment_log._segments()[-1])
+
+    # Append
+    with open(filepath, 'ab') as f_handle:
+        f_handle.write(cache._HEADER.pack(
+            cache._MAGIC, flags, len(payload), checksum))
+        f_handle.write(payload)
+
+
 if __name__ == '__main__':
     # Make sure the environment is OK to run unittests
     UnittestConfig().create()
@@ -7,6 +7,8 @@ import os
 import sys
 import socket
 import time
+import copy
+import hashlib
 
 # Try to create a working PYTHONPATH
 EXEC_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -25,13 +27,16 @@ else:
 # Pattoo imports
 from pattoo_shared import variables
 from pattoo_shared import files
+from pattoo_shared import data
 from pattoo_shared.configuration import Config
 from pattoo_shared.constants import (
-    DATA_INT, DATA_STRING, DATA_FLOAT, DATAPOINT_KEYS, AGENT_METADATA_KEYS)
+    DATA_INT, DATA_STRING, DATA_FLOAT, DATAPOINT_KEYS, AGENT_METADATA_KEYS,
+    CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST)
 from pattoo_shared.variables import (
     DataPoint, DataPointMetadata, ConverterMetadata, PostingDataPoints,
-    TargetDataPoints, TargetPollingPoints,
-    PollingPoint, IPTargetPollingPoints, AgentPolledData, AgentAPIVariable)
+    DataPointBatch, MetadataSet, TargetDataPoints, TargetPollingPoints,
+    PollingPoint, IPTargetPollingPoints, AgentPolledData, AgentAPIVariable,
+    AgentIdentity)
 from tests.libraries.configuration import UnittestConfig
 
 
@@ -328,6 +333,9 @@ ab48bdc902e2ea5476a54680a7ace0971ab90edb3f6ffe00a89b2d1e17b1548d''')
             self.assertEqual(variable.checksum, '''\
 a783370f88d8c54b5f5e6641af69d86dae5d4d62621d55cf7e63f6c66644c214''')
 
+        # DataPoints must not have a per-instance attribute dict
+        self.assertFalse(hasattr(variable, '__dict__'))
+
     def test___repr__(self):
         """Testing function __repr__."""
         # Need to see all the string output
@@ -346,6 +354,64 @@ timestamp={}, valid=True>'''.format(variable.timestamp))
         result = variable.__repr__()
         self.assertEqual(result, expected)
 
+    def test_checksum(self):
+        """Testing function checksum."""
+        # Initialize key variables
+        variable = DataPoint('koala', 1)
+        expected = data.hashstring('koala{}'.format(DATA_INT))
+
+        # Test
+        self.assertEqual(variable.checksum, expected)
+        self.assertEqual(variable._checksum, expected)
+
+        # The checksum must change when metadata is added
+        variable.add(DataPointMetadata('bear', 'teddy'))
+        self.assertIsNone(variable._checksum)
+        expected = data.hashstring('{}bearteddy'.format(expected))
+        self.assertEqual(variable.checksum, expected)
+
+        # Except when the metadata doesn't update the checksum
+        variable.add(DataPointMetadata('panda', 1, update_checksum=False))
+        self.assertEqual(variable._checksum, expected)
+
+    def test_add_metadata_set(self):
+        """Testing function add with MetadataSet objects."""
+        # Initialize key variables
+        items = [
+            DataPointMetadata('koala', 'bear'),
+            DataPointMetadata('panda', 1, update_checksum=False)]
+        metadata_set = MetadataSet(items)
+        variable = DataPoint('teddy', 1)
+        expected = DataPoint('teddy', 1)
+        expected.add(items)
+
+        # Metadata must be shared, and can't be changed directly
+        variable.add(metadata_set)
+        self.assertIs(variable.metadata, metadata_set.metadata)
+        self.assertEqual(variable.checksum, expected.checksum)
+        with self.assertRaises(TypeError):
+            variable.metadata['grizzly'] = 'bear'
+        with self.assertRaises(TypeError):
+            variable.metadata.update({'grizzly': 'bear'})
+
+        # Metadata must be copied before it is changed
+        item = DataPointMetadata('grizzly', 'bear')
+        variable.add(item)
+        expected.add(item)
+        self.assertIsNot(variable.metadata, metadata_set.metadata)
+        self.assertEqual(
+            metadata_set.metadata, {'koala': 'bear', 'panda': '1'})
+        self.assertEqual(variable.metadata, expected.metadata)
+        self.assertEqual(variable.checksum, expected.checksum)
+
+        # MetadataSets must be merged with existing metadata
+        variable = DataPoint('teddy', 1)
+        variable.add([item, metadata_set])
+        expected = DataPoint('teddy', 1)
+        expected.add([item] + items)
+        self.assertEqual(variable.metadata, expected.metadata)
+        self.assertEqual(variable.checksum, expected.checksum)
+
     def test_add(self):
         """Testing function add."""
         # Setup DataPoint - Valid
@@ -410,6 +476,17 @@ timestamp={}, valid=True>'''.format(variable.timestamp))
         self.assertEqual(variable.checksum, '''\
 2518ce8c9dc0683ef87a6a438c8c79c2ae3fd8ffd38032b6c1d253057d04c8f7''')
 
+    def test_from_columns(self):
+        """Testing function from_columns."""
+        # Test
+        result = DataPoint.from_columns(
+            ['koala', 'panda'], [1, 2], data_type=DATA_INT, timestamp=10)
+        self.assertTrue(isinstance(result, DataPointBatch))
+        self.assertEqual(
+            [_.checksum for _ in result],
+            [DataPoint('koala', 1, timestamp=10).checksum,
+             DataPoint('panda', 2, timestamp=10).checksum])
+
 
 class TestTargetDataPoints(unittest.TestCase):
     """Checks all functions and methods."""
@@ -480,6 +557,426 @@ class TestTargetDataPoints(unittest.TestCase):
         self.assertEqual(_variable.value, value)
         self.assertEqual(_variable.key, _key_)
 
+        # Test adding a DataPointBatch
+        batch = DataPointBatch()
+        batch.add([variable, DataPoint('koala_bear', 1)])
+        ddv.add(batch)
+        self.assertEqual(len(ddv.data), 2)
+        self.assertEqual(ddv.batch.keys, ['koala_bear'])
+
+        # Test adding a duplicate DataPointBatch (There should be no changes)
+        ddv.add(batch)
+        self.assertEqual(len(ddv.batch), 1)
+
+    def test_extend(self):
+        """Testing function extend."""
+        # Initialize key variables
+        ddv = TargetDataPoints('teddy_bear')
+        datapoints = [DataPoint('koala_{}'.format(_), _) for _ in range(10)]
+
+        # Test adding from a generator
+        ddv.extend(_ for _ in datapoints + datapoints)
+        self.assertTrue(ddv.valid)
+        self.assertEqual(ddv.data, datapoints)
+
+        # Invalid items must not change validity
+        ddv = TargetDataPoints('teddy_bear')
+        ddv.extend([None, 'koala'])
+        self.assertFalse(ddv.valid)
+        self.assertEqual(ddv.data, [])
+
+    def test_add_bulk(self):
+        """Testing function add_bulk."""
+        # Test adding to an empty object
+        ddv = TargetDataPoints('teddy_bear')
+        ddv.add_bulk(['koala', 'panda'], [1, 2])
+        self.assertTrue(ddv.valid)
+        self.assertEqual(ddv.batch.keys, ['koala', 'panda'])
+
+        # Duplicates must be ignored
+        ddv.add_bulk(
+            ['koala', 'grizzly'], [1, 3], timestamp=ddv.batch.timestamps[0])
+        self.assertEqual(ddv.batch.keys, ['koala', 'panda', 'grizzly'])
+        self.assertEqual(len(list(ddv.datapoints())), 3)
+
+        # The data must include the DataPoints added in bulk
+        ddv.add(DataPoint('gummy', 4))
+        self.assertEqual(
+            [(_.key, _.value) for _ in ddv.data],
+            [('gummy', 4), ('koala', 1), ('panda', 2), ('grizzly', 3)])
+        self.assertEqual(
+            [_.checksum for _ in ddv.data],
+            [_.checksum for _ in ddv.datapoints()])
+
+        # Invalid values must not change validity
+        ddv = TargetDataPoints('teddy_bear')
+        ddv.add_bulk(['koala'], [None])
+        self.assertFalse(ddv.valid)
+
+    def test_datapoints(self):
+        """Testing function datapoints."""
+        # Initialize key variables
+        ddv = TargetDataPoints('teddy_bear')
+        batch = DataPointBatch()
+        batch.add(DataPoint('koala_bear', 1))
+        ddv.add([DataPoint('gummy_bear', 2), batch])
+
+        # Test
+        result = list(ddv.datapoints())
+        self.assertTrue(ddv.valid)
+        self.assertEqual(
+            [_.key for _ in result], ['gummy_bear', 'koala_bear'])
+
+    def test_rows(self):
+        """Testing function rows."""
+        # Initialize key variables
+        ddv = TargetDataPoints('teddy_bear')
+        datapoint = DataPoint('koala_bear', 1, timestamp=10)
+        datapoint.add(DataPointMetadata('food', 'leaves'))
+        ddv.add([datapoint, DataPoint('brown_bear', 'invalid')])
+        ddv.add_bulk(['gummy_bear'], [2], timestamp=10)
+        metadata = MetadataSet(DataPointMetadata('zoo', 'city'))
+
+        # Rows must describe the DataPoints after adding the metadata
+        result = list(ddv.rows(metadata))
+        self.assertEqual(len(result), 2)
+
+        # The original DataPoints must not be changed
+        self.assertEqual(ddv.data[0].metadata, {'food': 'leaves'})
+        expected = [_ for _ in ddv.datapoints() if _.valid is True]
+        for datapoint in expected:
+            datapoint.add(metadata)
+        for row, datapoint in zip(result, expected):
+            self.assertEqual(row[0].metadata, datapoint.metadata)
+            self.assertEqual(row[1:], (
+                datapoint.key, datapoint.value, datapoint.data_type,
+                datapoint.timestamp, datapoint.checksum))
+
+        # Test without metadata
+        ddv = TargetDataPoints('teddy_bear')
+        ddv.add([datapoint, DataPoint('brown_bear', 'invalid')])
+        ddv.add_bulk(['gummy_bear'], [2], timestamp=10)
+        result = list(ddv.rows())
+        self.assertEqual(
+            [_[5] for _ in result],
+            [_.checksum for _ in ddv.datapoints() if _.valid is True])
+
+
+class TestMetadataSet(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing function __init__."""
+        # Invalid, reserved and duplicate metadata must be ignored
+        metadata_set = MetadataSet([
+            DataPointMetadata('koala', 'bear'),
+            DataPointMetadata('koala', 'grizzly'),
+            DataPointMetadata('panda', 1, update_checksum=False),
+            DataPointMetadata('teddy', None),
+            ConverterMetadata('pattoo_key', 'bear'),
+            None])
+        self.assertEqual(
+            metadata_set.metadata, {'koala': 'bear', 'panda': '1'})
+        self.assertEqual(metadata_set.hashed, ('koala',))
+
+        # Metadata must be read only, but copies can be changed
+        with self.assertRaises(TypeError):
+            metadata_set.metadata['koala'] = 'grizzly'
+        with self.assertRaises(TypeError):
+            metadata_set.metadata.pop('koala')
+        result = copy.copy(metadata_set.metadata)
+        result['koala'] = 'grizzly'
+        self.assertEqual(metadata_set.metadata['koala'], 'bear')
+
+    def test___repr__(self):
+        """Testing function __repr__."""
+        # Test
+        metadata_set = MetadataSet(DataPointMetadata('koala', 'bear'))
+        self.assertEqual(
+            repr(metadata_set), "<MetadataSet metadata={'koala': 'bear'}>")
+
+    def test_merge(self):
+        """Testing function merge."""
+        # Initialize key variables
+        metadata = MetadataSet([
+            DataPointMetadata('zoo', 'city'),
+            DataPointMetadata('food', 'fish', update_checksum=False)])
+        datapoint = DataPoint('koala_bear', 1)
+        datapoint.add(DataPointMetadata('food', 'leaves'))
+
+        # Test
+        result = metadata.merge(datapoint.metadata, ['food'])
+        datapoint.add(metadata)
+        self.assertEqual(result.metadata, datapoint.metadata)
+        self.assertEqual(
+            result.checksum('koala_bear', DATA_INT), datapoint.checksum)
+        self.assertEqual(metadata.metadata, {'zoo': 'city', 'food': 'fish'})
+
+    def test_checksum(self):
+        """Testing function checksum."""
+        # Initialize key variables
+        items = [
+            DataPointMetadata('koala', 'bear'),
+            DataPointMetadata('panda', 1, update_checksum=False),
+            DataPointMetadata('grizzly', 'bear')]
+
+        # Checksums must match those of DataPoints with the same metadata
+        metadata_set = MetadataSet(items)
+        for mode in [
+                CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST,
+                CHECKSUM_CANONICAL]:
+            variables.checksum_mode(mode)
+            for key in ['teddy', 'gummy']:
+                variable = DataPoint(key, 1)
+                variable.add(items)
+                self.assertEqual(
+                    metadata_set.checksum(key, DATA_INT), variable.checksum)
+        variables.checksum_mode(CHECKSUM_COMPATIBLE)
+
+        # Compatible checksums must be unchanged by caching the metadata
+        expected = hashlib.sha256(
+            '{}{}'.format('teddy', DATA_INT).encode()).hexdigest()
+        for key, value in [('koala', 'bear'), ('grizzly', 'bear')]:
+            expected = hashlib.sha256(
+                '{}{}{}'.format(expected, key, value).encode()).hexdigest()
+        self.assertEqual(metadata_set.checksum('teddy', DATA_INT), expected)
+        self.assertEqual(
+            metadata_set._prefix,
+            (CHECKSUM_COMPATIBLE, [b'koalabear', b'grizzlybear']))
+
+    def test_checksums(self):
+        """Testing function checksums."""
+        # Initialize key variables
+        keys = ['teddy', 'gummy', 'teddy']
+        for items in [[], [
+                DataPointMetadata('koala', 'bear'),
+                DataPointMetadata('grizzly', 'bear')]]:
+            metadata_set = MetadataSet(items)
+
+            # Checksums must match those calculated one at a time
+            for mode in [
+                    CHECKSUM_COMPATIBLE, CHECKSUM_CANONICAL, CHECKSUM_FAST]:
+                variables.checksum_mode(mode)
+                self.assertEqual(
+                    metadata_set.checksums(keys, DATA_INT),
+                    [metadata_set.checksum(_, DATA_INT) for _ in keys])
+            variables.checksum_mode(CHECKSUM_COMPATIBLE)
+
+
+class TestDataPointBatch(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    def test___init__(self):
+        """Testing function __init__."""
+        # Test
+        batch = DataPointBatch()
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(list(batch), [])
+
+    def test___repr__(self):
+        """Testing function __repr__."""
+        # Test
+        batch = DataPointBatch()
+        self.assertEqual(repr(batch), '<DataPointBatch datapoints=0>')
+
+    def test___iter__(self):
+        """Testing function __iter__."""
+        # Initialize key variables
+        datapoints = []
+        for value in range(3):
+            datapoint = DataPoint(
+                'koala_{}'.format(value), value, data_type=DATA_INT,
+                timestamp=value)
+            datapoint.add(DataPointMetadata('bear', 'teddy'))
+            datapoints.append(datapoint)
+        datapoints.append(DataPoint('panda', 1.5, data_type=DATA_FLOAT))
+        batch = DataPointBatch()
+        batch.add(datapoints)
+
+        # Recreated DataPoints must be identical to the originals
+        for original, result in zip(datapoints, batch):
+            self.assertTrue(isinstance(result, DataPoint))
+            for attribute in DataPoint.__slots__:
+                self.assertEqual(
+                    getattr(result, attribute), getattr(original, attribute))
+
+        # Each distinct set of metadata must be stored once
+        self.assertEqual(len(batch._metadata_sets), 2)
+
+    def test_add(self):
+        """Testing function add."""
+        # Initialize key variables
+        batch = DataPointBatch()
+        datapoint = DataPoint('koala', 1)
+
+        # Invalid and duplicate DataPoints must be ignored
+        batch.add([None, datapoint, datapoint, DataPoint('koala', 'bear')])
+        self.assertEqual(len(batch), 1)
+
+        # Test adding a DataPointBatch
+        other = DataPointBatch()
+        other.add([datapoint, DataPoint('panda', 2)])
+        batch.add(other)
+        self.assertEqual(batch.keys, ['koala', 'panda'])
+        self.assertEqual(list(batch.data_types), [DATA_INT, DATA_INT])
+
+    def test_add_columns(self):
+        """Testing function add_columns."""
+        # Initialize key variables
+        keys = ['koala', 'panda', '', 'pattoo_key', True, 'grizzly', 7]
+        values = [1, '2.5', 3, 4, 5, 'bear', False]
+        metadata = [
+            DataPointMetadata('bear', 'teddy'),
+            DataPointMetadata('zoo', 'city', update_checksum=False)]
+
+        for data_type in [DATA_INT, DATA_FLOAT, DATA_STRING]:
+            # Create the expected DataPoints one at a time
+            expected = []
+            for key, value in zip(keys, values):
+                datapoint = DataPoint(
+                    key, value, data_type=data_type, timestamp=10)
+                if datapoint.valid is True and isinstance(key, str) is True:
+                    datapoint.add(metadata)
+                    expected.append(datapoint)
+
+            # Test
+            batch = DataPointBatch()
+            batch.add_columns(
+                keys, values, data_type=data_type, timestamp=10,
+                metadata=metadata)
+            result = list(batch)
+            self.assertEqual(len(result), len(expected))
+            for original, datapoint in zip(expected, result):
+                for attribute in [
+                        'key', 'value', 'data_type', 'timestamp', 'metadata',
+                        'checksum']:
+                    self.assertEqual(
+                        getattr(datapoint, attribute),
+                        getattr(original, attribute))
+
+        # Test columns of strings and numbers in each checksum mode
+        keys = ['Koala ', 'panda', '', 'pattoo_key', 'koala', 'grizzly']
+        for mode in [CHECKSUM_CANONICAL, CHECKSUM_FAST, CHECKSUM_COMPATIBLE]:
+            variables.checksum_mode(mode)
+            for data_type, values in [
+                    (DATA_INT, [1, 2.5, 3, 4, 5, 6]),
+                    (DATA_STRING, [1, 2.5, 3, 4, 5, 6]),
+                    (DATA_STRING, ['a', 'b', 'c', 'd', 'e', 'f'])]:
+                expected = []
+                for key, value in zip(keys, values):
+                    datapoint = DataPoint(
+                        key, value, data_type=data_type, timestamp=10)
+                    datapoint.add(metadata)
+                    if datapoint.valid is True and datapoint.checksum not in [
+                            _.checksum for _ in expected]:
+                        expected.append(datapoint)
+                batch = DataPointBatch()
+                batch.add_columns(
+                    keys, values, data_type=data_type, timestamp=10,
+                    metadata=metadata)
+                self.assertEqual(
+                    [(_.key, _.value, _.checksum) for _ in batch],
+                    [(_.key, _.value, _.checksum) for _ in expected])
+
+                # Duplicates of DataPoints in the batch must be ignored
+                batch.add_columns(
+                    keys[::-1] + ['brown'], values[::-1] + [7],
+                    data_type=data_type, timestamp=10, metadata=metadata)
+                self.assertEqual(len(batch), len(expected) + 1)
+                self.assertEqual(batch.keys[-1], 'brown')
+        variables.checksum_mode(CHECKSUM_COMPATIBLE)
+
+        # Test invalid data type
+        batch = DataPointBatch()
+        batch.add_columns(['koala'], [1], data_type=True)
+        self.assertEqual(len(batch), 0)
+
+    @unittest.skipUnless(variables.numpy, 'NumPy is not installed')
+    def test_add_columns_numpy(self):
+        """Testing function add_columns with NumPy arrays."""
+        # Test
+        batch = DataPointBatch()
+        batch.add_columns(
+            ['koala', 'panda'], variables.numpy.array([1.5, 2.5]),
+            data_type=DATA_FLOAT, timestamp=10)
+        self.assertEqual(batch.values, [1.5, 2.5])
+        datapoint = DataPoint(
+            'koala', 1.5, data_type=DATA_FLOAT, timestamp=10)
+        self.assertEqual(batch.checksums[0], datapoint.checksum)
+
+        # Test arrays of keys, and arrays that aren't numeric
+        batch = DataPointBatch()
+        batch.add_columns(
+            variables.numpy.array(['Koala', 'panda']),
+            variables.numpy.array(['1', 'bear']), timestamp=10)
+        self.assertEqual(batch.keys, ['koala'])
+        self.assertEqual(batch.values, [1])
+
+
+class TestAgentIdentity(unittest.TestCase):
+    """Checks all functions and methods."""
+
+    #########################################################################
+    # General object setup
+    #########################################################################
+
+    config = Config()
+
+    def test___init__(self):
+        """Testing function __init__."""
+        # Nothing is resolved until needed
+        identity = AgentIdentity('brown_bear', ttl=20)
+        self.assertEqual(identity.agent_program, 'brown_bear')
+        self.assertEqual(identity.ttl, 20)
+        self.assertIsNone(identity.hostname)
+        self.assertIsNone(identity.agent_id)
+        self.assertIsNone(identity.config)
+
+    def test___repr__(self):
+        """Testing function __repr__."""
+        # Test
+        identity = AgentIdentity('brown_bear', ttl=20)
+        expected = ('''\
+<AgentIdentity agent_program='brown_bear', agent_id=None, hostname=None, \
+ttl=20>''')
+        self.assertEqual(identity.__repr__(), expected)
+
+    def test_get(self):
+        """Testing function get."""
+        # Test
+        agent_program = 'brown_bear'
+        identity = AgentIdentity(agent_program)
+        result = identity.get()
+        self.assertEqual(
+            result,
+            (socket.getfqdn(), files.get_agent_id(agent_program, self.config)))
+        self.assertTrue(isinstance(identity.config, Config))
+
+        # The identity isn't resolved again until it expires
+        identity.hostname = 'koala'
+        self.assertEqual(identity.get()[0], 'koala')
+        identity.ttl = 0
+        identity.refresh()
+        identity.hostname = 'koala'
+        self.assertEqual(identity.get()[0], socket.getfqdn())
+
+    def test_refresh(self):
+        """Testing function refresh."""
+        # Test
+        identity = AgentIdentity('brown_bear')
+        identity.get()
+        identity.hostname = 'koala'
+        identity.refresh()
+        self.assertEqual(identity.hostname, socket.getfqdn())
+
 
 class TestAgentPolledData(unittest.TestCase):
     """Checks all functions and methods."""
@@ -732,6 +1229,21 @@ class TestTargetPollingPoints(unittest.TestCase):
             self.assertEqual(item.address, address)
             self.assertEqual(item.multiplier, multiplier)
 
+        # Duplicate values must be ignored
+        dpt.add(PollingPoint(address=address, multiplier=multiplier))
+        self.assertEqual(len(dpt.data), 1)
+
+    def test_extend(self):
+        """Testing function extend."""
+        # Initialize key variables
+        dpt = TargetPollingPoints('localhost')
+        points = [PollingPoint(address=_) for _ in range(10)]
+
+        # Test adding from a generator
+        dpt.extend(_ for _ in points + points + [None])
+        self.assertTrue(dpt.valid)
+        self.assertEqual(dpt.data, points)
+
 
 class TestBasicFunctions(unittest.TestCase):
     """Checks all functions and methods."""
@@ -740,6 +1252,59 @@ class TestBasicFunctions(unittest.TestCase):
     # General object setup
     #########################################################################
 
+    def test_agent_identity(self):
+        """Testing function agent_identity."""
+        # The same object is shared by each agent program
+        result = variables.agent_identity('brown_bear')
+        self.assertTrue(isinstance(result, AgentIdentity))
+        self.assertEqual(result.agent_program, 'brown_bear')
+        self.assertIs(variables.agent_identity('brown_bear'), result)
+        self.assertIsNot(variables.agent_identity('black_bear'), result)
+
+    def test_checksum_mode(self):
+        """Testing function checksum_mode."""
+        # Test
+        variables.checksum_mode(CHECKSUM_CANONICAL)
+        canonical = DataPoint('koala', 1).checksum
+        variables.checksum_mode(CHECKSUM_FAST)
+        fast = DataPoint('koala', 1).checksum
+        variables.checksum_mode(CHECKSUM_COMPATIBLE)
+        compatible = DataPoint('koala', 1).checksum
+        self.assertNotEqual(canonical, compatible)
+        self.assertEqual(len(fast), 32)
+        self.assertEqual(
+            compatible, data.hashstring('koala{}'.format(DATA_INT)))
+
+        # Test invalid mode
+        with self.assertRaises(ValueError):
+            variables.checksum_mode('koala')
+
+    def test__checksum(self):
+        """Testing function _checksum."""
+        # Initialize key variables
+        items = [('bear', 'teddy'), ('panda', 'giant')]
+
+        # Order of metadata matters in compatible mode
+        self.assertNotEqual(
+            variables._checksum('koala', DATA_INT, items),
+            variables._checksum('koala', DATA_INT, items[::-1]))
+
+        # Order of metadata doesn't matter in canonical mode
+        variables.checksum_mode(CHECKSUM_CANONICAL)
+        result = variables._checksum('koala', DATA_INT, items)
+        reverse = variables._checksum('koala', DATA_INT, items[::-1])
+        variables.checksum_mode(CHECKSUM_COMPATIBLE)
+        self.assertEqual(len(result), 64)
+        self.assertEqual(result, reverse)
+
+        # Order of metadata doesn't matter in fast mode either
+        variables.checksum_mode(CHECKSUM_FAST)
+        result = variables._checksum('koala', DATA_INT, items)
+        reverse = variables._checksum('koala', DATA_INT, items[::-1])
+        variables.checksum_mode(CHECKSUM_COMPATIBLE)
+        self.assertEqual(len(result), 32)
+        self.assertEqual(result, reverse)
+
     def test__strip_non_printable(self):
         """Testing function _strip_non_printable."""
         pass
@@ -794,6 +1359,46 @@ class TestBasicFunctions(unittest.TestCase):
             self.assertIsNone(value)
             self.assertFalse(valid)
 
+        # Test the 'pattoo' string in keys
+        for _key in ['pattoo_key', 'Key_PATTOO']:
+            (key, value, valid) = variables._key_value_valid(_key, 1)
+            self.assertFalse(valid)
+            (key, value, valid) = variables._key_value_valid(
+                _key, 1, override=True)
+            self.assertEqual(key, _key.lower())
+            self.assertTrue(valid)
+
+        # Test with unhashable keys
+        for _key in [[1], {'1': 1}]:
+            (key, value, valid) = variables._key_value_valid(_key, 1)
+            self.assertIsNone(key)
+            self.assertFalse(valid)
+
+    def test__key_valid(self):
+        """Testing function _key_valid."""
+        # Test standardization
+        self.assertEqual(variables._key_valid(' Key ', True), 'key')
+        self.assertEqual(variables._key_valid(1, True), '1')
+        self.assertEqual(variables._key_valid(1.5, True), '1.5')
+
+        # Test invalid keys
+        for _key in [None, True, False, '', '  ', b'key']:
+            self.assertIsNone(variables._key_valid(_key, True))
+        self.assertIsNone(variables._key_valid('pattoo', True))
+        self.assertEqual(variables._key_valid('pattoo', False), 'pattoo')
+
+        # Test caching. Keys of different types are cached separately.
+        variables._key_valid.cache_clear()
+        for _ in range(3):
+            variables._key_valid('key', True)
+            variables._key_valid(1, True)
+            variables._key_valid(1.0, True)
+        info = variables._key_valid.cache_info()
+        self.assertEqual(info.misses, 3)
+        self.assertEqual(info.hits, 6)
+        self.assertEqual(variables._key_valid(1, True), '1')
+        self.assertEqual(variables._key_valid(1.0, True), '1.0')
+
 
 if __name__ == '__main__':
     # Make sure the environment is OK to run unittests